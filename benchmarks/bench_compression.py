@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare seed upload time and bytes sent with and without request compression.
+
+The stand-in server of standin.py reads request bodies at a limited rate, to mimic a WAN link:
+
+    PYTHONPATH=. python benchmarks/bench_compression.py --urls 100000 --bandwidth 10
+"""
+
+from __future__ import print_function
+from __future__ import division
+
+import argparse
+import time
+
+from nutch import nutch
+from standin import StandInServer
+
+
+def seedUrls(count):
+    return ['http://host%d.example.com/path/page%d.html' % (i % 5000, i) for i in range(count)]
+
+
+def upload(endpoint, urls, compression, stream, level):
+    with nutch.Server(endpoint, compression=compression, compressMinSize=0, compressLevel=level) as server:
+        start = time.time()
+        nutch.SeedClient(server).create('bench_seeds', urls, stream=stream)
+        return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--urls', type=int, default=100000, help='number of seed URLs to upload')
+    parser.add_argument('--bandwidth', type=float, default=10,
+                        help='link speed in MB/s, 0 for as fast as the loopback interface allows')
+    parser.add_argument('--level', type=int, default=nutch.DefaultCompressLevel, help='zlib compression level')
+    args = parser.parse_args()
+
+    urls = seedUrls(args.urls)
+    httpd = StandInServer(bandwidth=args.bandwidth * 1024 * 1024).start()
+    print('%10s %-8s %-8s %10s %14s %14s %8s' % ('urls', 'encoding', 'mode', 'seconds', 'bytes sent',
+                                                  'bytes decoded', 'ratio'))
+    try:
+        for compression in (None, 'gzip', 'deflate'):
+            for stream in (False, True):
+                httpd.bytesReceived = httpd.bytesDecoded = 0
+                elapsed = upload(httpd.endpoint, urls, compression, stream, args.level)
+                print('%10d %-8s %-8s %10.2f %14d %14d %8.2f' % (
+                    args.urls, compression or 'none', 'stream' if stream else 'list', elapsed,
+                    httpd.bytesReceived, httpd.bytesDecoded, httpd.bytesDecoded / httpd.bytesReceived))
+    finally:
+        httpd.shutdown()
+
+
+if __name__ == '__main__':
+    main()
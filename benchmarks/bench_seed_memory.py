@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Record the peak RSS of SeedClient.createFromFile with and without streaming.
+
+Each upload runs in a fresh subprocess so its peak memory is measured on its own,
+against the stand-in server of standin.py:
+
+    PYTHONPATH=. python benchmarks/bench_seed_memory.py --urls 100000 1000000
+"""
+
+from __future__ import print_function
+from __future__ import division
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from nutch import nutch
+from standin import StandInServer
+
+
+def peakRss():
+    """Peak resident set size of this process, in MB"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0)
+
+
+def child(endpoint, filename, stream):
+    baseline = peakRss()
+    start = time.time()
+    with nutch.Server(endpoint) as server:
+        nutch.SeedClient(server).createFromFile('bench_seeds', filename, stream=stream)
+    print('%f %f %f' % (time.time() - start, baseline, peakRss()))
+
+
+def writeSeedFile(count):
+    f = tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False)
+    with f:
+        for i in range(count):
+            f.write('http://host%d.example.com/path/page%d.html\n' % (i % 5000, i))
+    return f.name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--urls', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help='seed list sizes to measure')
+    parser.add_argument('--child', nargs=3, metavar=('ENDPOINT', 'FILE', 'STREAM'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        endpoint, filename, stream = args.child
+        return child(endpoint, filename, stream == 'stream')
+
+    httpd = StandInServer().start()
+    print('%10s %-8s %10s %14s %14s' % ('urls', 'mode', 'seconds', 'baseline MB', 'peak RSS MB'))
+    try:
+        for count in args.urls:
+            filename = writeSeedFile(count)
+            try:
+                for mode in ('list', 'stream'):
+                    out = subprocess.check_output([sys.executable, __file__, '--child', httpd.endpoint, filename, mode],
+                                                  env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)))
+                    elapsed, baseline, peak = map(float, out.split())
+                    print('%10d %-8s %10.2f %14.1f %14.1f' % (count, mode, elapsed, baseline, peak))
+            finally:
+                os.remove(filename)
+    finally:
+        httpd.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measure Server.call throughput with and without the keep-alive connection pool.
+
+A minimal stand-in for the Nutch REST server (standin.py) answers GET /job/{id} on localhost,
+so no Nutch or Hadoop installation is needed:
+
+    PYTHONPATH=. python benchmarks/bench_server_pool.py --calls 2000
+"""
+
+from __future__ import print_function
+from __future__ import division
+
+import argparse
+import time
+
+from nutch import nutch
+from standin import StandInServer
+
+
+def bench(endpoint, calls, keepAlive):
+    with nutch.Server(endpoint, keepAlive=keepAlive) as server:
+        start = time.time()
+        for i in range(calls):
+            server.call('get', '/job/bench-%d' % i)
+        elapsed = time.time() - start
+    return calls / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=2000, help='number of calls per measurement')
+    args = parser.parse_args()
+
+    httpd = StandInServer().start()
+
+    try:
+        for keepAlive in (False, True):
+            rate = bench(httpd.endpoint, args.calls, keepAlive)
+            print('%-14s %10.1f calls/sec' % ('pooled' if keepAlive else 'no keep-alive', rate))
+    finally:
+        httpd.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Minimal stand-in for the Nutch REST server, used by the benchmarks
+
+Answers GET /job/{id} with a RUNNING job and POST /seed/create with a seed path,
+discarding the uploaded body while counting its bytes, before and after decompression.
+With a bandwidth the server reads request bodies no faster than a slow link would carry them.
+"""
+
+import json
+import threading
+import time
+import zlib
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, don't let Nagle stall keep-alive connections
+    disable_nagle_algorithm = True
+
+    def _drain(self):
+        """Read and discard the request body, return its size in bytes as sent and once decoded"""
+
+        encoding = self.headers.get('Content-Encoding')
+        # wbits 32 + MAX_WBITS accepts both gzip and zlib (HTTP deflate) streams
+        decoder = zlib.decompressobj(32 + zlib.MAX_WBITS) if encoding in ('gzip', 'deflate') else None
+        size = decoded = 0
+        for piece in self._pieces():
+            size += len(piece)
+            decoded += len(decoder.decompress(piece)) if decoder else len(piece)
+        if decoder:
+            decoded += len(decoder.flush())
+        return size, decoded
+
+    def _pieces(self):
+        if self.headers.get('Transfer-Encoding', '').lower() != 'chunked':
+            for piece in self._read(int(self.headers.get('Content-Length', 0))):
+                yield piece
+            return
+        while True:
+            chunkSize = int(self.rfile.readline().split(b';')[0], 16)
+            if chunkSize == 0:
+                self.rfile.readline()
+                return
+            for piece in self._read(chunkSize):
+                yield piece
+            self.rfile.readline()
+
+    def _read(self, size):
+        # read in pieces, so the server's own memory stays flat
+        bandwidth = self.server.bandwidth
+        remaining = size
+        while remaining:
+            piece = self.rfile.read(min(remaining, 1 << 16))
+            remaining -= len(piece)
+            if bandwidth:
+                time.sleep(len(piece) / float(bandwidth))
+            yield piece
+
+    def _send(self, body, contentType):
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', contentType)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        # Server.call always attaches a (possibly empty) body, drain it to keep the connection usable
+        self._drain()
+        jid = self.path.rsplit('/', 1)[-1]
+        self._send(json.dumps({'id': jid, 'type': 'FETCH', 'state': 'RUNNING', 'msg': 'OK',
+                               'crawlId': 'bench', 'confId': 'default', 'args': {}}), 'application/json')
+
+    def do_POST(self):
+        size, decoded = self._drain()
+        self.server.bytesReceived += size
+        self.server.bytesDecoded += decoded
+        self._send('/tmp/bench_seed_%d' % decoded, 'text/plain')
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    bytesReceived = 0
+    bytesDecoded = 0
+
+    def __init__(self, bandwidth=None):
+        """
+        :param bandwidth: bytes per second at which request bodies are read, None for as fast as possible
+        """
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StandInHandler)
+        self.bandwidth = bandwidth
+
+    @property
+    def endpoint(self):
+        return 'http://127.0.0.1:%d' % self.server_address[1]
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measure the overhead of the client's hot paths and write the results as JSON, to compare releases.
+
+Runs against the fake Nutch REST server of nutch.fake, seed uploads go to the stand-in server of standin.py,
+which discards the body instead of keeping it:
+
+    PYTHONPATH=. python benchmarks/suite.py --output results.json
+    PYTHONPATH=. python benchmarks/suite.py --quick --compare results.json
+
+Benchmarks:
+
+serverCall        Server.call throughput and latency percentiles in seconds, GET /job/{id}
+jobCreate         JobClient.create rate
+seedCreate        SeedClient.createFromFile time and peak RSS per seed list size, in a fresh process each
+crawlTransitions  CrawlClient.waitAll time and requests per phase transition, with jobs finishing at once
+crawlScaling      CrawlManager wall time for 1, 10 and 100 concurrent crawls of jobs taking jobDuration
+
+Metrics whose name ends with PerSecond are better when higher, all others when lower.  With --compare the
+metrics are checked against an earlier result file, and the exit status is 1 if any got worse by more than
+--tolerance.  Only compare results of runs with the same parameters, on the same machine.
+"""
+
+from __future__ import print_function
+from __future__ import division
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from nutch import nutch
+from nutch.fake import FakeNutchServer
+from nutch.metrics import clock
+from standin import StandInServer
+from bench_seed_memory import writeSeedFile
+
+Benchmarks = ('serverCall', 'jobCreate', 'seedCreate', 'crawlTransitions', 'crawlScaling')
+
+
+def percentile(sortedValues, fraction):
+    return sortedValues[min(len(sortedValues) - 1, int(fraction * len(sortedValues)))]
+
+
+def median(values):
+    return sorted(values)[len(values) // 2]
+
+
+def repeated(benchmark, repeat):
+    """Run benchmark repeat times, return the median of every metric"""
+    runs = [benchmark() for i in range(repeat)]
+    return dict((name, median([run[name] for run in runs])) for name in runs[0])
+
+
+def serverCall(endpoint, calls):
+    with nutch.Server(endpoint) as server:
+        jid = nutch.JobClient(server, 'bench', 'default').generate().id
+        path = '/job/' + jid
+        for i in range(min(calls, 100)):
+            server.call('get', path)  # warm up the connection pool
+        latencies = []
+        start = clock()
+        for i in range(calls):
+            before = clock()
+            server.call('get', path)
+            latencies.append(clock() - before)
+        elapsed = clock() - start
+    latencies.sort()
+    return {'callsPerSecond': calls / elapsed, 'latencyP50': percentile(latencies, 0.5),
+            'latencyP90': percentile(latencies, 0.9), 'latencyP99': percentile(latencies, 0.99)}
+
+
+def jobCreate(endpoint, jobs):
+    with nutch.Server(endpoint) as server:
+        jc = nutch.JobClient(server, 'bench', 'default')
+        start = clock()
+        for i in range(jobs):
+            jc.generate()
+        elapsed = clock() - start
+    return {'jobsPerSecond': jobs / elapsed}
+
+
+def seedCreate(sizes):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_seed_memory.py')
+    httpd = StandInServer().start()
+    results = {}
+    try:
+        for count in sizes:
+            filename = writeSeedFile(count)
+            try:
+                out = subprocess.check_output([sys.executable, script, '--child', httpd.endpoint, filename, 'stream'],
+                                              env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)))
+            finally:
+                os.remove(filename)
+            elapsed, baseline, peak = map(float, out.split())
+            results[str(count)] = {'seconds': elapsed, 'urlsPerSecond': count / elapsed,
+                                   'peakRssMB': peak, 'rssGrowthMB': peak - baseline}
+    finally:
+        httpd.shutdown()
+    return results
+
+
+def crawlTransitions(rounds):
+    with FakeNutchServer() as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        seed = nt.Seeds().create('bench_seeds', ['http://nutch.apache.org'])
+        requests = fake.fake.requests
+        start = clock()
+        crawl = nt.Crawl(seed, rounds=rounds, index=True, pollStrategy=nutch.FixedPoll(0))
+        jobs = sum(len(jobs) for jobs in crawl.waitAll())
+        elapsed = clock() - start
+        requests = fake.fake.requests - requests
+    return {'secondsPerTransition': elapsed / jobs, 'requestsPerTransition': requests / jobs}
+
+
+def crawlScaling(counts, jobDuration, sleepTime):
+    results = {}
+    for count in counts:
+        with FakeNutchServer(jobDuration=jobDuration) as fake:
+            nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+            seed = nt.Seeds().create('bench_seeds', ['http://nutch.apache.org'])
+            manager = nt.Crawls(sleepTime=sleepTime)
+            requests = fake.fake.requests
+            start = clock()
+            for i in range(count):
+                manager.add(nt.Crawl(seed, jobClient=nt.Jobs('bench%d' % i), index=True))
+            jobs = sum(len(jobs) for rounds in manager.waitAll().values() for jobs in rounds)
+            elapsed = clock() - start
+            requests = fake.fake.requests - requests
+        results[str(count)] = {'seconds': elapsed, 'jobsPerSecond': jobs / elapsed, 'requestsPerJob': requests / jobs}
+    return results
+
+
+def gitRevision():
+    try:
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.check_output(['git', 'describe', '--always', '--dirty'], stderr=devnull,
+                                           cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results, prefix=''):
+    """Yield (name, value) pairs for every metric of a result tree, e.g. ('seedCreate.1000.seconds', 1.5)"""
+    for key, value in sorted(results.items()):
+        if isinstance(value, dict):
+            for item in flatten(value, prefix + key + '.'):
+                yield item
+        else:
+            yield prefix + key, value
+
+
+def compare(baseline, results, tolerance):
+    """Print the change of every metric found in both result trees, return the names of the regressions"""
+
+    before = dict(flatten(baseline))
+    regressions = []
+    print('%-50s %14s %14s %9s' % ('metric', 'baseline', 'current', 'change'))
+    for name, value in flatten(results):
+        old = before.get(name)
+        if not isinstance(old, (int, float)) or not old:
+            continue
+        change = (value - old) / old
+        worse = -change if name.endswith('PerSecond') else change
+        flag = ''
+        if worse > tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print('%-50s %14.6g %14.6g %+8.1f%%%s' % (name, old, value, change * 100, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', nargs='+', choices=Benchmarks, default=Benchmarks, help='benchmarks to run')
+    parser.add_argument('--quick', action='store_true', help='smaller sizes, for a smoke test')
+    parser.add_argument('--calls', type=int, help='Server.call calls, default 5000 (500 with --quick)')
+    parser.add_argument('--jobs', type=int, help='JobClient.create calls, default 2000 (200 with --quick)')
+    parser.add_argument('--urls', type=int, nargs='+',
+                        help='seed list sizes, default 1000 1000000 10000000 (1000 100000 with --quick)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs of serverCall, jobCreate and crawlTransitions, the median of every metric is kept')
+    parser.add_argument('--rounds', type=int, default=20, help='rounds of the crawlTransitions crawl')
+    parser.add_argument('--crawls', type=int, nargs='+', default=[1, 10, 100],
+                        help='numbers of concurrent crawls of crawlScaling')
+    parser.add_argument('--job-duration', type=float, default=0.2, help='seconds every crawlScaling job runs')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare with the results in this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='relative change of a metric counted as a regression, default 0.2')
+    args = parser.parse_args()
+
+    quick = args.quick
+    calls = args.calls or (500 if quick else 5000)
+    jobs = args.jobs or (200 if quick else 2000)
+    urls = args.urls or ([1000, 100000] if quick else [1000, 1000000, 10000000])
+
+    fake = FakeNutchServer().start()
+    try:
+        run = {
+            'serverCall': lambda: repeated(lambda: serverCall(fake.endpoint, calls), args.repeat),
+            'jobCreate': lambda: repeated(lambda: jobCreate(fake.endpoint, jobs), args.repeat),
+            'seedCreate': lambda: seedCreate(urls),
+            'crawlTransitions': lambda: repeated(lambda: crawlTransitions(args.rounds), args.repeat),
+            'crawlScaling': lambda: crawlScaling(args.crawls, args.job_duration, args.job_duration / 4),
+        }
+        results = {}
+        for name in args.only:
+            print('running %s' % name, file=sys.stderr)
+            results[name] = run[name]()
+    finally:
+        fake.close()
+
+    report = {
+        'timestamp': time.time(),
+        'revision': gitRevision(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'parameters': {'calls': calls, 'jobs': jobs, 'urls': urls, 'rounds': args.rounds, 'crawls': args.crawls,
+                       'jobDuration': args.job_duration, 'repeat': args.repeat},
+        'results': results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('parameters') != report['parameters']:
+            print('warning: the baseline was run with other parameters: %s' % baseline.get('parameters'),
+                  file=sys.stderr)
+        regressions = compare(baseline['results'], results, args.tolerance)
+        if regressions:
+            print('%d regression(s): %s' % (len(regressions), ', '.join(regressions)), file=sys.stderr)
+            sys.exit(1)
+    elif not args.output:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,740 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+asyncio client for the Nutch server REST API, mirroring the blocking API in nutch.nutch.
+
+Requires aiohttp (pip install nutch[async]).  Every method that talks to the server is a coroutine:
+
+-- async with AsyncNutch() as nt:
+--     seed = await nt.Seeds().create('my_seeds', ['http://nutch.apache.org'])
+--     crawls = [await nt.Crawl(seed, rounds=2) for i in range(100)]
+--     rounds = await asyncio.gather(*[cc.waitAll() for cc in crawls])
+
+A single event loop can drive many crawls, all sharing the connection pool of one AsyncServer.
+"""
+
+import asyncio
+import contextvars
+from time import time
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .metrics import clock
+from .nutch import (Server, Job, JobInfo, JobPoller, JobRegistry, Config, Seed, ConfigClient, JobClient, SeedClient,
+                    CrawlPhasesMixin, NutchException, NutchCrawlException, DefaultConfig, DefaultServerEndpoint,
+                    DefaultUserAgent, DefaultTimeout, DefaultCallRetries, RetryStatuses, FinalJobStates,
+                    DefaultUpdateWorkers, DefaultUpdateTimeout, ParameterUpdate,
+                    JsonAcceptHeader, TextAcceptHeader, JsonStream, DefaultCompressMinSize, DefaultCompressLevel,
+                    jobsLog, seedsLog, defaultCrawlId, iterSeedFile)
+
+DefaultConnectionLimit = 100
+
+
+async def _iterChunks(stream):
+    # aiohttp streams request bodies from asynchronous iterators only
+    for chunk in stream:
+        yield chunk
+
+
+class AsyncServer(Server):
+    """
+    Implements basic asynchronous interactions with a Nutch RESTful Server
+    """
+
+    def __init__(self, serverEndpoint, raiseErrors=True, limit=DefaultConnectionLimit, limitPerHost=0,
+                 keepAlive=True, compression=None, compressMinSize=DefaultCompressMinSize, compressPaths=(),
+                 compressLevel=DefaultCompressLevel, codec=None, metrics=None, timeout=DefaultTimeout,
+                 retries=DefaultCallRetries, retryBackoff=None, circuitBreaker=True):
+        """
+        Create an AsyncServer object for low-level interactions with a Nutch RESTful Server
+
+        The underlying aiohttp session is opened on the first call, from within the running event loop.
+        Calls beyond the connection limit wait for a free connection instead of failing.
+        Request bodies are compressed, and timeouts, retries, the circuit breaker and deadlines work, as in Server.
+        Deadlines apply to the calls of the task that set them.
+
+        :param serverEndpoint: URL of the server
+        :param raiseErrors: Raise an exception for non-200 status codes
+        :param limit: maximum number of simultaneous connections, 0 for no limit
+        :param limitPerHost: maximum number of simultaneous connections per host, 0 for no limit
+        :param keepAlive: reuse connections between calls, if False every call opens a new connection
+        :param compression: None, or one of CompressionEncodings to compress request bodies with
+        :param compressMinSize: size in bytes from which request bodies are compressed, None for never
+        :param compressPaths: service paths whose request bodies are always compressed
+        :param compressLevel: zlib compression level, 1 (fastest) to 9 (smallest)
+        :param codec: a JsonCodec or the name of one, see Server
+        :param metrics: a metrics.Metrics registry recording the latency and status of every call
+        :param timeout: seconds to wait for a connection and between bytes of a response, see Server
+        :param retries: times a failed GET is sent again, see Server
+        :param retryBackoff: a PollStrategy giving the seconds to wait before every retry, see Server
+        :param circuitBreaker: a CircuitBreaker, True for one with default settings, None for none
+        """
+        if aiohttp is None:
+            raise NutchException("AsyncServer requires aiohttp, install it with: pip install nutch[async]")
+        self._initServer(serverEndpoint, raiseErrors, keepAlive, compression, compressMinSize, compressPaths,
+                         compressLevel, codec, metrics, timeout, retries, retryBackoff, circuitBreaker)
+        # deadlines belong to tasks, not threads
+        self.deadlines = contextvars.ContextVar('deadline', default=None)
+        self.limit = limit
+        self.limitPerHost = limitPerHost
+        self.session = None
+
+    def _session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limitPerHost,
+                                             force_close=not self.keepAlive)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def close(self):
+        """Close all pooled connections to the server"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def __enter__(self):
+        raise TypeError("Use 'async with' with an AsyncServer")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def poller(self):
+        """Return the AsyncJobPoller resolving the futures of AsyncJob.future() for the jobs of this server"""
+
+        with self.lock:
+            if self.jobPoller is None:
+                self.jobPoller = AsyncJobPoller(self)
+            return self.jobPoller
+
+    def _getDeadline(self):
+        return self.deadlines.get()
+
+    def _setDeadline(self, deadline):
+        self.deadlines.set(deadline)
+
+    async def call(self, verb, servicePath, data=None, headers=None, forceText=False, sendJson=True, raw=False):
+        """Call the Nutch Server, do some error checking, and return the response.
+
+        Takes the same arguments as Server.call
+        """
+
+        data, headers = self._prepareRequest(verb, servicePath, data, headers, sendJson)
+        body = self._encodeBody(servicePath, data, headers, sendJson)
+        attempts = self._attempts(verb, servicePath, body)
+        if not isinstance(body, bytes):
+            body = _iterChunks(body)
+
+        # aiohttp transparently decompresses gzip and deflate encoded responses
+        delays = self.retryBackoff.delays()
+        for attempt in range(1, attempts + 1):
+            timeout = self._beforeAttempt(verb, servicePath, attempt) or (None, None)
+            timeout = aiohttp.ClientTimeout(total=None, sock_connect=timeout[0], sock_read=timeout[1])
+            start = clock()
+            try:
+                async with self._session().request(verb, self.serverEndpoint + servicePath, data=body,
+                                                   headers=headers, timeout=timeout) as resp:
+                    content = await resp.read()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+                if self.metrics is not None:
+                    self.metrics.observeCall(verb, servicePath, clock() - start, None)
+                delay = self._afterFailure(verb, servicePath, attempt, attempts, delays, error)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            if self.metrics is not None:
+                self.metrics.observeCall(verb, servicePath, clock() - start, resp.status)
+            if resp.status not in RetryStatuses:
+                self._afterSuccess()
+                break
+            delay = self._afterFailure(verb, servicePath, attempt, attempts, delays, status=resp.status)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+        return self._handleResponse(resp.status, resp.headers, content, forceText, raw)
+
+
+class AsyncJobPoller(JobPoller):
+    """
+    Resolves the asyncio futures of AsyncJob.future() from a single task per AsyncServer, see JobPoller
+
+    The futures, and the task, belong to the event loop running when the first of them was asked for.
+    """
+
+    def _newFuture(self):
+        return asyncio.get_running_loop().create_future()
+
+    def _start(self):
+        self.runner = asyncio.ensure_future(self._run())
+
+    def _setFuture(self, future, info, error):
+        if future.cancelled():
+            return
+        if error is None:
+            future.set_result(info)
+        else:
+            future.set_exception(error)
+
+    async def _run(self):
+        while self._pendingJobs(stop=True):
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except Exception as error:
+                jobsLog.warning('Checking %d jobs failed, trying again in %.1f seconds: %s', self.pending(),
+                                self.interval, error)
+
+    async def tick(self):
+        """Check every job with pending futures and resolve the futures of those done"""
+
+        jobs = self._pendingJobs()
+        if not jobs:
+            return
+        listing = await self.server.call('get', '/job')
+        for job in self._settle(jobs, listing, time()):
+            try:
+                info = JobInfo(await self.server.call('get', '/job/' + job.id))
+            except NutchException as error:
+                if error.status_code == 404:
+                    self._resolve(job, error=error)
+                    continue
+                raise
+            if info.state in FinalJobStates:
+                self._resolve(job, info)
+
+
+class AsyncJob(Job):
+    """
+    Representation of a running Nutch job, use AsyncJobClient to get a list of running jobs or to create one
+    """
+    __slots__ = ()
+
+    async def info(self, maxAge=None):
+        """Get current information about this job, see Job.info"""
+        maxAge = self.ttl if maxAge is None else maxAge
+        if self.snapshot is not None and self.snapshot.age() < maxAge:
+            return self.snapshot
+        return await self.refresh()
+
+    async def refresh(self):
+        """Fetch information about this job from the server, return the new JobInfo"""
+        return self._updateInfo(await self.server.call('get', '/job/' + self.id))
+
+    async def stop(self):
+        self.snapshot = None
+        return await self.server.call('get', '/job/%s/stop' % self.id)
+
+    def future(self):
+        """Return an asyncio.Future resolved with the JobInfo of this job once it is done, see Job.future"""
+        return self.server.poller().watch(self)
+
+    async def abort(self):
+        self.snapshot = None
+        return await self.server.call('get', '/job/%s/abort' % self.id)
+
+
+class AsyncConfig(Config):
+    """
+    Representation of an active Nutch configuration
+
+    Parameters are read with await config[name] or await config.parameter(name) and written with
+    await config.set(name, value).  await config.contains(name) replaces the in operator.  Parameters are not
+    cached, every read asks the server.
+    """
+
+    async def delete(self):
+        return await self.server.call('delete', '/config/' + self.id)
+
+    async def info(self):
+        return await self.server.call('get', '/config/' + self.id)
+
+    async def refresh(self):
+        """Reload all parameters from the server, return them"""
+        return await self.info()
+
+    async def contains(self, item):
+        """Whether the parameter item is set in this configuration"""
+        return item in await self.info()
+
+    def __contains__(self, item):
+        raise TypeError("Use 'await config.contains(name)' with an AsyncConfig")
+
+    async def parameter(self, parameterId):
+        return await self.server.call('get', '/config/%s/%s' % (self.id, parameterId))
+
+    async def __getitem__(self, item):
+        return await self.server.call('get', '/config/%s/%s' % (self.id, item), forceText=True)
+
+    def __setitem__(self, key, value):
+        raise TypeError("Use 'await config.set(key, value)' to set parameters of an AsyncConfig")
+
+    async def set(self, key, value):
+        """
+        Set a parameter of this configuration
+        :param key: the name of the parameter to set
+        :param value: the data associated with this parameter
+        :return: the set value
+        """
+
+        await self.server.call('put', '/config/%s/%s' % (self.id, key), value, sendJson=False)
+        return value
+
+    async def update(self, params, maxWorkers=DefaultUpdateWorkers, timeout=DefaultUpdateTimeout):
+        """
+        Set many parameters at once, sending only the ones that differ from the values on the server
+
+        Works as Config.update, with up to maxWorkers parameters sent at the same time by tasks of the running
+        event loop.  Parameters still being sent after timeout seconds are reported as pending, None waits for
+        all of them.
+        """
+
+        results, changed = self._changedParameters(await self.info(), params)
+        if not changed:
+            return results
+
+        semaphore = asyncio.Semaphore(maxWorkers)
+
+        async def send(key, value):
+            async with semaphore:
+                return await self.set(key, value)
+
+        tasks = dict((asyncio.ensure_future(send(key, value)), key) for key, value in changed.items())
+        # stragglers are not cancelled, they finish in the background
+        done, pending = await asyncio.wait(list(tasks), timeout=timeout)
+
+        for task in done:
+            key = tasks[task]
+            error = task.exception()
+            results[key] = ParameterUpdate(key, 'failed' if error else 'updated', changed[key], error)
+        for task in pending:
+            key = tasks[task]
+            results[key] = ParameterUpdate(key, 'pending', changed[key], None)
+        return results
+
+
+class AsyncConfigClient(ConfigClient):
+    """Asynchronous Nutch Config client, see ConfigClient"""
+
+    async def list(self):
+        configs = await self.server.call('get', '/config')
+        return [AsyncConfig(cid, self.server) for cid in configs]
+
+    async def create(self, cid, configData):
+        """
+        Create a new named (cid) configuration from a parameter dictionary (config_data).
+        """
+        configArgs = {'configId': cid, 'params': configData, 'force': True}
+        cid = await self.server.call('post', "/config/create", configArgs, forceText=True,
+                                     headers=TextAcceptHeader)
+        return AsyncConfig(cid, self.server)
+
+    async def get(self, item):
+        """
+        Get a configuration by name
+        :param item: the name of a configuration
+        :return: the AsyncConfig object if the name is valid, otherwise raise KeyError
+        """
+
+        config = AsyncConfig(item, self.server)
+        if await config.info():
+            return config
+
+        # not found!
+        raise KeyError(item)
+
+    def __getitem__(self, item):
+        return self.get(item)
+
+    def __setitem__(self, key, value):
+        raise TypeError("Use 'await configClient.create(cid, configData)' with an AsyncConfigClient")
+
+
+class AsyncJobClient(JobClient):
+    """Asynchronous Nutch Job client, see JobClient.  The short-hand functions (inject, generate, ...) are awaitable."""
+
+    def __init__(self, server, crawlId, confId, parameters=None, registry=None):
+        registry = registry if registry is not None else JobRegistry(server, AsyncJob)
+        JobClient.__init__(self, server, crawlId, confId, parameters, registry)
+
+    async def _refresh(self):
+        return self.registry.update(await self.server.call('get', '/job'), complete=True)
+
+    async def list(self, allJobs=False):
+        """
+        Return list of jobs at this endpoint.
+
+        Call list(allJobs=True) to see all jobs, not just the ones managed by this Client
+        """
+
+        jobs = await self._refresh()
+        if allJobs:
+            return jobs
+        return self.registry.find(crawlId=self.crawlId, confId=self.confId)
+
+    async def find(self, state=None, jobType=None, refresh=True):
+        """Return the jobs managed by this client in the given state and/or of the given type, see JobClient.find"""
+
+        if refresh:
+            await self._refresh()
+        return JobClient.find(self, state, jobType, refresh=False)
+
+    async def create(self, command, **args):
+        """
+        Create a job given a command
+        :param command: Nutch command, one of nutch.LegalJobs
+        :param args: Additional arguments to pass to the job
+        :return: The created AsyncJob
+        """
+
+        parameters = self._jobParameters(command, args)
+        job_info = await self.server.call('post', "/job/create", parameters, JsonAcceptHeader)
+        job = self.registry.get(job_info['id'], parameters['type'])
+        job.started = time()
+        self.registry.update([job_info], job.started)
+        return job
+
+    async def stats(self):
+        statsArgs = {'confId': self.confId, 'crawlId': self.crawlId, 'type': 'stats', 'args': {}}
+        return await self.server.call('post', '/db/crawldb', statsArgs)
+
+
+class AsyncSeedClient(SeedClient):
+    """Asynchronous Nutch Seed client, see SeedClient"""
+
+    async def create(self, sid, seedList, stream=False, dedup=False):
+        """
+        Create a new named (sid) Seed from a list of seed URLs
+
+        :param sid: the name to assign to the new seed list
+        :param seedList: the list of seeds to use
+        :param stream: upload the seeds as a chunked stream, see SeedClient.create
+        :param dedup: normalize and deduplicate the seeds, see SeedClient.create
+        :return: the created Seed object
+        """
+
+        seedFilter = self._seedFilter(dedup)
+        if seedFilter is not None:
+            duplicates = seedFilter.duplicates
+            seedList = seedFilter.filter(seedList)
+
+        if stream:
+            seedListData = JsonStream(self._seedListChunks(sid, seedList))
+        else:
+            seedListData = self._seedListData(sid, seedList)
+        seedPath = await self.server.call('post', "/seed/create", seedListData, TextAcceptHeader)
+        seed = Seed(sid, seedPath, self.server)
+        if seedFilter is not None:
+            seed.duplicates = seedFilter.duplicates - duplicates
+        seedsLog.info('Created seed list %s at %s, %d duplicates dropped', sid, seedPath, seed.duplicates,
+                      extra={'seedId': sid})
+        return seed
+
+    async def createFromFile(self, sid, filename, stream=False, dedup=False):
+        """
+        Create a new named (sid) Seed from a file containing whitespace separated URLs
+
+        :param sid: the name to assign to the new seed list
+        :param filename: the name of the file that contains URLs
+        :param stream: read and upload the file lazily
+        :param dedup: normalize and deduplicate the seeds, see SeedClient.create
+        :return: the created Seed object
+        """
+
+        if stream:
+            return await self.create(sid, iterSeedFile(filename), stream=True, dedup=dedup)
+        return await self.create(sid, self._readSeedFile(filename), dedup=dedup)
+
+
+class AsyncCrawlClient(CrawlPhasesMixin):
+    def __init__(self, server, seed, jobClient, rounds, index, pollStrategy=None, metrics=None, profiler=None,
+                 pipelined=False, phases=None, checkpoint=None, retryPolicy=None, sampler=None):
+        """Asynchronous Nutch Crawl manager
+
+        Unlike CrawlClient, the seed list is not injected by the constructor, call (and await) start() or use
+        AsyncNutch.Crawl() which does it for you.  progress(), nextRound() and waitAll() are coroutines with the
+        same behaviour as in CrawlClient, waiting with asyncio.sleep() so other crawls keep running.
+        pollStrategy, metrics, profiler, pipelined, phases, checkpoint, retryPolicy and sampler work as in
+        CrawlClient.
+        """
+        self._initCrawl(server, seed, jobClient, rounds, index, pollStrategy, metrics, profiler, pipelined, phases,
+                        checkpoint, retryPolicy, sampler)
+        self.started = seed is None
+
+    async def start(self):
+        """Dispatch injection of the seed list, return the injection job"""
+
+        if not self.started:
+            self.started = True
+            await self._startPhases([(1, self.phaseGraph.inject, 1)])
+        return self.currentJob
+
+    @classmethod
+    async def resume(cls, server, jobClient, checkpoint, pollStrategy=None, metrics=None, profiler=None,
+                     phases=None, retryPolicy=None, sampler=None):
+        """
+        Continue a crawl from its last checkpoint, see CrawlClient.resume
+
+        :param jobClient: an AsyncJobClient with the crawlId and confId of the crawl
+        :return: the AsyncCrawlClient, waitAll() returns the rounds still to complete
+        """
+
+        crawl = cls._fromCheckpoint(server, jobClient, checkpoint, pollStrategy, metrics, profiler, phases,
+                                    retryPolicy, sampler)
+        crawl._findOrphans(await jobClient.list())
+        lost = []
+        for job in list(crawl.activeJobs):
+            try:
+                await job.refresh()
+            except NutchException as error:
+                if error.status_code != 404:
+                    raise
+                lost.append(crawl._lostJob(job))
+        await crawl._startPhases(lost)
+        crawl._resumed()
+        return crawl
+
+    async def _startPhase(self, round, phase, attempt=1):
+        """Start the job of a Phase of round, next to the other active jobs, the caller saves the checkpoint"""
+
+        job = self._adopt(round, phase, attempt)
+        if job is None:
+            requested = time()
+            job = await self.jobClient.create(phase.type, **self._jobArgs(round, phase))
+            self._jobStarted(job, requested, round, attempt)
+        return job
+
+    async def _startPhases(self, starts):
+        """Start the jobs of a transition, a list of (round, Phase, attempt), then save the checkpoint"""
+
+        for round, phase, attempt in starts:
+            await self._startPhase(round, phase, attempt)
+        self._saveCheckpoint()
+
+    async def progress(self, nextRound=True):
+        """
+        Check the status of the active jobs, activate the next jobs of those finished, and return the active job
+
+        :param nextRound: whether to start jobs from the next round if the current job/round is completed.
+        :return: the currently running AsyncJob, or None if no jobs are running.
+        """
+
+        await self.start()
+        for job in list(self.activeJobs):
+            await self._advance(await job.refresh(), nextRound, job)
+        await self._startRetries()
+        return self.currentJob
+
+    async def _startRetries(self):
+        """Start the jobs of retryQueue whose backoff has passed"""
+
+        due = self._dueRetries()
+        if due:
+            await self._startPhases(due)
+
+    async def _advance(self, jobInfo, nextRound=True, job=None):
+        """
+        Given fresh information about an active job, activate the next jobs if it's finished, see _transition()
+
+        :return: the currently running AsyncJob, or None if no jobs are running.
+        """
+
+        starts = self._transition(jobInfo, nextRound, job)
+        if starts is not None:
+            await self._startPhases(starts)
+        return self.currentJob
+
+    async def _sampleStats(self, round, force=False):
+        """Add the crawldb statistics of round to the sampler, if any, when it is due or forced"""
+
+        if not self._samplingDue(force):
+            return
+        try:
+            self.sampler.add(await self.jobClient.stats(), round)
+        except NutchException as error:
+            self._samplingFailed(error)
+
+    async def nextRound(self, deadline=None):
+        """
+        Execute all jobs in the current round and return when they have finished.
+
+        :param deadline: seconds the round may take at most, see CrawlClient.nextRound
+        :return: a list of all completed Jobs
+        """
+
+        with self._deadline(deadline):
+            await self.start()
+            round, starts = self._beginRound()
+            if starts:
+                await self._startPhases(starts)
+            if self.pipelined:
+                await self._waitPipelinedRound(round)
+            else:
+                await self._waitSerialRound(round)
+            await self._sampleStats(round, force=True)
+            return self._endRound(round)
+
+    async def _waitSerialRound(self, round):
+        """Check the job of round and start the next ones until the round is done, in serial mode"""
+
+        activeJob = self.currentJob
+        if activeJob:
+            delays = self._pollDelays(activeJob)
+        while activeJob or self.retryQueue:
+            # without an active job, a failed one waits for its retry
+            await asyncio.sleep(self._waitTime(next(delays) if activeJob else self._retryWait()))
+            oldJob = activeJob
+            activeJob = await self.progress(nextRound=False)  # updates self.currentJob
+            if oldJob:
+                self._countPoll(oldJob)
+            await self._sampleStats(round)
+            if oldJob != activeJob and activeJob:
+                delays = self._pollDelays(activeJob)
+
+    async def _waitPipelinedRound(self, round):
+        """Check the jobs of round and start the next ones until it is done, jobs of the next round keep running"""
+
+        delays = {}
+        due = {}
+        while not self._roundDone(round) and (self.activeJobs or self.retryQueue):
+            job, wait = self._nextCheck(due, delays)
+            await asyncio.sleep(wait)
+            if job is None:
+                await self._startRetries()
+                continue
+            await self._advance(await job.refresh(), True, job)
+            self._countPoll(job)
+            await self._sampleStats(round)
+            self._scheduleCheck(job, due, delays)
+
+    async def waitAll(self, deadline=None):
+        """
+        Execute all queued rounds and return when they have finished.
+
+        :param deadline: seconds all rounds may take at most, see CrawlClient.nextRound
+        :return: a list of jobs completed for each round, organized by round (list-of-lists)
+        """
+
+        finishedRounds = []
+        try:
+            with self._deadline(deadline):
+                while self._roundsLeft():
+                    finishedRounds.append(await self.nextRound())
+        except NutchCrawlException as error:
+            error.completed_jobs = finishedRounds + error.completed_jobs
+            raise
+
+        return finishedRounds
+
+
+class AsyncNutch(object):
+    def __init__(self, confId=DefaultConfig, serverEndpoint=DefaultServerEndpoint, raiseErrors=True,
+                 limit=DefaultConnectionLimit, keepAlive=True, compression=None, metrics=None, profiler=None,
+                 timeout=DefaultTimeout, retries=DefaultCallRetries, circuitBreaker=True, **args):
+        '''
+        Asynchronous Nutch client for interacting with a Nutch instance over its REST API.
+
+        Takes the same arguments as Nutch, with limit bounding the number of simultaneous connections.
+        The configuration is checked when the client is opened:
+
+        -- async with AsyncNutch() as nt:
+        --     cc = await nt.Crawl(seedUrls)
+        --     rounds = await cc.waitAll()
+        '''
+
+        self.confId = confId
+        self.server = AsyncServer(serverEndpoint, raiseErrors, limit=limit, keepAlive=keepAlive,
+                                  compression=compression, metrics=metrics, timeout=timeout, retries=retries,
+                                  circuitBreaker=circuitBreaker)
+        self.metrics = metrics
+        self.profiler = profiler
+        self.registry = JobRegistry(self.server, AsyncJob)
+        self.config = None
+        self.job_parameters = dict()
+        self.job_parameters['confId'] = confId
+        self.job_parameters['args'] = args     # additional config. args as a dictionary
+
+    async def open(self):
+        """Look up the configuration, setting a default user agent if it has none"""
+
+        self.config = await self.Configs().get(self.confId)
+        if 'http.agent.name' not in await self.config.info():
+            await self.config.set('http.agent.name', DefaultUserAgent)
+        return self
+
+    async def close(self):
+        await self.server.close()
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def Jobs(self, crawlId=None):
+        crawlId = crawlId if crawlId else defaultCrawlId()
+        return AsyncJobClient(self.server, crawlId, self.confId, registry=self.registry)
+
+    def Config(self):
+        return self.config
+
+    def Configs(self):
+        return AsyncConfigClient(self.server)
+
+    def Seeds(self):
+        return AsyncSeedClient(self.server)
+
+    async def Crawl(self, seed, seedClient=None, jobClient=None, rounds=1, index=True, pollStrategy=None,
+                    pipelined=False, phases=None, checkpoint=None, retryPolicy=None, sampler=None):
+        """
+        Launch a crawl using the given seed, see Nutch.Crawl
+        :return: a started AsyncCrawlClient to monitor and control the crawl
+        """
+        if seedClient is None:
+            seedClient = self.Seeds()
+        if jobClient is None:
+            jobClient = self.Jobs()
+
+        if type(seed) != Seed:
+            seed = await seedClient.create(jobClient.crawlId + '_seeds', seed)
+        crawl = AsyncCrawlClient(self.server, seed, jobClient, rounds, index, pollStrategy, self.metrics,
+                                 self.profiler, pipelined, phases, checkpoint, retryPolicy, sampler)
+        await crawl.start()
+        return crawl
+
+    async def ResumeCrawl(self, crawlId, checkpoint, pollStrategy=None, phases=None, retryPolicy=None,
+                          sampler=None):
+        """
+        Continue a crawl saved to a checkpoint, see Nutch.ResumeCrawl
+        :return: an AsyncCrawlClient to monitor and control the crawl
+        """
+        state = checkpoint.load(crawlId)
+        confId = state['confId'] if state is not None else self.confId
+        jobClient = AsyncJobClient(self.server, crawlId, confId, registry=self.registry)
+        return await AsyncCrawlClient.resume(self.server, jobClient, checkpoint, pollStrategy, self.metrics,
+                                             self.profiler, phases, retryPolicy, sampler)
+
+    async def getServerStatus(self):
+        return await self.server.call('get', '/admin')
+
+    async def stopServer(self):
+        return await self.server.call('post', '/admin/stop', headers=TextAcceptHeader)
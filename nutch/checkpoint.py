@@ -0,0 +1,120 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Durable stores of the state of crawls, to resume them after the controlling process restarted
+
+A checkpoint is passed to CrawlClient (or to Nutch.Crawl), which saves its state after every job it starts or
+sees done.  After a restart, CrawlClient.resume() (or Nutch.ResumeCrawl) reattaches to the jobs running on the
+server and carries on without repeating finished jobs:
+
+-- checkpoint = SqliteCheckpoint('crawls.db')
+-- nt.Crawl(seedUrls, rounds=20, checkpoint=checkpoint).waitAll()
+-- ... the process dies, and is started again ...
+-- nt.ResumeCrawl(crawlId, checkpoint).waitAll()
+
+States are dicts of JSON values, keyed by crawlId, so one store can hold every crawl of a CrawlManager.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from time import time
+
+try:
+    from .metrics import _atomicWrite
+except (ImportError, ValueError):
+    from metrics import _atomicWrite
+
+
+class FileCheckpoint(object):
+    """
+    Keeps the states of crawls in a JSON file, replaced atomically and synced to disk on every save
+
+    Fine for a few crawls, every save rewrites the states of all of them.
+    """
+
+    def __init__(self, filename):
+        """
+        :param filename: the JSON file, created on the first save
+        """
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.states = {}
+        if os.path.exists(filename):
+            with open(filename) as f:
+                self.states = json.load(f)
+
+    def save(self, crawlId, state):
+        with self.lock:
+            self.states[crawlId] = state
+            _atomicWrite(self.filename, json.dumps(self.states, sort_keys=True), sync=True)
+
+    def load(self, crawlId):
+        """Return the last saved state of a crawl, None if it has none"""
+        with self.lock:
+            return self.states.get(crawlId)
+
+    def remove(self, crawlId):
+        with self.lock:
+            if self.states.pop(crawlId, None) is not None:
+                _atomicWrite(self.filename, json.dumps(self.states, sort_keys=True), sync=True)
+
+    def crawlIds(self):
+        with self.lock:
+            return sorted(self.states)
+
+
+class SqliteCheckpoint(object):
+    """
+    Keeps the states of crawls in an SQLite database, one row per crawl updated in a transaction on every save
+    """
+
+    def __init__(self, filename):
+        """
+        :param filename: the database file, created if needed
+        """
+        self.filename = filename
+        self.lock = threading.Lock()
+        # the lock serializes access, so crawls may be advanced from other threads than this one
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS crawls '
+                                    '(crawlId TEXT PRIMARY KEY, state TEXT NOT NULL, saved REAL NOT NULL)')
+
+    def save(self, crawlId, state):
+        text = json.dumps(state, sort_keys=True)
+        with self.lock, self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO crawls (crawlId, state, saved) VALUES (?, ?, ?)',
+                                    (crawlId, text, time()))
+
+    def load(self, crawlId):
+        """Return the last saved state of a crawl, None if it has none"""
+        with self.lock:
+            row = self.connection.execute('SELECT state FROM crawls WHERE crawlId = ?', (crawlId,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def remove(self, crawlId):
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM crawls WHERE crawlId = ?', (crawlId,))
+
+    def crawlIds(self):
+        with self.lock:
+            return [row[0] for row in self.connection.execute('SELECT crawlId FROM crawls ORDER BY crawlId')]
+
+    def close(self):
+        self.connection.close()
@@ -21,10 +21,13 @@ from __future__ import division
 
 import sys
 import argparse
+import logging
 import nutch
 
-#TODO: set this on when -verbose flag is requested in CLI args
-nutch.Verbose = False
+try:
+    from .stats import StatsSampler
+except (ImportError, ValueError):
+    from stats import StatsSampler
 
 
 class Crawler(object):
@@ -45,9 +48,28 @@ class Crawler(object):
 
         print("Num Rounds "+str(n))
 
-        cc = self.proxy.Crawl(seed=seed_list, rounds=n)
-        rounds = cc.waitAll()
+        retries = self.args.get('retries') or 0
+        retryPolicy = nutch.RetryPolicy(maxAttempts=retries + 1) if retries else None
+        stats_file = self.args.get('stats')
+        sampler = StatsSampler(interval=self.args.get('stats_interval', 60)) if stats_file else None
+        cc = self.proxy.Crawl(seed=seed_list, rounds=n, pipelined=self.args.get('pipelined', False),
+                              retryPolicy=retryPolicy, sampler=sampler)
+        try:
+            rounds = cc.waitAll()
+        finally:
+            # keep the statistics of the rounds done, whether the crawl completed or not
+            if sampler is not None:
+                if stats_file.endswith('.json'):
+                    sampler.writeJson(stats_file)
+                else:
+                    sampler.writeCsv(stats_file)
         print("Completed %d rounds" % len(rounds))
+        if cc.pipelined:
+            print("Saved %.1f seconds by pipelining rounds" % sum(cc.roundSavings))
+        if sampler is not None:
+            for r in sampler.rounds():
+                if r['rate'] is not None:
+                    print("Round %d fetched %d URLs, %.2f per second" % (r['round'], r['delta'], r['rate']))
         return len(rounds)
 
     def load_xml_conf(self, xml_file, id):
@@ -103,10 +125,23 @@ def main(argv=sys.argv):
     
     crawl_parser.add_argument("-ci", "--conf-id", help="Config Identifier", required=True)
     crawl_parser.add_argument('-n', '--num-rounds', required=True, type=int, help='Number of rounds/iterations')
+    crawl_parser.add_argument('-p', '--pipelined', action='store_true',
+                              help='Generate and fetch the next round while the previous round is indexed')
+    crawl_parser.add_argument('-r', '--retries', type=int, default=0,
+                              help='Number of times a failed or killed job is started again')
+    crawl_parser.add_argument('-s', '--stats', metavar='FILE',
+                              help='Write the crawldb statistics of the crawl over time to FILE, CSV or .json')
+    crawl_parser.add_argument('--stats-interval', type=float, default=60,
+                              help='Seconds between crawldb statistics samples, at least')
 
     parser.add_argument('-u', '--url', help='Nutch Server URL', default=nutch.DefaultServerEndpoint)
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help='Log the progress of the crawl, and with -vv the requests and responses to the server')
     
     args = vars(parser.parse_args(argv))
+    logLevels = [logging.WARNING, logging.INFO, logging.DEBUG]
+    logging.basicConfig(level=logLevels[min(args['verbose'], len(logLevels) - 1)],
+                        format='%(asctime)s %(name)s %(levelname)s %(message)s')
 
     res = None
     crawler = Crawler(args)
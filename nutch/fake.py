@@ -0,0 +1,413 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+In-process stand-in for the Nutch REST server, for tests and load simulations without Nutch, Hadoop or Java
+
+FakeNutch simulates the server: configurations, seed lists, jobs going from RUNNING to FINISHED, FAILED or KILLED
+after a configurable duration, and a crawldb per crawl whose counts follow the jobs.  FakeNutchServer serves it
+over HTTP on the loopback interface, in a background thread:
+
+-- with FakeNutchServer(jobDuration=0.1) as fake:
+--     nt = Nutch(serverEndpoint=fake.endpoint)
+--     rounds = nt.Crawl(['http://nutch.apache.org'], rounds=2).waitAll()
+
+Implemented endpoints: /admin, /admin/stop, /config, /config/create, /config/{id}, /config/{id}/{param},
+/job, /job/create, /job/{id}, /job/{id}/stop, /job/{id}/abort, /seed/create and /db/crawldb.
+"""
+
+from __future__ import division
+
+import itertools
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+from time import sleep, time
+import zlib
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, unquote, urlsplit
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import unquote
+    from urlparse import parse_qs, urlsplit
+
+# a few of the parameters of nutch-default.xml
+DefaultParameters = {
+    'db.fetch.interval.default': '2592000',
+    'db.fetch.interval.max': '7776000',
+    'fetcher.threads.fetch': '10',
+    'generate.max.count': '-1',
+    'http.agent.name': '',
+    'http.content.limit': '65536',
+    'plugin.includes': 'protocol-http|urlfilter-regex|parse-(html|tika)|index-(basic|anchor)|indexer-solr|'
+                       'scoring-opic|urlnormalizer-(pass|regex|basic)',
+}
+
+
+class FakeResponse(object):
+    """Status, content type and body of an answer of FakeNutch"""
+    __slots__ = ('status', 'contentType', 'body')
+
+    def __init__(self, status, body, contentType='application/json'):
+        self.status = status
+        self.contentType = contentType
+        if contentType == 'application/json':
+            body = json.dumps(body)
+        self.body = body.encode('utf-8') if not isinstance(body, bytes) else body
+
+
+class FakeJob(object):
+    """A simulated job, its state is settled from its deadline whenever it is looked at"""
+    __slots__ = ('id', 'type', 'crawlId', 'confId', 'args', 'state', 'msg', 'finishAt', 'outcome', 'settled')
+
+    def __init__(self, jid, jobType, crawlId, confId, args, finishAt, outcome):
+        self.id = jid
+        self.type = jobType
+        self.crawlId = crawlId
+        self.confId = confId
+        self.args = args
+        self.state = 'RUNNING'
+        self.msg = 'OK'
+        self.finishAt = finishAt
+        self.outcome = outcome
+        self.settled = False
+
+    def info(self):
+        return {'id': self.id, 'type': self.type, 'confId': self.confId, 'args': self.args, 'result': None,
+                'state': self.state, 'msg': self.msg, 'crawlId': self.crawlId}
+
+
+class FakeNutch(object):
+    """
+    Simulated Nutch REST server, thread safe and independent of the transport, see FakeNutchServer
+
+    Job durations and failure rates are either a number for every job type, a dict mapping job types to numbers
+    (missing types use 0), or a function of the job type.
+    """
+
+    def __init__(self, jobDuration=0, failureRate=0, errorRate=0, latency=0, stopDelay=1, outlinksPerPage=0,
+                 seed=None, seedDir=None, clock=time):
+        """
+        :param jobDuration: seconds a job runs before it is done
+        :param failureRate: probability of a job ending FAILED instead of FINISHED
+        :param errorRate: probability of any request being answered with a 500 error
+        :param latency: seconds to wait before answering any request
+        :param stopDelay: seconds a stopped job stays STOPPING before it is KILLED
+        :param outlinksPerPage: new URLs added to the crawldb for every fetched URL by UPDATEDB
+        :param seed: seed of the random number generator, for reproducible failures
+        :param seedDir: where to write the uploaded seed lists, by default a temporary directory
+        :param clock: function returning the current time in seconds
+        """
+        self.jobDuration = jobDuration
+        self.failureRate = failureRate
+        self.errorRate = errorRate
+        self.latency = latency
+        self.stopDelay = stopDelay
+        self.outlinksPerPage = outlinksPerPage
+        self.random = random.Random(seed)
+        self.clock = clock
+        self.startDate = int(clock() * 1000)
+
+        self.ownSeedDir = seedDir is None
+        self.seedDir = tempfile.mkdtemp(prefix='fake_nutch_seeds_') if seedDir is None else seedDir
+        self.lock = threading.Lock()
+        self.configs = {'default': dict(DefaultParameters)}
+        self.jobs = {}
+        self.seedLists = {}  # seed path -> number of URLs
+        self.crawldbs = {}   # crawlId -> counts, see _crawldb()
+        self.jobIds = itertools.count()
+        self.seedIds = itertools.count()
+        self.requests = 0
+
+    def close(self):
+        """Remove the seed lists written to the temporary directory"""
+        if self.ownSeedDir:
+            shutil.rmtree(self.seedDir, ignore_errors=True)
+
+    @staticmethod
+    def _perType(setting, jobType):
+        if callable(setting):
+            return setting(jobType)
+        if isinstance(setting, dict):
+            return setting.get(jobType, 0)
+        return setting
+
+    def handle(self, verb, path, body=b''):
+        """
+        Answer a request
+
+        :param verb: the HTTP verb, e.g. 'get'
+        :param path: the path of the request, with its query string
+        :param body: the (decompressed) request body as bytes
+        :return: a FakeResponse
+        """
+
+        if self.latency:
+            sleep(self.latency)
+        with self.lock:
+            self.requests += 1
+            if self.errorRate and self.random.random() < self.errorRate:
+                return FakeResponse(500, 'Simulated server error', 'text/plain')
+
+        url = urlsplit(path)
+        parts = [unquote(part) for part in url.path.strip('/').split('/')]
+        query = dict((key, values[-1]) for key, values in parse_qs(url.query).items())
+        text = body.decode('utf-8') if body else ''
+        verb = verb.lower()
+
+        # POST bodies are JSON, PUT bodies are plain text parameter values, other bodies are ignored
+        data = text
+        if verb == 'post' and text:
+            try:
+                data = json.loads(text)
+            except ValueError:
+                return FakeResponse(400, 'Malformed JSON body', 'text/plain')
+
+        with self.lock:
+            route = getattr(self, '_%s_%s' % (verb, parts[0]), None)
+            if route is None:
+                return FakeResponse(404, 'No such resource: %s %s' % (verb.upper(), url.path), 'text/plain')
+            return route(parts[1:], query, data)
+
+    # /admin
+
+    def _get_admin(self, parts, query, data):
+        jobs = [self._settle(job).info() for job in self.jobs.values()]
+        return FakeResponse(200, {'startDate': self.startDate, 'configuration': sorted(self.configs),
+                                  'jobs': jobs, 'runningJobs': [job for job in jobs if job['state'] == 'RUNNING']})
+
+    def _post_admin(self, parts, query, data):
+        if parts != ['stop']:
+            return FakeResponse(404, 'No such resource', 'text/plain')
+        return FakeResponse(200, 'Stopping NutchServer', 'text/plain')
+
+    # /config
+
+    def _get_config(self, parts, query, data):
+        if not parts or parts == ['']:
+            return FakeResponse(200, sorted(self.configs))
+        params = self.configs.get(parts[0], {})
+        if len(parts) == 1:
+            return FakeResponse(200, params)
+        if parts[1] not in params:
+            return FakeResponse(204, '', 'text/plain')
+        return FakeResponse(200, params[parts[1]], 'text/plain')
+
+    def _post_config(self, parts, query, data):
+        if parts != ['create']:
+            return FakeResponse(404, 'No such resource', 'text/plain')
+        cid = data['configId']
+        if cid in self.configs and not data.get('force'):
+            return FakeResponse(400, 'Config already exists: %s' % cid, 'text/plain')
+        params = dict(DefaultParameters)
+        params.update((key, '%s' % value) for key, value in (data.get('params') or {}).items())
+        self.configs[cid] = params
+        return FakeResponse(200, cid, 'text/plain')
+
+    def _put_config(self, parts, query, data):
+        if len(parts) != 2 or parts[0] not in self.configs:
+            return FakeResponse(404, 'No such config', 'text/plain')
+        self.configs[parts[0]][parts[1]] = data
+        return FakeResponse(200, '', 'text/plain')
+
+    def _delete_config(self, parts, query, data):
+        self.configs.pop(parts[0], None)
+        return FakeResponse(200, '', 'text/plain')
+
+    # /seed
+
+    def _post_seed(self, parts, query, data):
+        if parts != ['create']:
+            return FakeResponse(404, 'No such resource', 'text/plain')
+        seedPath = os.path.join(self.seedDir, '%s-%d' % (data.get('name', 'seed'), next(self.seedIds)))
+        os.makedirs(seedPath)
+        urls = [seedUrl['url'] for seedUrl in data.get('seedUrls', [])]
+        with open(os.path.join(seedPath, 'seed.txt'), 'w') as f:
+            f.write(''.join(url + '\n' for url in urls))
+        self.seedLists[seedPath] = len(urls)
+        return FakeResponse(200, seedPath, 'text/plain')
+
+    # /job
+
+    def _get_job(self, parts, query, data):
+        if not parts or parts == ['']:
+            crawlId = query.get('crawlId')
+            return FakeResponse(200, [self._settle(job).info() for job in self.jobs.values()
+                                      if crawlId is None or job.crawlId == crawlId])
+        job = self.jobs.get(parts[0])
+        if job is None:
+            return FakeResponse(404, 'No such job: %s' % parts[0], 'text/plain')
+        self._settle(job)
+        if len(parts) == 1:
+            return FakeResponse(200, job.info())
+        if parts[1] == 'stop':
+            if job.state != 'RUNNING':
+                return FakeResponse(200, False)
+            job.state = 'STOPPING'
+            job.outcome = 'KILLED'
+            job.finishAt = self.clock() + self.stopDelay
+            return FakeResponse(200, True)
+        if parts[1] == 'abort':
+            if job.state not in ('RUNNING', 'STOPPING'):
+                return FakeResponse(200, False)
+            job.state = job.outcome = 'KILLED'
+            job.msg = 'Aborted'
+            job.settled = True
+            return FakeResponse(200, True)
+        return FakeResponse(404, 'No such resource', 'text/plain')
+
+    def _post_job(self, parts, query, data):
+        if parts != ['create']:
+            return FakeResponse(404, 'No such resource', 'text/plain')
+        jobType = data.get('type', '').upper()
+        crawlId = data.get('crawlId')
+        jid = '%s-%s-%d' % (crawlId, jobType, next(self.jobIds))
+        outcome = 'FAILED' if self.random.random() < self._perType(self.failureRate, jobType) else 'FINISHED'
+        job = FakeJob(jid, jobType, crawlId, data.get('confId', 'default'), data.get('args') or {},
+                      self.clock() + self._perType(self.jobDuration, jobType), outcome)
+        self.jobs[jid] = job
+        return FakeResponse(200, job.info())
+
+    def _settle(self, job):
+        """Finish the job if its time has come, applying its effects to the crawldb"""
+
+        if job.settled or self.clock() < job.finishAt:
+            return job
+        job.settled = True
+        job.state = job.outcome
+        if job.outcome == 'FAILED':
+            job.msg = 'Simulated failure'
+        elif job.outcome == 'FINISHED':
+            self._apply(job)
+        return job
+
+    def _crawldb(self, crawlId):
+        return self.crawldbs.setdefault(crawlId, {'unfetched': 0, 'fetched': 0, 'generated': 0})
+
+    def _apply(self, job):
+        crawldb = self._crawldb(job.crawlId)
+        if job.type == 'INJECT':
+            crawldb['unfetched'] += self.seedLists.get(job.args.get('url_dir'), 0)
+        elif job.type == 'GENERATE':
+            topN = int(job.args.get('topN', -1))
+            crawldb['generated'] = crawldb['unfetched'] if topN < 0 else min(topN, crawldb['unfetched'])
+        elif job.type == 'UPDATEDB':
+            fetched = crawldb['generated']
+            crawldb['unfetched'] += fetched * self.outlinksPerPage - fetched
+            crawldb['fetched'] += fetched
+            crawldb['generated'] = 0
+
+    # /db
+
+    def _post_db(self, parts, query, data):
+        if parts != ['crawldb']:
+            return FakeResponse(404, 'No such resource', 'text/plain')
+        crawlId = data.get('crawlId')
+        for job in self.jobs.values():
+            if job.crawlId == crawlId:
+                self._settle(job)
+        crawldb = self._crawldb(crawlId)
+        return FakeResponse(200, {
+            'crawlId': crawlId,
+            'totalUrls': crawldb['unfetched'] + crawldb['fetched'],
+            'status': {'db_unfetched': crawldb['unfetched'], 'db_fetched': crawldb['fetched']},
+            'minScore': 0.0, 'maxScore': 1.0, 'avgScore': 0.5,
+        })
+
+
+class FakeNutchHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            body = b''.join(chunks)
+        else:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers.get('Content-Encoding') in ('gzip', 'deflate'):
+            # wbits 32 + MAX_WBITS accepts both gzip and zlib (HTTP deflate) streams
+            body = zlib.decompress(body, 32 + zlib.MAX_WBITS)
+        return body
+
+    def _handle(self):
+        response = self.server.fake.handle(self.command, self.path, self._body())
+        self.send_response(response.status)
+        self.send_header('Content-Type', response.contentType)
+        self.send_header('Content-Length', str(len(response.body)))
+        self.end_headers()
+        self.wfile.write(response.body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeNutchServer(ThreadingMixIn, HTTPServer):
+    """
+    Serves a FakeNutch over HTTP on the loopback interface, from a background thread
+
+    Use it as a context manager, or call start() and close().  The simulation is available as self.fake.
+    """
+    daemon_threads = True
+
+    def __init__(self, fake=None, port=0, **args):
+        """
+        :param fake: the FakeNutch to serve, by default one created with args
+        :param port: the port to listen on, by default any free port
+        :param args: arguments of FakeNutch
+        """
+        HTTPServer.__init__(self, ('127.0.0.1', port), FakeNutchHandler)
+        self.fake = fake if fake is not None else FakeNutch(**args)
+        self.thread = None
+
+    @property
+    def endpoint(self):
+        return 'http://127.0.0.1:%d' % self.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def close(self):
+        if self.thread is not None:
+            self.shutdown()
+            self.thread = None
+        self.server_close()
+        self.fake.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,233 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+In-process metrics of the REST calls and crawl jobs of a Nutch client
+
+A Metrics registry is passed to Server and CrawlClient (or to Nutch, which passes it on) and can be exported
+at any time as a Prometheus text file or a JSON snapshot, no metrics service is needed:
+
+-- metrics = Metrics()
+-- nt = Nutch(metrics=metrics)
+-- nt.Crawl(seedUrls, rounds=2).waitAll()
+-- metrics.writePrometheus('/var/lib/node_exporter/nutch.prom')
+"""
+
+from bisect import bisect_left
+import json
+import os
+import tempfile
+import threading
+from time import time
+
+try:
+    from time import perf_counter as clock
+except ImportError:
+    from time import time as clock  # Python 2
+
+RequestBuckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PhaseBuckets = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200, 14400, 43200)
+# services whose paths name a job, configuration or seed list after the service
+IdServices = frozenset(['job', 'config', 'seed'])
+
+
+def endpointTemplate(servicePath):
+    """
+    Return the template of a service path, with ids replaced by placeholders
+
+    e.g. '/job/crawl-FETCH-1' gives '/job/{id}' and '/config/default/http.agent.name' gives '/config/{id}/{param}'.
+    Only the services in IdServices take ids, other paths such as '/db/crawldb' or '/admin/stop' are kept.
+    """
+
+    parts = servicePath.split('/')
+    if len(parts) < 3 or parts[1] not in IdServices or parts[2] == 'create':
+        return servicePath
+    parts[2] = '{id}'
+    if parts[1] == 'config' and len(parts) > 3:
+        parts[3] = '{param}'
+    return '/'.join(parts)
+
+
+class Histogram(object):
+    """Counts of observed values in fixed buckets, with their sum, as a Prometheus histogram"""
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds):
+        """
+        :param bounds: the sorted upper bounds of the buckets, a last bucket without upper bound is added
+        """
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def cumulative(self):
+        """Return a list of (upper bound, number of values up to it) pairs, ending with ('+Inf', count)"""
+
+        result = []
+        total = 0
+        for bound, count in zip(list(self.bounds) + ['+Inf'], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+def _labels(**labels):
+    escape = lambda value: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join('%s="%s"' % (key, escape(labels[key])) for key in sorted(labels))
+
+
+def _atomicWrite(filename, text, sync=False):
+    # scrapers must never see a half written file, with sync the new file also survives a crash of the machine
+    fd, tmpname = tempfile.mkstemp(prefix='.' + os.path.basename(filename), dir=os.path.dirname(filename) or '.')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        getattr(os, 'replace', os.rename)(tmpname, filename)
+    except Exception:
+        os.remove(tmpname)
+        raise
+
+
+class Metrics(object):
+    """
+    Registry of request latencies and errors per verb and endpoint template, job status checks per phase,
+    and job durations per phase
+
+    Recording a value takes a few microseconds and is thread safe.
+    """
+
+    def __init__(self, requestBuckets=RequestBuckets, phaseBuckets=PhaseBuckets):
+        """
+        :param requestBuckets: upper bounds in seconds of the request latency histogram buckets
+        :param phaseBuckets: upper bounds in seconds of the job duration histogram buckets
+        """
+        self.requestBuckets = requestBuckets
+        self.phaseBuckets = phaseBuckets
+        self.lock = threading.Lock()
+        self.requests = {}  # (verb, endpoint) -> Histogram
+        self.errors = {}    # (verb, endpoint, status) -> count
+        self.polls = {}     # phase -> count
+        self.phases = {}    # phase -> Histogram
+        self.started = time()
+
+    def observeCall(self, verb, servicePath, seconds, status):
+        """
+        Record a call to the server
+
+        :param verb: the HTTP verb, e.g. 'get'
+        :param servicePath: the path called, e.g. '/job/crawl-FETCH-1'
+        :param seconds: the time the call took
+        :param status: the HTTP status of the response, None if no response was received
+        """
+
+        endpoint = endpointTemplate(servicePath)
+        with self.lock:
+            key = (verb, endpoint)
+            histogram = self.requests.get(key)
+            if histogram is None:
+                histogram = self.requests[key] = Histogram(self.requestBuckets)
+            histogram.observe(seconds)
+            if status != 200:
+                key = (verb, endpoint, 'none' if status is None else str(status))
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def countPoll(self, phase):
+        """Record a status check of a job of type phase"""
+
+        with self.lock:
+            self.polls[phase] = self.polls.get(phase, 0) + 1
+
+    def observePhase(self, phase, seconds):
+        """Record the time between the start of a job of type phase and the first status check finding it done"""
+
+        with self.lock:
+            histogram = self.phases.get(phase)
+            if histogram is None:
+                histogram = self.phases[phase] = Histogram(self.phaseBuckets)
+            histogram.observe(seconds)
+
+    def snapshot(self):
+        """Return all metrics as a dict, ready to be dumped as JSON"""
+
+        def histogram(h, **labels):
+            labels.update(count=h.count, sum=h.sum, buckets=[[str(bound), count] for bound, count in h.cumulative()])
+            return labels
+
+        with self.lock:
+            return {
+                'started': self.started,
+                'timestamp': time(),
+                'requests': [histogram(h, verb=verb, endpoint=endpoint)
+                             for (verb, endpoint), h in sorted(self.requests.items())],
+                'errors': [{'verb': verb, 'endpoint': endpoint, 'status': status, 'count': count}
+                           for (verb, endpoint, status), count in sorted(self.errors.items())],
+                'polls': dict(self.polls),
+                'phases': [histogram(h, phase=phase) for phase, h in sorted(self.phases.items())],
+            }
+
+    def prometheus(self):
+        """Return all metrics in the Prometheus text exposition format"""
+
+        lines = []
+
+        def histogram(name, h, **labels):
+            for bound, count in h.cumulative():
+                lines.append('%s_bucket{%s} %d' % (name, _labels(le=bound, **labels), count))
+            lines.append('%s_sum{%s} %r' % (name, _labels(**labels), h.sum))
+            lines.append('%s_count{%s} %d' % (name, _labels(**labels), h.count))
+
+        with self.lock:
+            lines.append('# HELP nutch_request_duration_seconds Latency of calls to the Nutch REST server')
+            lines.append('# TYPE nutch_request_duration_seconds histogram')
+            for (verb, endpoint), h in sorted(self.requests.items()):
+                histogram('nutch_request_duration_seconds', h, verb=verb, endpoint=endpoint)
+
+            lines.append('# HELP nutch_request_errors_total Calls to the Nutch REST server not answered with 200')
+            lines.append('# TYPE nutch_request_errors_total counter')
+            for (verb, endpoint, status), count in sorted(self.errors.items()):
+                lines.append('nutch_request_errors_total{%s} %d' % (
+                    _labels(verb=verb, endpoint=endpoint, status=status), count))
+
+            lines.append('# HELP nutch_job_polls_total Status checks of running jobs')
+            lines.append('# TYPE nutch_job_polls_total counter')
+            for phase, count in sorted(self.polls.items()):
+                lines.append('nutch_job_polls_total{%s} %d' % (_labels(phase=phase), count))
+
+            lines.append('# HELP nutch_job_duration_seconds Time from the start of a job until it was seen done')
+            lines.append('# TYPE nutch_job_duration_seconds histogram')
+            for phase, h in sorted(self.phases.items()):
+                histogram('nutch_job_duration_seconds', h, phase=phase)
+
+        return '\n'.join(lines) + '\n'
+
+    def writePrometheus(self, filename):
+        """Atomically write prometheus() to filename, e.g. for the textfile collector of node_exporter"""
+        _atomicWrite(filename, self.prometheus())
+
+    def writeJson(self, filename):
+        """Atomically write snapshot() as JSON to filename"""
+        _atomicWrite(filename, json.dumps(self.snapshot(), indent=2, sort_keys=True))
@@ -57,12 +57,49 @@ To see the status of jobs, use:
 """
 
 import collections
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime
 import getopt
 from getpass import getuser
+import json
+import logging
+import os
+import random
 import requests
+from requests.adapters import HTTPAdapter
 import sys
-from time import sleep
+import threading
+from time import sleep, time
+import warnings
+import zlib
+
+try:
+    from .metrics import clock
+    from .phases import Phase, PhaseGraph, lastRound
+    from .seeds import SeedFilter, shardSeeds, shardSeedsToFiles
+    from .stats import StatsSampler
+except (ImportError, ValueError):
+    # run as a script, or imported as a top-level module by crawl.py
+    from metrics import clock
+    from phases import Phase, PhaseGraph, lastRound
+    from seeds import SeedFilter, shardSeeds, shardSeedsToFiles
+    from stats import StatsSampler
+
+try:
+    from sys import intern
+except ImportError:
+    pass  # Python 2, intern is a builtin
+
+try:
+    import reprlib
+except ImportError:
+    import repr as reprlib
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping  # Python 2
 
 DefaultServerHost = "localhost"
 DefaultPort = "8081"
@@ -74,7 +111,25 @@ LegalJobs = ['INJECT', 'GENERATE', 'FETCH', 'PARSE', 'UPDATEDB',
              'CRAWL', 'DEDUP', 'INVERTLINKS', 'INDEX']
 RequestVerbs = {'get': requests.get, 'put': requests.put, 'post': requests.post, 'delete': requests.delete}
 
+DefaultPoolConnections = 10
+DefaultPoolMaxSize = 10
+DefaultJobInfoTTL = 0.5
+DefaultPollerInterval = 1      # seconds between the job listings of a JobPoller
+DefaultUpdateWorkers = 8
+DefaultStreamChunkSize = 64 * 1024
+DefaultCompressMinSize = 16 * 1024
+DefaultCompressLevel = 6
+DefaultTimeout = (10, 120)      # seconds to connect, and to wait for the server between bytes of a response
+DefaultCallRetries = 2          # times a GET is sent again after a connection error, timeout or server error
+DefaultUpdateTimeout = DefaultTimeout[1]  # seconds Config.update waits for the changed parameters
+RetryStatuses = frozenset([500, 502, 503, 504])
+FinalJobStates = frozenset(['FINISHED', 'FAILED', 'KILLED'])
+JobControlActions = frozenset(['stop', 'abort'])  # GET /job/{id}/{action}, not idempotent
+
+CompressionEncodings = ('gzip', 'deflate')
+
 TextSendHeader = {'Content-Type': 'text/plain'}
+JsonSendHeader = {'Content-Type': 'application/json'}
 TextAcceptHeader = {'Accept': 'text/plain'}
 JsonAcceptHeader = {'Accept': 'application/json'}
 
@@ -88,16 +143,63 @@ class NutchCrawlException(NutchException):
     completed_jobs = []
 
 
-# TODO: Replace with Python logger
+class NutchServerUnavailable(NutchException):
+    """Raised instead of calling the server while the circuit breaker of the Server is open"""
+
+
+class NutchDeadlineExceeded(NutchCrawlException):
+    """Raised when the deadline of a call or crawl has passed, the jobs keep running and the crawl can carry on"""
+
+
+# Request and response details are logged at DEBUG level, e.g. logging.getLogger('nutch.server').setLevel('DEBUG')
+serverLog = logging.getLogger('nutch.server')
+jobsLog = logging.getLogger('nutch.jobs')
+crawlLog = logging.getLogger('nutch.crawl')
+seedsLog = logging.getLogger('nutch.seeds')
+logging.getLogger('nutch').addHandler(logging.NullHandler())
+
+# Deprecated and ignored, set the level of the nutch loggers instead
 Verbose = True
 
+# maximum length of a payload in log messages
+LogPayloadSize = 500
+
+_payloadRepr = reprlib.Repr()
+_payloadRepr.maxlevel = 3
+_payloadRepr.maxdict = _payloadRepr.maxlist = _payloadRepr.maxtuple = 10
+_payloadRepr.maxstring = _payloadRepr.maxother = 80
+
+
+class LogPayload(object):
+    """
+    A request or response payload in a log message, only formatted if the message is emitted
+
+    Large lists and strings are cut short, the result is at most LogPayloadSize characters long.
+    """
+    __slots__ = ('payload',)
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def __str__(self):
+        payload = self.payload
+        if isinstance(payload, (bytes, str)):
+            text = repr(payload[:LogPayloadSize]) if len(payload) > LogPayloadSize else repr(payload)
+        else:
+            text = _payloadRepr.repr(payload)
+        if len(text) > LogPayloadSize:
+            text = text[:LogPayloadSize] + '...'
+        return text
+
 
 def echo2(*s):
     sys.stderr.write('nutch.py: ' + ' '.join(map(str, s)) + '\n')
 
 
 def warn(*s):
-    echo2('Warn:', *s)
+    """Deprecated, log a warning with the nutch logger instead"""
+    warnings.warn('nutch.warn() is deprecated, use logging', DeprecationWarning, stacklevel=2)
+    logging.getLogger('nutch').warning(' '.join(map(str, s)))
 
 
 def die(*s):
@@ -106,6 +208,122 @@ def die(*s):
     sys.exit()
 
 
+class JsonStream(object):
+    """
+    A request body made of already encoded JSON chunks, produced lazily
+
+    Server.call sends it with chunked transfer encoding, without ever holding the whole body in memory.
+    The chunks are only produced once, a JsonStream can't be sent twice.
+    """
+
+    def __init__(self, chunks):
+        """
+        :param chunks: an iterable of bytes which concatenated form a JSON document
+        """
+        self.chunks = chunks
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def __repr__(self):
+        return 'JsonStream(...)'
+
+
+def _compressor(encoding, level):
+    # a gzip wrapper for gzip, a zlib stream for deflate as HTTP defines it (RFC 9110)
+    wbits = zlib.MAX_WBITS | 16 if encoding == 'gzip' else zlib.MAX_WBITS
+    return zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+
+def compressBody(body, encoding, level=DefaultCompressLevel):
+    """
+    Compress a request body
+
+    :param body: the body, as bytes
+    :param encoding: one of CompressionEncodings
+    :param level: zlib compression level, 1 (fastest) to 9 (smallest)
+    :return: the compressed bytes
+    """
+    compressor = _compressor(encoding, level)
+    return compressor.compress(body) + compressor.flush()
+
+
+def compressChunks(chunks, encoding, level=DefaultCompressLevel):
+    """Lazily compress a body made of chunks of bytes, see compressBody()"""
+
+    compressor = _compressor(encoding, level)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def mediaType(contentType):
+    """Return the media type of a Content-Type header, without parameters such as charset"""
+    return contentType.split(';', 1)[0].strip().lower()
+
+
+def contentCharset(contentType, default='utf-8'):
+    """Return the charset parameter of a Content-Type header, or default"""
+
+    for param in contentType.split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset':
+            return value.strip().strip('"')
+    return default
+
+
+# a JSON implementation used by Server: dumps(obj) returns UTF-8 encoded bytes, loads() accepts bytes
+JsonCodec = collections.namedtuple('JsonCodec', ['name', 'dumps', 'loads'])
+
+
+def _orjsonCodec():
+    import orjson
+    return JsonCodec('orjson', orjson.dumps, orjson.loads)
+
+
+def _ujsonCodec():
+    import ujson
+    return JsonCodec('ujson', lambda obj: ujson.dumps(obj, ensure_ascii=False).encode('utf-8'), ujson.loads)
+
+
+def _simplejsonCodec():
+    import simplejson
+    return JsonCodec('simplejson', lambda obj: simplejson.dumps(obj).encode('utf-8'), simplejson.loads)
+
+
+def _stdlibCodec():
+    return JsonCodec('json', lambda obj: json.dumps(obj).encode('utf-8'), json.loads)
+
+
+# fastest first
+JsonCodecs = collections.OrderedDict([('orjson', _orjsonCodec), ('ujson', _ujsonCodec),
+                                      ('simplejson', _simplejsonCodec), ('json', _stdlibCodec)])
+
+
+def jsonCodec(name=None):
+    """
+    Return a JsonCodec
+
+    :param name: one of JsonCodecs, None for the fastest one installed, the standard library json module at worst
+    """
+
+    if name is not None:
+        if name not in JsonCodecs:
+            raise NutchException('JSON codec must be one of %s' % str(list(JsonCodecs)))
+        try:
+            return JsonCodecs[name]()
+        except ImportError:
+            raise NutchException('JSON codec %s is not installed' % name)
+
+    for factory in JsonCodecs.values():
+        try:
+            return factory()
+        except ImportError:
+            pass
+
+
 def defaultCrawlId():
     """
     Provide a reasonable default crawl name using the user name and date
@@ -116,76 +334,380 @@ def defaultCrawlId():
     return '_'.join(('crawl', user, timestamp))
 
 
+class CircuitBreaker(object):
+    """
+    Stops calling a server that keeps failing
+
+    After failures consecutive calls failed with a connection error, a timeout or a server error, the circuit
+    opens: calls raise NutchServerUnavailable at once, without reaching the server, for resetAfter seconds.
+    Then a single call is let through, closing the circuit if it succeeds and opening it again if it fails.
+    A call retried by the Server counts once, as failed when its last attempt failed.
+    """
+
+    def __init__(self, failures=5, resetAfter=30, clock=time):
+        """
+        :param failures: consecutive failed calls opening the circuit
+        :param resetAfter: seconds to wait before trying the server again
+        :param clock: function returning the current time in seconds
+        """
+        self.failures = failures
+        self.resetAfter = resetAfter
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.consecutive = 0
+        self.openedAt = None
+
+    @property
+    def state(self):
+        """'closed', 'open', or 'half-open' once a call may try the server again"""
+        with self.lock:
+            if self.openedAt is None:
+                return 'closed'
+            return 'open' if self.clock() - self.openedAt < self.resetAfter else 'half-open'
+
+    def before(self, verb, servicePath):
+        """Check the circuit before a call, raising NutchServerUnavailable while it is open"""
+
+        with self.lock:
+            if self.openedAt is None:
+                return
+            waited = self.clock() - self.openedAt
+            if waited < self.resetAfter:
+                raise NutchServerUnavailable('Not calling %s %s, the server failed %d calls in a row, trying again '
+                                             'in %.1f seconds' % (verb.upper(), servicePath, self.consecutive,
+                                                                  self.resetAfter - waited))
+            # let this call through, the others wait until it tells whether the server is back
+            self.openedAt = self.clock()
+
+    def succeeded(self):
+        with self.lock:
+            if self.openedAt is not None:
+                serverLog.info('Server is back, closing the circuit')
+            self.consecutive = 0
+            self.openedAt = None
+
+    def failed(self):
+        with self.lock:
+            self.consecutive += 1
+            if self.consecutive >= self.failures:
+                if self.openedAt is None:
+                    serverLog.warning('Server failed %d calls in a row, not calling it for %.1f seconds',
+                                      self.consecutive, self.resetAfter)
+                self.openedAt = self.clock()
+
+
 class Server:
     """
     Implements basic interactions with a Nutch RESTful Server
     """
 
-    def __init__(self, serverEndpoint, raiseErrors=True):
+    def __init__(self, serverEndpoint, raiseErrors=True, poolConnections=DefaultPoolConnections,
+                 poolMaxSize=DefaultPoolMaxSize, keepAlive=True, compression=None,
+                 compressMinSize=DefaultCompressMinSize, compressPaths=(), compressLevel=DefaultCompressLevel,
+                 codec=None, metrics=None, timeout=DefaultTimeout, retries=DefaultCallRetries, retryBackoff=None,
+                 circuitBreaker=True):
         """
         Create a Server object for low-level interactions with a Nutch RESTful Server
 
+        Requests are sent over a persistent connection pool owned by this Server.  Call close(), or use the
+        Server as a context manager, to release the pooled connections.
+
+        With compression set, request bodies of at least compressMinSize bytes, streamed bodies (see JsonStream)
+        and every body sent to one of compressPaths are compressed and sent with a Content-Encoding header.
+        Use compressMinSize=None to only compress the bodies sent to compressPaths.  The server, or a proxy in
+        front of it, must accept compressed requests.  Compressed responses are always accepted.
+
+        GETs reading from the server are sent again after a connection error, a timeout or a 5xx response, up to
+        retries times, waiting for the delays of retryBackoff in between.  Other calls, and the GETs stopping or
+        aborting a job, are sent once.  Every call ends by the deadline set with deadline(), if any.
+
         :param serverEndpoint: URL of the server
         :param raiseErrors: Raise an exception for non-200 status codes
+        :param poolConnections: number of per-host connection pools to cache
+        :param poolMaxSize: maximum number of connections kept open per host
+        :param keepAlive: reuse connections between calls, if False every call opens a new connection
+        :param compression: None, or one of CompressionEncodings to compress request bodies with
+        :param compressMinSize: size in bytes from which request bodies are compressed, None for never
+        :param compressPaths: service paths, e.g. '/seed/create', whose request bodies are always compressed
+        :param compressLevel: zlib compression level, 1 (fastest) to 9 (smallest)
+        :param codec: a JsonCodec or the name of one, by default the fastest JSON library installed, see jsonCodec()
+        :param metrics: a metrics.Metrics registry recording the latency and status of every call
+        :param timeout: seconds to wait for a connection and between bytes of a response, as a (connect, read)
+                        tuple or a single number for both, None to wait forever
+        :param retries: times a failed GET is sent again, 0 to never retry
+        :param retryBackoff: a PollStrategy giving the seconds to wait before every retry,
+                             by default BackoffPoll(initial=0.5, maximum=5, firstCheck=0.1)
+        :param circuitBreaker: a CircuitBreaker, True for one with default settings, None for none
 
         """
+        self._initServer(serverEndpoint, raiseErrors, keepAlive, compression, compressMinSize, compressPaths,
+                         compressLevel, codec, metrics, timeout, retries, retryBackoff, circuitBreaker)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=poolConnections, pool_maxsize=poolMaxSize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _initServer(self, serverEndpoint, raiseErrors, keepAlive, compression, compressMinSize, compressPaths,
+                    compressLevel, codec, metrics, timeout, retries, retryBackoff, circuitBreaker):
+        """Set up everything but the connections to the server, shared with AsyncServer, see __init__()"""
+
+        if compression is not None and compression not in CompressionEncodings:
+            raise NutchException('Request compression must be one of %s' % str(CompressionEncodings))
         self.serverEndpoint = serverEndpoint
         self.raiseErrors = raiseErrors
+        self.keepAlive = keepAlive
+        self.compression = compression
+        self.compressMinSize = compressMinSize
+        self.compressPaths = frozenset(compressPaths)
+        self.compressLevel = compressLevel
+        self.codec = codec if isinstance(codec, JsonCodec) else jsonCodec(codec)
+        self.metrics = metrics
+        self.timeout = timeout if timeout is None or isinstance(timeout, tuple) else (timeout, timeout)
+        self.retries = retries
+        self.retryBackoff = retryBackoff if retryBackoff is not None else \
+            BackoffPoll(initial=0.5, maximum=5, firstCheck=0.1)
+        self.circuitBreaker = CircuitBreaker() if circuitBreaker is True else circuitBreaker
+        self.deadlines = threading.local()
+        self.lock = threading.Lock()
+        self.jobPoller = None
+
+    def close(self):
+        """Close all pooled connections to the server"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def poller(self):
+        """Return the JobPoller resolving the futures of Job.future() for the jobs of this server"""
+
+        with self.lock:
+            if self.jobPoller is None:
+                self.jobPoller = JobPoller(self)
+            return self.jobPoller
+
+    def _getDeadline(self):
+        return getattr(self.deadlines, 'deadline', None)
+
+    def _setDeadline(self, deadline):
+        self.deadlines.deadline = deadline
+
+    @contextmanager
+    def deadline(self, deadline):
+        """
+        Make every call of this thread within the block end by deadline, or raise NutchDeadlineExceeded
+
+        Deadlines nest, the earliest one applies.
+
+        :param deadline: the time, as returned by time.time(), None for no deadline
+        """
+
+        previous = self._getDeadline()
+        if deadline is not None and previous is not None:
+            deadline = min(deadline, previous)
+        self._setDeadline(deadline if deadline is not None else previous)
+        try:
+            yield
+        finally:
+            self._setDeadline(previous)
 
-    def call(self, verb, servicePath, data=None, headers=None, forceText=False, sendJson=True):
+    def remaining(self):
+        """Return the seconds left until the current deadline, None if there is none"""
+
+        deadline = self._getDeadline()
+        return None if deadline is None else deadline - time()
+
+    def call(self, verb, servicePath, data=None, headers=None, forceText=False, sendJson=True, raw=False):
         """Call the Nutch Server, do some error checking, and return the response.
 
         :param verb: One of nutch.RequestVerbs
         :param servicePath: path component of URL to append to endpoint, e.g. '/config'
-        :param data: Data to attach to this request
+        :param data: Data to attach to this request, a JsonStream is streamed to the server as it is produced
         :param headers: headers to attach to this request, default are JsonAcceptHeader
         :param forceText: don't trust the response headers and just get the text
         :param sendJson: Whether to treat attached data as JSON or not
+        :param raw: return the body of the response as bytes, without decoding it
+        """
+
+        data, headers = self._prepareRequest(verb, servicePath, data, headers, sendJson)
+        body = self._encodeBody(servicePath, data, headers, sendJson)
+
+        # without keep-alive every call goes through a throw-away connection
+        verbFn = getattr(self.session, verb) if self.keepAlive else RequestVerbs[verb]
+        attempts = self._attempts(verb, servicePath, body)
+        delays = self.retryBackoff.delays()
+        for attempt in range(1, attempts + 1):
+            timeout = self._beforeAttempt(verb, servicePath, attempt)
+            start = clock()
+            try:
+                resp = verbFn(self.serverEndpoint + servicePath, data=body, headers=headers, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if self.metrics is not None:
+                    self.metrics.observeCall(verb, servicePath, clock() - start, None)
+                delay = self._afterFailure(verb, servicePath, attempt, attempts, delays, error)
+                if delay is None:
+                    raise
+                sleep(delay)
+                continue
+            if self.metrics is not None:
+                self.metrics.observeCall(verb, servicePath, clock() - start, resp.status_code)
+            if resp.status_code not in RetryStatuses:
+                self._afterSuccess()
+                break
+            delay = self._afterFailure(verb, servicePath, attempt, attempts, delays, status=resp.status_code)
+            if delay is None:
+                break
+            sleep(delay)
+
+        # requests transparently decompresses gzip and deflate encoded responses
+        return self._handleResponse(resp.status_code, resp.headers, resp.content, forceText, raw)
+
+    def _attempts(self, verb, servicePath, body):
         """
+        The number of times a call may be sent, shared with AsyncServer
+
+        GETs with a body that can be sent again are retried, except those stopping or aborting a job: Nutch
+        serves them as GETs, but they change the state of the job.
+        """
+
+        if verb != 'get' or not isinstance(body, bytes):
+            return 1
+        if servicePath.startswith('/job/') and servicePath.rsplit('/', 1)[-1] in JobControlActions:
+            return 1
+        return 1 + self.retries
+
+    def _beforeAttempt(self, verb, servicePath, attempt=1):
+        """
+        Check the circuit breaker and the deadline before sending a call, shared with AsyncServer
+
+        The circuit breaker is checked before the first attempt only, the retries of a call let through go on.
+
+        :return: the (connect, read) timeout of the call, shortened to end by the deadline, or None
+        """
+
+        if self.circuitBreaker is not None and attempt == 1:
+            self.circuitBreaker.before(verb, servicePath)
+        remaining = self.remaining()
+        if remaining is None:
+            return self.timeout
+        if remaining <= 0:
+            raise NutchDeadlineExceeded('Deadline passed before %s %s' % (verb.upper(), servicePath))
+        if self.timeout is None:
+            return (remaining, remaining)
+        return tuple(min(limit, remaining) if limit is not None else remaining for limit in self.timeout)
+
+    def _afterSuccess(self):
+        if self.circuitBreaker is not None:
+            self.circuitBreaker.succeeded()
+
+    def _afterFailure(self, verb, servicePath, attempt, attempts, delays, error=None, status=None):
+        """
+        Record an attempt of a call failing with a connection error or timeout, or a 5xx status, shared with
+        AsyncServer.  The circuit breaker counts the call as failed once it gives up.
+
+        :param delays: the retry backoff of the call, an iterator from retryBackoff.delays()
+        :return: the seconds to wait before sending the call again, None to give up
+        """
+
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            if self.circuitBreaker is not None:
+                self.circuitBreaker.failed()
+            raise NutchDeadlineExceeded('Deadline passed during %s %s: %s' % (verb.upper(), servicePath,
+                                                                              error or status))
+        if attempt >= attempts:
+            if self.circuitBreaker is not None:
+                self.circuitBreaker.failed()
+            return None
+        delay = next(delays)
+        if remaining is not None:
+            delay = min(delay, remaining)
+        serverLog.warning('%s %s failed with %s, sending it again in %.1f seconds (attempt %d of %d)',
+                          verb.upper(), servicePath, error or status, delay, attempt + 1, attempts,
+                          extra={'verb': verb, 'servicePath': servicePath, 'status': status})
+        return delay
+
+    def _prepareRequest(self, verb, servicePath, data, headers, sendJson):
+        """Fill in default data and headers for a call and validate the verb, shared with AsyncServer"""
 
         default_data = {} if sendJson else ""
         data = data if data else default_data
 
-        headers = headers if headers else JsonAcceptHeader.copy()
-
-        if not sendJson:
-            headers.update(TextSendHeader)
+        # never modify the caller's headers, they are often one of the module level constants
+        headers = dict(headers) if headers else JsonAcceptHeader.copy()
+        headers.update(JsonSendHeader if sendJson else TextSendHeader)
 
         if verb not in RequestVerbs:
             die('Server call verb must be one of %s' % str(RequestVerbs.keys()))
-        if Verbose:
-            echo2("%s Endpoint:" % verb.upper(), servicePath)
-            echo2("%s Request data:" % verb.upper(), data)
-            echo2("%s Request headers:" % verb.upper(), headers)
-        verbFn = RequestVerbs[verb]
-
-        if sendJson:
-            resp = verbFn(self.serverEndpoint + servicePath, json=data, headers=headers)
-        else:
-            resp = verbFn(self.serverEndpoint + servicePath, data=data, headers=headers)
+        if serverLog.isEnabledFor(logging.DEBUG):
+            serverLog.debug('%s %s data=%s headers=%s', verb.upper(), servicePath, LogPayload(data), headers,
+                            extra={'verb': verb, 'servicePath': servicePath})
+        return data, headers
+
+    def _encodeBody(self, servicePath, data, headers, sendJson):
+        """
+        Encode (and maybe compress) the body of a call, shared with AsyncServer
 
-        if Verbose:
-            echo2("Response headers:", resp.headers)
-            echo2("Response status:", resp.status_code)
-        if resp.status_code != 200:
+        Adds a Content-Encoding header to headers when the body is compressed.
+
+        :return: the body as bytes, or as an iterator of bytes for a JsonStream
+        """
+
+        if isinstance(data, JsonStream):
+            body, size = iter(data), None
+        else:
+            body = self.codec.dumps(data) if sendJson else data
+            if not isinstance(body, bytes):
+                body = body.encode('utf-8')
+            size = len(body)
+
+        encoding = self._compression(servicePath, size)
+        if encoding is None:
+            return body
+        headers['Content-Encoding'] = encoding
+        if size is None:
+            return compressChunks(body, encoding, self.compressLevel)
+        return compressBody(body, encoding, self.compressLevel)
+
+    def _compression(self, servicePath, size):
+        """Return the encoding to compress a body of size bytes (None for a stream) with, or None"""
+
+        if self.compression is None:
+            return None
+        if servicePath in self.compressPaths:
+            return self.compression
+        if self.compressMinSize is not None and (size is None or size >= self.compressMinSize):
+            return self.compression
+        return None
+
+    def _handleResponse(self, status, respHeaders, content, forceText, raw=False):
+        """Check the status of a response and decode its body (bytes) exactly once, shared with AsyncServer"""
+
+        if serverLog.isEnabledFor(logging.DEBUG):
+            serverLog.debug('Response %d headers=%s body=%s', status, dict(respHeaders), LogPayload(content),
+                            extra={'status': status})
+        if status != 200:
             if self.raiseErrors:
-                error = NutchException("Unexpected server response: %d" % resp.status_code)
-                error.status_code = resp.status_code
+                error = NutchException("Unexpected server response: %d" % status)
+                error.status_code = status
                 raise error
             else:
-                warn('Nutch server returned status:', resp.status_code)
-        if forceText or 'content-type' not in resp.headers or resp.headers['content-type'] == 'text/plain':
-            if Verbose:
-                echo2("Response text:", resp.text)
-            return resp.text
-
-        content_type = resp.headers['content-type']
-        if content_type == 'application/json' and not forceText:
-            if Verbose:
-                echo2("Response JSON:", resp.json())
-            return resp.json()
+                serverLog.warning('Nutch server returned status: %d', status, extra={'status': status})
+        if raw:
+            return content
+
+        header = respHeaders.get('content-type', 'text/plain')
+        content_type = mediaType(header)
+        if forceText or content_type == 'text/plain':
+            return content.decode(contentCharset(header), 'replace')
+
+        if content_type == 'application/json':
+            return self.codec.loads(content)
         else:
-            die('Did not understand server response: %s' % resp.headers)
+            die('Did not understand server response: %s' % respHeaders)
 
 defaultServer = lambda: Server(DefaultServerEndpoint)
 
@@ -194,6 +716,8 @@ class IdEqualityMixin(object):
     """
     Mix-in class to use self.id == other.id to check for equality
     """
+    __slots__ = ()
+
     def __eq__(self, other):
         return (isinstance(other, self.__class__)
             and self.id == other.id)
@@ -201,49 +725,430 @@ class IdEqualityMixin(object):
     def __ne__(self, other):
         return not self.__eq__(other)
 
+    def __hash__(self):
+        return hash(self.id)
+
+
+class JobInfo(dict):
+    """
+    Snapshot of the information about a job as returned by the server, remembering when it was fetched
+    """
+    __slots__ = ('fetched',)
+
+    def __init__(self, info, fetched=None):
+        dict.__init__(self, info)
+        self.fetched = time() if fetched is None else fetched
+
+    @property
+    def state(self):
+        return self.get('state')
+
+    @property
+    def type(self):
+        return self.get('type')
+
+    def age(self):
+        """Seconds since this snapshot was fetched"""
+        return time() - self.fetched
+
 
 class Job(IdEqualityMixin):
     """
     Representation of a running Nutch job, use JobClient to get a list of running jobs or to create one
+
+    The last JobInfo fetched is kept in self.snapshot.  info() reuses it while it is younger than ttl seconds,
+    refresh() always asks the server.  The JobRegistry holding the job, if any, is told of every new snapshot.
     """
+    __slots__ = ('id', 'server', 'type', 'ttl', 'snapshot', 'started', 'registry')
 
-    def __init__(self, jid, server):
+    def __init__(self, jid, server, jobType=None, ttl=DefaultJobInfoTTL):
         self.id = jid
         self.server = server
+        self.type = jobType
+        self.ttl = ttl
+        self.snapshot = None
+        # when this client created the job, None for jobs only seen listed
+        self.started = None
+        self.registry = None
+
+    def info(self, maxAge=None):
+        """
+        Get current information about this job
 
-    def info(self):
-        """Get current information about this job"""
-        return self.server.call('get', '/job/' + self.id)
+        :param maxAge: accept a cached snapshot up to this many seconds old, by default self.ttl
+        :return: a JobInfo
+        """
+        maxAge = self.ttl if maxAge is None else maxAge
+        if self.snapshot is not None and self.snapshot.age() < maxAge:
+            return self.snapshot
+        return self.refresh()
+
+    def refresh(self):
+        """Fetch information about this job from the server, return the new JobInfo"""
+        return self._updateInfo(self.server.call('get', '/job/' + self.id))
+
+    def _updateInfo(self, info, fetched=None):
+        """Store info about this job obtained from the server, e.g. from a GET /job listing"""
+        self.snapshot = JobInfo(info, fetched)
+        if self.type is None:
+            self.type = self.snapshot.type
+        if self.registry is not None:
+            self.registry._reindex(self)
+        return self.snapshot
 
     def stop(self):
+        self.snapshot = None
         return self.server.call('get', '/job/%s/stop' % self.id)
 
     def abort(self):
+        self.snapshot = None
         return self.server.call('get', '/job/%s/abort' % self.id)
 
+    def future(self):
+        """
+        Return a concurrent.futures.Future resolved with the JobInfo of this job once it is done
+
+        The futures of all the jobs of a server are resolved by a single JobPoller, checking all of them with
+        one GET /job per tick, so any number of jobs can be waited on with concurrent.futures.wait() or
+        as_completed().  Jobs that failed or were killed resolve their futures as well, check the state of the
+        result.  Jobs unknown to the server fail their futures with a NutchException.
+
+        -- done, running = wait([job.future() for job in jobs], return_when=FIRST_COMPLETED)
+        """
+        return self.server.poller().watch(self)
+
+
+class JobPoller(object):
+    """
+    Resolves the futures of Job.future() from a single background thread per Server
+
+    Every tick lists the jobs with one GET /job, however many futures are pending, and resolves the futures of
+    the jobs in one of FinalJobStates with their JobInfo.  Jobs missing from the listing are asked for one by one.
+    The thread runs while futures are pending, a failed listing is logged and tried again on the next tick.
+    The JobInfo of the futures is not stored in the Jobs, which may be indexed by a JobRegistry.
+    """
+
+    def __init__(self, server, interval=DefaultPollerInterval):
+        """
+        :param server: the Server the jobs are running on
+        :param interval: seconds between ticks
+        """
+        self.server = server
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.watched = {}       # job id -> (Job, futures)
+        self.runner = None
+        self.ticks = 0
+
+    def _newFuture(self):
+        return Future()
+
+    def _start(self):
+        self.runner = threading.Thread(target=self._run, name='nutch-job-poller')
+        self.runner.daemon = True
+        self.runner.start()
+
+    def watch(self, job):
+        """Return a new future resolved with the JobInfo of job once it is done"""
+
+        future = self._newFuture()
+        if job.snapshot is not None and job.snapshot.state in FinalJobStates:
+            future.set_result(job.snapshot)
+            return future
+        with self.lock:
+            self.watched.setdefault(job.id, (job, []))[1].append(future)
+            if self.runner is None:
+                self._start()
+        return future
+
+    def pending(self):
+        """Return the number of futures not resolved yet"""
+        with self.lock:
+            return sum(len(futures) for job, futures in self.watched.values())
+
+    def _pendingJobs(self, stop=False):
+        """
+        Forget the cancelled futures and return the jobs with futures pending
+
+        :param stop: forget the runner if no future is pending, for it to stop
+        """
+
+        with self.lock:
+            for jid, (job, futures) in list(self.watched.items()):
+                futures[:] = [future for future in futures if not future.cancelled()]
+                if not futures:
+                    del self.watched[jid]
+            if stop and not self.watched:
+                self.runner = None
+            return [job for job, futures in self.watched.values()]
+
+    def _resolve(self, job, info=None, error=None):
+        """Resolve the futures of a job with its info or an error, return their number"""
+
+        with self.lock:
+            job, futures = self.watched.pop(job.id, (job, []))
+        for future in futures:
+            self._setFuture(future, info, error)
+        return len(futures)
+
+    def _setFuture(self, future, info, error):
+        # cancel() may run in another thread until the future is marked running
+        if not future.set_running_or_notify_cancel():
+            return
+        if error is None:
+            future.set_result(info)
+        else:
+            future.set_exception(error)
+
+    def _settle(self, jobs, listing, fetched):
+        """Resolve the futures of the jobs done in listing, return the jobs missing from it"""
+
+        listed = dict((info['id'], info) for info in listing)
+        missing = []
+        for job in jobs:
+            if job.id not in listed:
+                missing.append(job)
+            elif listed[job.id].get('state') in FinalJobStates:
+                self._resolve(job, JobInfo(listed[job.id], fetched))
+        self.ticks += 1
+        return missing
+
+    def _run(self):
+        while self._pendingJobs(stop=True):
+            sleep(self.interval)
+            try:
+                self.tick()
+            except Exception as error:
+                jobsLog.warning('Checking %d jobs failed, trying again in %.1f seconds: %s', self.pending(),
+                                self.interval, error)
+
+    def tick(self):
+        """Check every job with pending futures and resolve the futures of those done"""
+
+        jobs = self._pendingJobs()
+        if not jobs:
+            return
+        listing = self.server.call('get', '/job')
+        for job in self._settle(jobs, listing, time()):
+            try:
+                info = JobInfo(self.server.call('get', '/job/' + job.id))
+            except NutchException as error:
+                if error.status_code == 404:
+                    self._resolve(job, error=error)
+                    continue
+                raise
+            if info.state in FinalJobStates:
+                self._resolve(job, info)
+
+
+class JobRegistry(object):
+    """
+    Client-side identity map of the jobs on a Nutch server
+
+    Holds one Job object per job id, indexed by crawlId, confId, state and type.  refresh() updates every job
+    from a single GET /job, re-indexing only the jobs whose state changed, so questions like "all RUNNING jobs
+    of crawl X" are answered by find() without further requests.  Jobs refreshed on their own are re-indexed
+    as well.  The values a job is indexed under are kept apart from its snapshot, which stop() and abort() drop.
+    """
+
+    IndexedFields = ('crawlId', 'confId', 'state', 'type')
+
+    def __init__(self, server, jobClass=None):
+        """
+        :param server: the Server the jobs are running on
+        :param jobClass: the class of the Job objects to create, by default Job
+        """
+        self.server = server
+        self.jobClass = jobClass if jobClass else Job
+        self.jobs = {}
+        self.indexes = dict((field, {}) for field in self.IndexedFields)
+        self.indexed = {}       # job id -> the values of IndexedFields the job is indexed under
+        self.refreshed = None
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def __iter__(self):
+        return iter(self.jobs.values())
+
+    def __contains__(self, job):
+        return getattr(job, 'id', job) in self.jobs
+
+    def get(self, jid, jobType=None):
+        """Return the Job with the given id, creating it if it is not known yet"""
+
+        job = self.jobs.get(jid)
+        if job is None:
+            job = self.jobs[jid] = self.jobClass(jid, self.server, jobType)
+            job.registry = self
+        return job
+
+    def _index(self, job, values, add=True):
+        for field, value in zip(self.IndexedFields, values):
+            bucket = self.indexes[field].setdefault(value, {})
+            if add:
+                bucket[job.id] = job
+            else:
+                bucket.pop(job.id, None)
+
+    def _reindex(self, job):
+        """Move job to the index entries of its snapshot, if they changed"""
+
+        values = tuple(job.snapshot.get(field) for field in self.IndexedFields)
+        old = self.indexed.get(job.id)
+        if old == values:
+            return
+        if old is not None:
+            self._index(job, old, add=False)
+        self._index(job, values)
+        self.indexed[job.id] = values
+
+    def update(self, jobInfos, fetched=None, complete=False):
+        """
+        Update the registry with information about jobs as returned by the server
+
+        :param jobInfos: an iterable of job info dicts
+        :param fetched: when the information was fetched, by default now
+        :param complete: jobInfos lists every job on the server, forget jobs that are not in it
+        :return: the updated Jobs
+        """
+
+        fetched = time() if fetched is None else fetched
+        updated = []
+        for info in jobInfos:
+            # many jobs share these values, keep a single copy of each, leaving the caller's dicts alone
+            info = dict(info)
+            for field in self.IndexedFields:
+                if isinstance(info.get(field), str):
+                    info[field] = intern(info[field])
+            job = self.get(info['id'])
+            job._updateInfo(info, fetched)  # re-indexes the job
+            updated.append(job)
+
+        if complete:
+            seen = set(job.id for job in updated)
+            for jid in [jid for jid in self.jobs if jid not in seen]:
+                self.remove(self.jobs[jid])
+            self.refreshed = fetched
+        return updated
+
+    def add(self, job):
+        """Register a Job created elsewhere, return the Job registered under its id"""
+
+        known = self.jobs.get(job.id)
+        if known is None:
+            known = self.jobs[job.id] = job
+            job.registry = self
+            if job.snapshot is not None:
+                self._reindex(job)
+        elif job.snapshot is not None and known.snapshot is None:
+            known._updateInfo(job.snapshot, job.snapshot.fetched)
+        return known
+
+    def remove(self, job):
+        job = self.jobs.pop(job.id)
+        job.registry = None
+        values = self.indexed.pop(job.id, None)
+        if values is not None:
+            self._index(job, values, add=False)
+
+    def refresh(self):
+        """Update every job from a single GET /job, return the listed Jobs"""
+        return self.update(self.server.call('get', '/job'), complete=True)
+
+    def find(self, **criteria):
+        """
+        Return the known jobs matching all the given criteria, e.g. find(crawlId='crawl1', state='RUNNING')
+
+        Jobs that were never fetched from the server can't be matched.
+        """
+
+        if not criteria:
+            return list(self.jobs.values())
+        for field in criteria:
+            if field not in self.indexes:
+                raise NutchException("Can't search jobs by %s, use one of %s" % (field, ', '.join(self.IndexedFields)))
+        buckets = sorted((self.indexes[field].get(value, {}) for field, value in criteria.items()), key=len)
+        return [job for jid, job in buckets[0].items() if all(jid in bucket for bucket in buckets[1:])]
+
+
+ParameterUpdate = collections.namedtuple('ParameterUpdate', ['key', 'status', 'value', 'error'])
+
+
+def parameterText(value):
+    """Return a configuration parameter value the way the server stores and returns it, as text"""
+    return '%s' % value
+
 
 class Config(IdEqualityMixin):
     """
     Representation of an active Nutch configuration
 
     Use ConfigClient to get a list of configurations or create a new one
+
+    With cache=True the full parameter map is loaded once from info() and parameters are read from it without
+    further requests.  Parameters set through this object are written through to the cache, as the text the
+    server returns for them, see parameterText().  The cache expires
+    after ttl seconds (never if ttl is None), or explicitly with invalidate() or refresh().
     """
 
-    def __init__(self, cid, server):
+    def __init__(self, cid, server, cache=False, ttl=None):
         self.id = cid
         self.server = server
+        self.cache = cache
+        self.ttl = ttl
+        self.params = None
+        self.loaded = None
 
     def __str__(self):
         return "Config(id:%s, ...)" %self.id
 
     def delete(self):
+        self.invalidate()
         return self.server.call('delete', '/config/' + self.id)
 
     def info(self):
-        return self.server.call('get', '/config/' + self.id)
+        params = self.server.call('get', '/config/' + self.id)
+        if self.cache:
+            self.params = params
+            self.loaded = time()
+            # write-throughs change the cached map, not the one handed out
+            return dict(params)
+        return params
+
+    def refresh(self):
+        """Reload all parameters from the server into the cache, return a copy of them"""
+        self.invalidate()
+        return self.info()
+
+    def invalidate(self):
+        """Drop the cached parameters, they will be reloaded on the next read"""
+        self.params = None
+        self.loaded = None
+
+    def _cached(self):
+        """
+        Return the cached parameter map, loading it if needed, or None if caching is disabled
+
+        The map itself is returned for the reads of this Config, it is never handed out to callers.
+        """
+
+        if not self.cache:
+            return None
+        if self.params is None or (self.ttl is not None and time() - self.loaded >= self.ttl):
+            self.info()
+        return self.params
 
     def parameter(self, parameterId):
-        return self.server.call('get', '/config/%s/%s' % (self.id, parameterId))
+        params = self._cached()
+        if params is None:
+            return self.server.call('get', '/config/%s/%s' % (self.id, parameterId))
+        return self._cachedParameter(params, parameterId)
+
+    def _cachedParameter(self, params, parameterId):
+        if parameterId not in params:
+            raise NutchException("Parameter %s is not set in configuration %s" % (parameterId, self.id))
+        return params[parameterId]
 
     def __getitem__(self, item):
         """
@@ -252,7 +1157,14 @@ class Config(IdEqualityMixin):
         :return: the parameter if the name is valid, otherwise raise NutchException
         """
 
-        return self.server.call('get', '/config/%s/%s' % (self.id, item), forceText=True)
+        params = self._cached()
+        if params is None:
+            return self.server.call('get', '/config/%s/%s' % (self.id, item), forceText=True)
+        return self._cachedParameter(params, item)
+
+    def __contains__(self, item):
+        params = self._cached()
+        return item in (self.info() if params is None else params)
 
     def __setitem__(self, key, value):
         """
@@ -263,8 +1175,60 @@ class Config(IdEqualityMixin):
         """
 
         self.server.call('put', '/config/%s/%s' % (self.id, key), value, sendJson=False)
+        if self.params is not None:
+            self.params[key] = parameterText(value)
         return value
 
+    def _changedParameters(self, current, params):
+        """
+        Split params into those equal to the current values on the server and those to send
+
+        :return: a dict of ParameterUpdates of the unchanged parameters, and a dict of the changed ones
+        """
+
+        results = {}
+        changed = {}
+        for key, value in params.items():
+            if key in current and current[key] == parameterText(value):
+                results[key] = ParameterUpdate(key, 'unchanged', value, None)
+            else:
+                changed[key] = value
+        return results, changed
+
+    def update(self, params, maxWorkers=DefaultUpdateWorkers, timeout=DefaultUpdateTimeout):
+        """
+        Set many parameters at once, sending only the ones that differ from the values on the server
+
+        The current values are fetched with a single info(), then the changed parameters are sent concurrently
+        by up to maxWorkers threads.  A failed parameter doesn't stop the others.
+
+        :param params: a dict-like object of parameter names and values
+        :param maxWorkers: the maximum number of parameters sent at the same time
+        :param timeout: seconds to wait for the changed parameters, those still being sent are reported as pending,
+                        by default the read timeout of the server, None waits until every parameter is sent
+        :return: a dict mapping each name in params to a ParameterUpdate(key, status, value, error), where status
+                 is 'unchanged', 'updated', 'failed' (error holds the exception) or 'pending'
+        """
+
+        results, changed = self._changedParameters(self.info(), params)
+        if not changed:
+            return results
+
+        executor = ThreadPoolExecutor(max_workers=min(maxWorkers, len(changed)))
+        futures = dict((executor.submit(self.__setitem__, key, value), key) for key, value in changed.items())
+        done, pending = wait(futures, timeout=timeout)
+        # don't wait for the stragglers, they finish in the background
+        executor.shutdown(wait=False)
+
+        for future in done:
+            key = futures[future]
+            error = future.exception()
+            results[key] = ParameterUpdate(key, 'failed' if error else 'updated', changed[key], error)
+        for future in pending:
+            key = futures[future]
+            results[key] = ParameterUpdate(key, 'pending', changed[key], None)
+        return results
+
 
 class Seed(IdEqualityMixin):
     """
@@ -273,25 +1237,34 @@ class Seed(IdEqualityMixin):
     Use SeedClient to get a list of seed lists or create a new one
     """
 
-    def __init__(self, sid, seedPath, server):
+    def __init__(self, sid, seedPath, server, duplicates=0):
         self.id = sid
         self.seedPath = seedPath
         self.server = server
+        # the number of duplicate URLs dropped before upload, see SeedClient.create
+        self.duplicates = duplicates
 
 
 class ConfigClient:
-    def __init__(self, server):
+    def __init__(self, server, cache=False, ttl=None):
         """Nutch Config client
 
         List named configurations, create new ones, or delete them with methods to get the list of named
         configurations, get parameters for a named configuration, get an individual parameter of a named
         configuration, create a new named configuration using a parameter dictionary, and delete a named configuration.
+
+        cache and ttl are passed on to the Config objects, see Config.
         """
         self.server = server
+        self.cache = cache
+        self.ttl = ttl
+
+    def _config(self, cid):
+        return Config(cid, self.server, self.cache, self.ttl)
 
     def list(self):
         configs = self.server.call('get', '/config')
-        return [Config(cid, self.server) for cid in configs]
+        return [self._config(cid) for cid in configs]
 
     def create(self, cid, configData):
         """
@@ -299,7 +1272,7 @@ class ConfigClient:
         """
         configArgs = {'configId': cid, 'params': configData, 'force': True}
         cid = self.server.call('post', "/config/create", configArgs, forceText=True, headers=TextAcceptHeader)
-        new_config = Config(cid, self.server)
+        new_config = self._config(cid)
         return new_config
 
     def __getitem__(self, item):
@@ -309,8 +1282,8 @@ class ConfigClient:
         :return: the Config object if the name is valid, otherwise raise KeyError
         """
 
-        # let's be optimistic...
-        config = Config(item, self.server)
+        # let's be optimistic... with caching enabled, this also loads the parameters of the config
+        config = self._config(item)
         if config.info():
             return config
 
@@ -325,13 +1298,13 @@ class ConfigClient:
         :return: the created Config object
         """
 
-        if not isinstance(value, collections.Mapping):
+        if not isinstance(value, Mapping):
             raise TypeError(repr(value) + "is not a dict-like object")
         return self.create(key, value)
 
 
 class JobClient:
-    def __init__(self, server, crawlId, confId, parameters=None):
+    def __init__(self, server, crawlId, confId, parameters=None, registry=None):
         """
         Nutch Job client with methods to list, create jobs.
 
@@ -341,6 +1314,7 @@ class JobClient:
         :param crawlId:
         :param confId:
         :param parameters:
+        :param registry: the JobRegistry keeping track of jobs, share one between clients of the same server
         :return:
         """
 
@@ -348,6 +1322,7 @@ class JobClient:
         self.crawlId = crawlId
         self.confId = confId
         self.parameters=parameters if parameters else {'args': dict()}
+        self.registry = registry if registry is not None else JobRegistry(server)
 
     def _job_owned(self, job):
         return job['crawlId'] == self.crawlId and job['confId'] == self.confId
@@ -356,12 +1331,32 @@ class JobClient:
         """
         Return list of jobs at this endpoint.
 
-        Call get(allJobs=True) to see all jobs, not just the ones managed by this Client
+        Call get(allJobs=True) to see all jobs, not just the ones managed by this Client.
+        The returned Jobs carry the state just listed by the server, see Job.info().
         """
 
-        jobs = self.server.call('get', '/job')
+        jobs = self.registry.refresh()
+        if allJobs:
+            return jobs
+        return self.registry.find(crawlId=self.crawlId, confId=self.confId)
 
-        return [Job(job['id'], self.server) for job in jobs if allJobs or self._job_owned(job)]
+    def find(self, state=None, jobType=None, refresh=True):
+        """
+        Return the jobs managed by this client in the given state and/or of the given type
+
+        :param state: e.g. 'RUNNING', or None for any state
+        :param jobType: e.g. 'FETCH', or None for any type
+        :param refresh: update all jobs with a single GET /job first, otherwise use the known job states
+        """
+
+        if refresh:
+            self.registry.refresh()
+        criteria = {'crawlId': self.crawlId, 'confId': self.confId}
+        if state:
+            criteria['state'] = state
+        if jobType:
+            criteria['type'] = jobType
+        return self.registry.find(**criteria)
 
     def create(self, command, **args):
         """
@@ -371,21 +1366,31 @@ class JobClient:
         :return: The created Job
         """
 
+        parameters = self._jobParameters(command, args)
+        job_info = self.server.call('post', "/job/create", parameters, JsonAcceptHeader)
+
+        job = self.registry.get(job_info['id'], parameters['type'])
+        job.started = time()
+        self.registry.update([job_info], job.started)
+        return job
+
+    def _jobParameters(self, command, args):
+        """Build the body of a /job/create request"""
+
         command = command.upper()
         if command not in LegalJobs:
-            warn('Nutch command must be one of: %s' % ', '.join(LegalJobs))
+            jobsLog.warning('Nutch command must be one of: %s', ', '.join(LegalJobs))
         else:
-            echo2('Starting %s job with args %s' % (command, str(args)))
+            jobsLog.info('Starting %s job with args %s', command, LogPayload(args),
+                         extra={'crawlId': self.crawlId, 'jobType': command})
         parameters = self.parameters.copy()
         parameters['type'] = command
         parameters['crawlId'] = self.crawlId
         parameters['confId'] = self.confId
+        # copy the shared args, or the args of one job would be passed to every later job
+        parameters['args'] = dict(self.parameters.get('args') or {})
         parameters['args'].update(args)
-
-        job_info = self.server.call('post', "/job/create", parameters, JsonAcceptHeader)
-
-        job = Job(job_info['id'], self.server)
-        return job
+        return parameters
 
     # some short-hand functions
 
@@ -434,145 +1439,777 @@ class SeedClient():
         """
         self.server = server
 
-    def create(self, sid, seedList):
+    def create(self, sid, seedList, stream=False, dedup=False):
         """
         Create a new named (sid) Seed from a list of seed URLs
 
+        With stream=True the request body is encoded while it is uploaded, so seedList can be any iterable or
+        generator of URLs and memory use doesn't depend on the number of seeds.
+
+        With dedup=True the URLs are normalized and duplicates are dropped before upload, see seeds.SeedFilter.
+        The number of URLs dropped is available as the duplicates attribute of the returned Seed.  A SeedFilter
+        can be passed instead of True, e.g. to drop duplicates across several seed lists.
+
         :param sid: the name to assign to the new seed list
         :param seedList: the list of seeds to use
+        :param stream: upload the seeds as a chunked stream
+        :param dedup: normalize and deduplicate the seeds, True or a SeedFilter
         :return: the created Seed object
         """
 
-        seedUrl = lambda uid, url: {"id": uid, "url": url}
+        seedFilter = self._seedFilter(dedup)
+        if seedFilter is not None:
+            duplicates = seedFilter.duplicates
+            seedList = seedFilter.filter(seedList)
 
-        seedListData = {
-            "id": "12345",
-            "name": sid,
-            "seedUrls": [seedUrl(uid, url) for uid, url in enumerate(seedList)]
-        }
+        if stream:
+            seedListData = JsonStream(self._seedListChunks(sid, seedList))
+        else:
+            seedListData = self._seedListData(sid, seedList)
 
         # As per resolution of https://issues.apache.org/jira/browse/NUTCH-2123
         seedPath = self.server.call('post', "/seed/create", seedListData, TextAcceptHeader)
         new_seed = Seed(sid, seedPath, self.server)
+        if seedFilter is not None:
+            new_seed.duplicates = seedFilter.duplicates - duplicates
+        seedsLog.info('Created seed list %s at %s, %d duplicates dropped', sid, seedPath, new_seed.duplicates,
+                      extra={'seedId': sid})
         return new_seed
 
-    def createFromFile(self, sid, filename):
+    def createFromFile(self, sid, filename, stream=False, dedup=False):
         """
         Create a new named (sid) Seed from a file containing URLs
         It's assumed URLs are whitespace seperated.
 
         :param sid: the name to assign to the new seed list
         :param filename: the name of the file that contains URLs
+        :param stream: read and upload the file lazily, see create()
+        :param dedup: normalize and deduplicate the seeds, see create()
         :return: the created Seed object
         """
 
-        urls = []
-        with open(filename) as f:
-            for line in f:
-                for url in line.split():
-                    urls.append(url)
+        if stream:
+            return self.create(sid, iterSeedFile(filename), stream=True, dedup=dedup)
+        return self.create(sid, self._readSeedFile(filename), dedup=dedup)
 
-        return self.create(sid, tuple(urls))
+    @staticmethod
+    def _seedFilter(dedup):
+        """Return the SeedFilter to use for a dedup argument, None for no deduplication"""
 
-class CrawlClient():
-    def __init__(self, server, seed, jobClient, rounds, index):
-        """Nutch Crawl manager
+        if isinstance(dedup, SeedFilter):
+            return dedup
+        return SeedFilter() if dedup else None
 
-        High-level Nutch client for managing crawls.
+    @staticmethod
+    def _seedListData(sid, seedList):
+        """Build the body of a /seed/create request"""
 
-        When this client is initialized, the seedList will automatically be injected.
-        There are four ways to proceed from here.
+        seedUrl = lambda uid, url: {"id": uid, "url": url}
 
-        progress() - checks the status of the current job, enqueue the next job if the current job is finished,
-                     and return immediately
-        waitJob() - wait until the current job is finished and return
-        waitRound() - wait and enqueue jobs until the current round is finished and return
-        waitAll() - wait and enqueue jobs until all rounds are finished and return
+        return {
+            "id": "12345",
+            "name": sid,
+            "seedUrls": [seedUrl(uid, url) for uid, url in enumerate(seedList)]
+        }
 
-        It is recommended to use progress() in a while loop for any applications that need to remain interactive.
+    @staticmethod
+    def _seedListChunks(sid, seedList, chunkSize=DefaultStreamChunkSize):
+        """Lazily encode the body of a /seed/create request, in chunks of about chunkSize bytes"""
+
+        buf = ['{"id": "12345", "name": %s, "seedUrls": [' % json.dumps(sid)]
+        size = len(buf[0])
+        for uid, url in enumerate(seedList):
+            item = '%s{"id": %d, "url": %s}' % (', ' if uid else '', uid, json.dumps(url))
+            buf.append(item)
+            size += len(item)
+            if size >= chunkSize:
+                yield ''.join(buf).encode('utf-8')
+                buf = []
+                size = 0
+        buf.append(']}')
+        yield ''.join(buf).encode('utf-8')
+
+    @staticmethod
+    def _readSeedFile(filename):
+        return tuple(iterSeedFile(filename))
+
+
+def iterSeedFile(filename):
+    """Lazily yield the whitespace separated URLs of a seed file"""
+
+    with open(filename) as f:
+        for line in f:
+            for url in line.split():
+                yield url
+
+
+class PollStrategy(object):
+    """
+    Decides how long to wait between status checks of a running job
+
+    Subclasses implement delays(), which returns an iterator over the number of seconds to sleep before each check.
+    A new iterator is used for every job, so strategies can adapt to how long a job has been running.
+    """
+
+    def delays(self):
+        raise NotImplementedError
+
+
+class FixedPoll(PollStrategy):
+    """Check the job every interval seconds"""
+
+    def __init__(self, interval=1):
+        self.interval = interval
 
+    def delays(self):
+        while True:
+            yield self.interval
+
+
+class BackoffPoll(PollStrategy):
+    """
+    Check a job quickly at first, then back off exponentially up to a maximum interval
+
+    Each delay is randomized by +/- jitter (a fraction of the delay) so that many crawls started together
+    don't keep hitting the server at the same moment.
+    """
+
+    def __init__(self, initial=0.5, factor=2, maximum=30, jitter=0.1, firstCheck=0.1):
+        """
+        :param initial: seconds to wait after the first check
+        :param factor: multiplier applied to the delay after every check
+        :param maximum: upper bound on the delay, in seconds
+        :param jitter: fraction of every delay to randomize by, 0 disables jitter
+        :param firstCheck: seconds to wait before the first check, so short jobs are picked up quickly
         """
+        self.initial = initial
+        self.factor = factor
+        self.maximum = maximum
+        self.jitter = jitter
+        self.firstCheck = firstCheck
+
+    def _jittered(self, delay):
+        if not self.jitter:
+            return delay
+        return max(0, delay * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def delays(self):
+        yield self._jittered(self.firstCheck)
+        delay = self.initial
+        while True:
+            yield self._jittered(delay)
+            delay = min(delay * self.factor, self.maximum)
+
+
+# Short bookkeeping jobs are checked often, long Hadoop phases back off further
+DefaultPollStrategy = BackoffPoll()
+DefaultPhasePollStrategies = {
+    'FETCH': BackoffPoll(initial=1, maximum=60),
+    'PARSE': BackoffPoll(initial=1, maximum=60),
+}
+
+
+class RetryPolicy(object):
+    """
+    Decides whether a failed job of a crawl is started again, and after how long
+
+    The new job has the same type, round and arguments as the failed one.  The crawl waits for the backoff
+    before starting it, as it waits between status checks.
+    """
+
+    def __init__(self, maxAttempts=3, backoff=None, states=('FAILED', 'KILLED')):
+        """
+        :param maxAttempts: the number of jobs started for a phase at most, the first one included
+        :param backoff: a PollStrategy giving the seconds to wait before every retry of a phase,
+                        by default BackoffPoll(initial=30, maximum=600, firstCheck=10)
+        :param states: the final job states worth a retry
+        """
+        if maxAttempts < 1:
+            raise ValueError('maxAttempts must be at least 1, not %r' % maxAttempts)
+        self.maxAttempts = maxAttempts
+        self.backoff = backoff if backoff is not None else BackoffPoll(initial=30, maximum=600, firstCheck=10)
+        self.states = tuple(state.upper() for state in states)
+
+    def retries(self, state, attempt):
+        """Whether to start a phase again, after its job ended in state on the given attempt"""
+        return state in self.states and attempt < self.maxAttempts
+
+
+NoRetry = RetryPolicy(maxAttempts=1)
+
+
+class CrawlPhasesMixin(object):
+    """
+    Mix-in class holding the order of jobs in a crawl round, shared by CrawlClient and AsyncCrawlClient
+
+    The state of the crawl, set up by _initCrawl(), and every decision taken on it live here: which jobs to start
+    when a job is seen done, when to retry a failed one, when to check the next job and when a round is over.
+    These methods never call the server, the two clients only do the calls and the waits, blocking or awaited.
+    The phases of every round are those of a phases.PhaseGraph.
+
+    In pipelined mode the next round starts while the previous one finishes: GENERATE of round N+1 starts as soon
+    as UPDATEDB of round N is done, next to INVERTLINKS, DEDUP and INDEX of round N.  To keep the crawldb and
+    linkdb consistent:
+
+    - DEDUP of round N waits until GENERATE of round N+1 is done, both lock the crawldb
+    - UPDATEDB of round N+1 waits until round N is done, it replaces the crawldb that DEDUP and INDEX of round N
+      work on, and the linkdb of round N must be complete before round N+1 inverts its links
+
+    so INVERTLINKS overlaps with GENERATE, and DEDUP and INDEX with FETCH and PARSE of the next round.  A round
+    without UPDATEDB is followed by the next one once it is done, extra phases of a PhaseGraph wait for nothing
+    but the phase before them.
+    """
+
+    # a metrics.Metrics registry recording status checks and job durations
+    metrics = None
+    # a profiler.CrawlProfiler recording the timeline of every job
+    profiler = None
+    # a checkpoint.FileCheckpoint or SqliteCheckpoint saving the state of the crawl after every transition
+    checkpoint = None
+    # a RetryPolicy, or a dict mapping job types to RetryPolicies, for failed jobs
+    retryPolicy = None
+    # the time by which nextRound() or waitAll() must return, see _deadline()
+    until = None
+    # a stats.StatsSampler keeping the crawldb statistics of the crawl over time
+    sampler = None
+
+    def _initCrawl(self, server, seed, jobClient, rounds, index, pollStrategy, metrics, profiler, pipelined, phases,
+                   checkpoint, retryPolicy, sampler):
+        """Set up the state of a crawl, nothing is started, see CrawlClient"""
+
         self.server = server
+        self.seed = seed
         self.jobClient = jobClient
         self.crawlId = jobClient.crawlId
         self.currentRound = 1
         self.totalRounds = rounds
-        self.currentJob = None
-        self.sleepTime = 1
+        self._initPhases(phases if phases is not None else PhaseGraph.default(index), pipelined)
+        self.pollStrategy = pollStrategy
+        self.roundPolls = []
         self.enable_index = index
+        self.metrics = metrics
+        self.profiler = profiler
+        self.checkpoint = checkpoint
+        self.retryPolicy = retryPolicy
+        self.sampler = sampler
+        self.seedPath = seed.seedPath if seed is not None else None
+
+    def _initPhases(self, phases, pipelined=False):
+        self.phaseGraph = phases
+        self.pipelined = pipelined
+        self.activeJobs = []        # running jobs, the most recently started last
+        self.jobRounds = {}         # job id -> round, of every job started
+        self.completedRounds = 0    # rounds returned by nextRound()
+        self.roundsDone = set()
+        self.roundJobs = {}         # round -> finished jobs, until returned by nextRound()
+        self.jobAttempts = {}       # job id -> attempt, of jobs retrying a failed one
+        self.retryDelays = {}       # (round, job type) -> the backoff of the phase
+        self.retryQueue = []        # (not before, round, Phase, attempt) of failed jobs to start again
+        # pipelined mode only
+        self.waitingPhases = []     # (round, Phase) pairs waiting for a job of another round
+        self.jobSpans = {}          # round -> (started, seen done) times of its finished jobs
+        self.roundSavings = []      # seconds the jobs of every round overlapped with the next round
+        # resumed crawls only
+        self.orphans = []           # jobs on the server created after the last checkpoint, see _adopt()
+
+    @property
+    def currentJob(self):
+        """The most recently started job that is still running, or None"""
+        return self.activeJobs[-1] if self.activeJobs else None
+
+    @currentJob.setter
+    def currentJob(self, job):
+        self.activeJobs = [job] if job is not None else []
+
+    @property
+    def sleepTime(self):
+        """Deprecated, the seconds between status checks of a FixedPoll pollStrategy, or None"""
+        warnings.warn('sleepTime is deprecated, use pollStrategy', DeprecationWarning, stacklevel=2)
+        return self.pollStrategy.interval if isinstance(self.pollStrategy, FixedPoll) else None
+
+    @sleepTime.setter
+    def sleepTime(self, sleepTime):
+        """Deprecated, check every job each sleepTime seconds, same as pollStrategy=FixedPoll(sleepTime)"""
+        warnings.warn('sleepTime is deprecated, use pollStrategy=FixedPoll(sleepTime)', DeprecationWarning,
+                      stacklevel=2)
+        self.pollStrategy = FixedPoll(sleepTime)
+
+    def _jobRound(self, job):
+        return self.jobRounds.get(job.id, self.currentRound)
+
+    def _pollDelays(self, job):
+        """
+        Return an iterator over the delays between status checks of job, following the strategy for its type
 
-        # dispatch injection
-        self.currentJob = self.jobClient.inject(seed)
-
-    def _nextJob(self, job, nextRound=True):
-        """
-        Given a completed job, start the next job in the round, or return None
-
-        :param nextRound: whether to start jobs from the next round if the current round is completed.
-        :return: the newly started Job, or None if no job was started
-        """
-
-        jobInfo = job.info()
-        assert jobInfo['state'] == 'FINISHED'
-
-        roundEnd = False
-        if jobInfo['type'] == 'INJECT':
-            nextCommand = 'GENERATE'
-        elif jobInfo['type'] == 'GENERATE':
-            nextCommand = 'FETCH'
-        elif jobInfo['type'] == 'FETCH':
-            nextCommand = 'PARSE'
-        elif jobInfo['type'] == 'PARSE':
-            nextCommand = 'UPDATEDB'
-        elif jobInfo['type'] == 'UPDATEDB':
-            nextCommand = 'INVERTLINKS'
-        elif jobInfo['type'] == 'INVERTLINKS':
-            nextCommand = 'DEDUP'
-        elif jobInfo['type'] == 'DEDUP':
-            if self.enable_index:
-                nextCommand = 'INDEX'
-            else:
-                roundEnd = True
-        elif jobInfo['type'] == 'INDEX':
-            roundEnd = True
-        else:
-            raise NutchException("Unrecognized job type {}".format(jobInfo['type']))
+        pollStrategy is either a PollStrategy used for all jobs, or a dict mapping job types to PollStrategies.
+        Job types missing from the dict use DefaultPhasePollStrategies or DefaultPollStrategy.
+        """
+
+        strategy = self.pollStrategy
+        if not isinstance(strategy, PollStrategy):
+            strategies = dict(DefaultPhasePollStrategies)
+            strategies.update(strategy or {})
+            strategy = strategies.get(job.type, DefaultPollStrategy)
+        return strategy.delays()
+
+    def _countPoll(self, job):
+        """Record a status check of job in the poll counts of its round"""
+
+        round = self._jobRound(job)
+        while len(self.roundPolls) < round:
+            self.roundPolls.append(collections.Counter())
+        self.roundPolls[round - 1][job.type] += 1
+        if self.metrics is not None:
+            self.metrics.countPoll(job.type)
+
+    def _jobArgs(self, round, phase):
+        """Return the arguments of the job of a Phase of round"""
+
+        args = phase.jobArgs(round)
+        if phase is self.phaseGraph.inject:
+            args['url_dir'] = self.seedPath
+        return args
+
+    def _jobStarted(self, job, requested, round, attempt=1):
+        """Record the start of a job of round requested at the given time, and make it an active job"""
+
+        self.jobRounds[job.id] = round
+        if attempt > 1:
+            self.jobAttempts[job.id] = attempt
+        self.activeJobs.append(job)
+        if self.profiler is not None:
+            self.profiler.jobStarted(self.crawlId, round, job, requested, job.started or time())
+
+    def _jobRunning(self, job, jobInfo):
+        """Record a status check finding job running"""
+
+        if self.profiler is not None:
+            self.profiler.jobRunning(job, jobInfo.fetched)
+
+    def _jobFinished(self, job, jobInfo):
+        """Record the end of a job seen finished, or failed, in jobInfo"""
+
+        if self.metrics is not None and job.started is not None and jobInfo['state'] == 'FINISHED':
+            self.metrics.observePhase(jobInfo['type'], jobInfo.fetched - job.started)
+        if self.profiler is not None:
+            self.profiler.jobFinished(job, jobInfo.fetched, jobInfo['state'])
+
+    @contextmanager
+    def _deadline(self, deadline):
+        """Make the waits and the calls to the server of the block end within deadline seconds, if not None"""
+
+        if deadline is None:
+            yield
+            return
+        previous = self.until
+        self.until = time() + deadline if previous is None else min(time() + deadline, previous)
+        try:
+            with self.server.deadline(self.until):
+                yield
+        finally:
+            self.until = previous
+
+    def _waitTime(self, delay):
+        """Return the seconds to wait before a status check, shortened to end by the deadline"""
+
+        if self.until is None:
+            return delay
+        remaining = self.until - time()
+        if remaining <= 0:
+            raise NutchDeadlineExceeded('{}: deadline passed in round {} of {}, with {} running'.format(
+                self.crawlId, self.currentRound, self.totalRounds,
+                ', '.join(job.id for job in self.activeJobs) or 'no jobs'))
+        return min(delay, remaining)
+
+    def _samplingDue(self, force=False):
+        """Whether to add the crawldb statistics to the sampler now, forced at the end of every round"""
+        return self.sampler is not None and (force or self.sampler.due())
+
+    def _samplingFailed(self, error):
+        # statistics are for watching the crawl, which goes on without them
+        crawlLog.warning('%s: getting the crawldb statistics failed: %s', self.crawlId, error,
+                         extra={'crawlId': self.crawlId, 'round': self.currentRound})
+
+    def _retryDelay(self, job, jobInfo):
+        """
+        Decide whether to start a failed job again, following the retry policy of its type
+
+        retryPolicy is either a RetryPolicy used for all jobs, or a dict mapping job types to RetryPolicies.
+        Job types missing from the dict are not retried.
 
-        if roundEnd:
+        :return: the seconds to wait before starting the job again, None if it must not be retried
+        """
+
+        policy = self.retryPolicy
+        if not isinstance(policy, RetryPolicy):
+            policy = (policy or {}).get(job.type, NoRetry)
+        attempt = self.jobAttempts.get(job.id, 1)
+        if not policy.retries(jobInfo['state'], attempt):
+            return None
+        key = (self._jobRound(job), job.type)
+        if key not in self.retryDelays:
+            self.retryDelays[key] = policy.backoff.delays()
+        delay = next(self.retryDelays[key])
+        crawlLog.warning('%s: %s job %s is %s, starting it again in %.1f seconds (attempt %d of %d)',
+                         self.crawlId, job.type, job.id, jobInfo['state'], delay, attempt + 1, policy.maxAttempts,
+                         extra={'crawlId': self.crawlId, 'round': key[0], 'jobType': job.type})
+        return delay
+
+    def _retryPhase(self, job):
+        """Return the round, Phase and attempt of the job retrying a failed job"""
+        return self._jobRound(job), self.phaseGraph.phase(job.type), self.jobAttempts.get(job.id, 1) + 1
+
+    def _scheduleRetry(self, job, delay):
+        """Replace a failed active job by an entry of retryQueue, started by progress() once delay has passed"""
+
+        round, phase, attempt = self._retryPhase(job)
+        self.activeJobs.remove(job)
+        self.retryQueue.append((time() + delay, round, phase, attempt))
+
+    def _dueRetries(self):
+        """Remove the retries whose backoff has passed from retryQueue, return their (round, Phase, attempt)"""
+
+        now = time()
+        due = [retry for retry in self.retryQueue if retry[0] <= now]
+        self.retryQueue = [retry for retry in self.retryQueue if retry[0] > now]
+        return [(round, phase, attempt) for notBefore, round, phase, attempt in due]
+
+    def _retryWait(self):
+        """Return the seconds until the next retry is due, None if no job is waiting to be retried"""
+
+        if not self.retryQueue:
+            return None
+        return max(0.0, min(retry[0] for retry in self.retryQueue) - time())
+
+    def _crawlError(self, job, jobInfo):
+        """
+        Return the NutchCrawlException of a failed job that is not retried
+
+        The failed job is attached as current_job, the jobs finished in rounds not returned by nextRound() yet
+        as completed_jobs, organized by round, and the number of jobs started for the phase as attempts.
+        """
+
+        attempts = self.jobAttempts.get(job.id, 1)
+        crawlLog.error('%s: %s job %s is %s after %d attempt(s)', self.crawlId, jobInfo['type'], job.id,
+                       jobInfo['state'], attempts,
+                       extra={'crawlId': self.crawlId, 'round': self._jobRound(job), 'jobType': jobInfo['type']})
+        error = NutchCrawlException("Unexpected job state: {}".format(jobInfo['state']))
+        error.current_job = job
+        error.completed_jobs = [self.roundJobs[round] for round in sorted(self.roundJobs)]
+        error.attempts = attempts
+        return error
+
+    def _roundSuccessor(self, jobType, round):
+        """Return the Phase following a job of jobType in round, None if jobType ends the round"""
+
+        if jobType not in self.phaseGraph:
+            raise NutchException("Unrecognized job type {}".format(jobType))
+        return self.phaseGraph.next(jobType, round, self.totalRounds)
+
+    def _nextCommand(self, jobType, nextRound=True):
+        """
+        Given the type of a finished job of the current round, return the next Phase of the crawl, or None
+
+        :param jobType: the type of the job that just finished
+        :param nextRound: whether to start the next round if the current round is completed.
+        :return: the Phase of the next job, or None if the crawl should stop here
+        """
+
+        nextPhase = self._roundSuccessor(jobType, self.currentRound)
+
+        if nextPhase is None:
+            crawlLog.info('%s: round %d of %d finished', self.crawlId, self.currentRound, self.totalRounds,
+                          extra={'crawlId': self.crawlId, 'round': self.currentRound})
             if nextRound and self.currentRound < self.totalRounds:
-                nextCommand = 'GENERATE'
+                nextPhase = self.phaseGraph.first()
                 self.currentRound += 1
             else:
                 return None
 
-        return self.jobClient.create(nextCommand)
+        crawlLog.debug('%s: %s finished, starting %s', self.crawlId, jobType, nextPhase.type,
+                       extra={'crawlId': self.crawlId, 'round': self.currentRound, 'jobType': nextPhase.type})
+        return nextPhase
 
-    def progress(self, nextRound=True):
+    def _nextPhases(self, job, jobInfo, nextRound=True):
+        """
+        Given a job seen finished in jobInfo, return the jobs to start now
+
+        :param nextRound: whether to start the next round if the current round is completed.
+        :return: a list of (round, Phase) pairs
+        """
+
+        jobType = jobInfo['type']
+        round = self._jobRound(job)
+        self.roundJobs.setdefault(round, []).append(job)
+
+        if not self.pipelined:
+            nextPhase = self._nextCommand(jobType, nextRound)
+            if nextPhase is None or self.currentRound != round:
+                self.roundsDone.add(round)
+            return [] if nextPhase is None else [(self.currentRound, nextPhase)]
+
+        self.jobSpans.setdefault(round, []).append((job.started or jobInfo.fetched, jobInfo.fetched))
+
+        nextPhase = self._roundSuccessor(jobType, round)
+        if nextPhase is not None:
+            self.waitingPhases.append((round, nextPhase))
+        else:
+            self.roundsDone.add(round)
+            self._roundFinished(round, jobInfo.fetched)
+        # the next round starts after UPDATEDB, or at the end of the round if rounds were added since
+        if (nextPhase is None or jobType == 'UPDATEDB') and nextRound and round == self.currentRound \
+                and round < self.totalRounds:
+            self.currentRound += 1
+            self.waitingPhases.append((self.currentRound, self.phaseGraph.first()))
+
+        ready = [(phaseRound, phase) for phaseRound, phase in self.waitingPhases
+                 if not self._blocked(phaseRound, phase.type)]
+        self.waitingPhases = [waiting for waiting in self.waitingPhases if waiting not in ready]
+        for phaseRound, phase in ready:
+            crawlLog.debug('%s: %s of round %d finished, starting %s of round %d', self.crawlId, jobType, round,
+                           phase.type, phaseRound,
+                           extra={'crawlId': self.crawlId, 'round': phaseRound, 'jobType': phase.type})
+        return ready
+
+    def _roundDone(self, round):
+        return round in self.roundsDone
+
+    def _blocked(self, round, jobType):
+        """Whether a job of round must wait for jobs of another round, see the class documentation"""
+
+        if jobType == 'DEDUP':
+            # GENERATE of the next round goes first, whether it runs, starts along with DEDUP or waits for a retry
+            following = [(self.jobRounds.get(job.id), job.type) for job in self.activeJobs]
+            following.extend((phaseRound, phase.type) for phaseRound, phase in self.waitingPhases)
+            following.extend((retryRound, phase.type) for notBefore, retryRound, phase, attempt in self.retryQueue)
+            return (round + 1, 'GENERATE') in following
+        if jobType == 'UPDATEDB':
+            return round > 1 and not self._roundDone(round - 1)
+        return False
+
+    def _roundFinished(self, round, now):
+        """Record the seconds the jobs of a finished round overlapped with the jobs of the next round"""
+
+        later = list(self.jobSpans.get(round + 1, []))
+        later.extend((job.started or now, now) for job in self.activeJobs if self.jobRounds.get(job.id) == round + 1)
+        saved = sum(max(0.0, min(end, laterEnd) - max(start, laterStart))
+                    for start, end in self.jobSpans.get(round, []) for laterStart, laterEnd in later)
+        while len(self.roundSavings) < round:
+            self.roundSavings.append(0.0)
+        self.roundSavings[round - 1] = saved
+        crawlLog.info('%s: round %d of %d finished, %.1f seconds saved by pipelining', self.crawlId, round,
+                      self.totalRounds, saved, extra={'crawlId': self.crawlId, 'round': round})
+
+    def _saveCheckpoint(self):
+        """Save the state of the crawl to the checkpoint, if any, once per transition"""
+
+        if self.checkpoint is not None:
+            self.checkpoint.save(self.crawlId, self._crawlState())
+
+    def _crawlState(self):
+        """Return the state of the crawl as a dict of JSON values, see _restoreState()"""
+
+        phaseRef = lambda round, phase: {'round': round, 'type': phase.type}
+        return {
+            'crawlId': self.crawlId,
+            'confId': self.jobClient.confId,
+            'seedPath': self.seedPath,
+            'phases': self.phaseGraph.types(),
+            'pipelined': self.pipelined,
+            'currentRound': self.currentRound,
+            'totalRounds': self.totalRounds,
+            'completedRounds': self.completedRounds,
+            'activeJobs': [{'id': job.id, 'type': job.type, 'round': self._jobRound(job), 'started': job.started}
+                           for job in self.activeJobs],
+            'waitingPhases': [phaseRef(round, phase) for round, phase in self.waitingPhases],
+            'jobRounds': self.jobRounds,
+            'jobAttempts': self.jobAttempts,
+            'retryQueue': [dict(phaseRef(round, phase), notBefore=notBefore, attempt=attempt)
+                           for notBefore, round, phase, attempt in self.retryQueue],
+            'roundsDone': sorted(self.roundsDone),
+            # the finished jobs of rounds not returned by nextRound() yet
+            'roundJobs': dict(('%d' % round, [[job.id, job.type] for job in jobs])
+                              for round, jobs in self.roundJobs.items() if round > self.completedRounds),
+            'roundPolls': [dict(polls) for polls in self.roundPolls],
+            'roundSavings': self.roundSavings,
+            'jobSpans': dict(('%d' % round, spans) for round, spans in self.jobSpans.items()
+                             if round not in self.roundsDone),
+            'saved': time(),
+        }
+
+    def _restoreState(self, state):
+        """Restore the state of the crawl saved by _crawlState()"""
+
+        if state['phases'] != self.phaseGraph.types():
+            raise NutchException('Crawl {} was checkpointed with phases {}, resume it with the same PhaseGraph'
+                                 .format(self.crawlId, ', '.join(state['phases'])))
+        registry = self.jobClient.registry
+        self.seedPath = state['seedPath']
+        self.pipelined = state['pipelined']
+        self.currentRound = state['currentRound']
+        self.totalRounds = state['totalRounds']
+        self.completedRounds = state['completedRounds']
+        self.jobRounds = dict(state['jobRounds'])
+        self.jobAttempts = dict(state.get('jobAttempts', {}))
+        self.retryQueue = [(ref['notBefore'], ref['round'], self.phaseGraph.phase(ref['type']), ref['attempt'])
+                           for ref in state.get('retryQueue', [])]
+        self.roundsDone = set(state['roundsDone'])
+        self.activeJobs = []
+        for info in state['activeJobs']:
+            job = registry.get(info['id'], info['type'])
+            job.started = info['started']
+            self.activeJobs.append(job)
+        self.roundJobs = dict((int(round), [registry.get(jid, jobType) for jid, jobType in jobs])
+                              for round, jobs in state['roundJobs'].items())
+        self.waitingPhases = [(ref['round'], self.phaseGraph.phase(ref['type'])) for ref in state['waitingPhases']]
+        self.roundPolls = [collections.Counter(polls) for polls in state['roundPolls']]
+        self.roundSavings = list(state['roundSavings'])
+        self.jobSpans = dict((int(round), [tuple(span) for span in spans])
+                             for round, spans in state['jobSpans'].items())
+
+    def _adopt(self, round, phase, attempt=1):
         """
-        Check the status of the current job, activate the next job if it's finished, and return the active job
+        Take over a job of phase among the orphans, the jobs of a resumed crawl created after its last checkpoint
 
-        If the current job has failed, a NutchCrawlException will be raised with no jobs attached.
+        A crash between requesting a job and saving the transition leaves the job running on the server, unknown
+        to the checkpoint.  Starting its phase again takes it over instead of requesting another one.
 
+        :return: the adopted job, or None if there is no orphan of phase
+        """
+
+        for job in self.orphans:
+            if job.type == phase.type:
+                self.orphans.remove(job)
+                self.jobRounds[job.id] = round
+                if attempt > 1:
+                    self.jobAttempts[job.id] = attempt
+                self.activeJobs.append(job)
+                return job
+        return None
+
+    @classmethod
+    def _fromCheckpoint(cls, server, jobClient, checkpoint, pollStrategy, metrics, profiler, phases, retryPolicy,
+                        sampler):
+        """Return a client of the crawl of jobClient, restored from its last checkpoint, see CrawlClient.resume"""
+
+        state = checkpoint.load(jobClient.crawlId)
+        if state is None:
+            raise NutchException('No checkpoint of crawl {}'.format(jobClient.crawlId))
+        index = 'INDEX' in state['phases']
+        crawl = cls(server, None, jobClient, state['totalRounds'], index, pollStrategy, metrics, profiler,
+                    state['pipelined'], phases, checkpoint, retryPolicy, sampler)
+        crawl._restoreState(state)
+        return crawl
+
+    def _findOrphans(self, listed):
+        """Keep the jobs of the crawl listed by the server that the checkpoint doesn't know, see _adopt()"""
+        self.orphans = [job for job in listed if job.id not in self.jobRounds]
+
+    def _lostJob(self, job):
+        """Forget an active job unknown to the server, return the (round, Phase, attempt) to start it again"""
+
+        crawlLog.warning('%s: %s job %s is unknown to the server, starting it again', self.crawlId, job.type,
+                         job.id, extra={'crawlId': self.crawlId, 'jobType': job.type})
+        self.activeJobs.remove(job)
+        return self._jobRound(job), self.phaseGraph.phase(job.type), 1
+
+    def _resumed(self):
+        crawlLog.info('%s: resumed in round %d of %d with %s', self.crawlId, self.currentRound, self.totalRounds,
+                      ', '.join(job.id for job in self.activeJobs) or 'no running jobs',
+                      extra={'crawlId': self.crawlId, 'round': self.currentRound})
+
+    def _transition(self, jobInfo, nextRound=True, job=None):
+        """
+        Given fresh information about an active job, move the crawl on and return the jobs to start now
+
+        A finished job makes way for the next phases.  A failed or killed job waits in retryQueue for its retry,
+        or raises a NutchCrawlException if it is not retried.  Jobs in any other state, e.g. RUNNING, STOPPING or
+        KILLING, are checked again later.
+
+        :param jobInfo: the info of the job, as returned by Job.info() or listed by GET /job
         :param nextRound: whether to start jobs from the next round if the current job/round is completed.
-        :return: the currently running Job, or None if no jobs are running.
+        :param job: the active job jobInfo is about, by default self.currentJob
+        :return: a list of the (round, Phase, attempt) to start, or None if the job is still running
+        """
+
+        job = self.currentJob if job is None else job
+        if jobInfo['state'] not in FinalJobStates:
+            self._jobRunning(job, jobInfo)
+            return None
+
+        self._jobFinished(job, jobInfo)
+        if jobInfo['state'] == 'FINISHED':
+            self.activeJobs.remove(job)
+            return [(round, phase, 1) for round, phase in self._nextPhases(job, jobInfo, nextRound)]
+        delay = self._retryDelay(job, jobInfo)
+        if delay is None:
+            raise self._crawlError(job, jobInfo)
+        self._scheduleRetry(job, delay)
+        return []
+
+    def _beginRound(self):
+        """
+        Return the round nextRound() waits for, and the (round, Phase, attempt) of the job starting it, if any
+
+        In serial mode that is the current round.  A resumed crawl may have finished it before it was saved, or be
+        in the middle of it.  In pipelined mode it is the oldest round not returned yet, whose jobs may be running
+        already.
         """
 
-        currentJob = self.currentJob
-        if currentJob is None:
-            return currentJob
+        if self.pipelined:
+            round = self.completedRounds + 1
+            if self.activeJobs:
+                return round, []
+            self.currentRound = round
+        else:
+            round = self.currentRound
+            if self.currentJob is not None or round in self.roundsDone:
+                return round, []
+        return round, [(round, self.phaseGraph.first(), 1)]
 
-        jobInfo = currentJob.info()
+    def _endRound(self, round):
+        """Record the end of the round waited for by nextRound(), save the checkpoint and return its finished jobs"""
 
-        if jobInfo['state'] == 'RUNNING':
-            return currentJob
-        elif jobInfo['state'] == 'FINISHED':
-            nextJob = self._nextJob(currentJob, nextRound)
-            self.currentJob = nextJob
-            return nextJob
+        if self.pipelined:
+            self.completedRounds = round
         else:
-            error = NutchCrawlException("Unexpected job state: {}".format(jobInfo['state']))
-            error.current_job = currentJob
-            raise NutchCrawlException
+            self.currentRound += 1
+            self.completedRounds += 1
+        finishedJobs = self.roundJobs.pop(round, [])
+        self._saveCheckpoint()
+        return finishedJobs
+
+    def _nextCheck(self, due, delays):
+        """
+        Plan the next status check of pipelined mode, following the poll strategy of every active job
+
+        :param due: job id -> the time the job is due for a status check, updated
+        :param delays: job id -> the iterator over the delays between the checks of the job, updated
+        :return: the job to check, or None to start the retries due instead, and the seconds to wait before
+        """
+
+        for job in self.activeJobs:
+            if job.id not in due:
+                delays[job.id] = self._pollDelays(job)
+                due[job.id] = time() + next(delays[job.id])
+        retryWait = self._retryWait()
+        job = min(self.activeJobs, key=lambda active: due[active.id]) if self.activeJobs else None
+        if job is None or (retryWait is not None and retryWait < due[job.id] - time()):
+            return None, self._waitTime(retryWait)
+        return job, self._waitTime(max(0, due.pop(job.id) - time()))
+
+    def _scheduleCheck(self, job, due, delays):
+        """Plan the following status check of a job just checked in pipelined mode, if it's still active"""
+
+        if job in self.activeJobs:
+            due[job.id] = time() + next(delays[job.id])
+
+    def _roundsLeft(self):
+        """Whether waitAll() has rounds left to wait for"""
+
+        if self.pipelined:
+            return self.completedRounds < self.totalRounds
+        return self.currentRound <= self.totalRounds
 
     def addRounds(self, numRounds=1):
         """
@@ -585,50 +2222,413 @@ class CrawlClient():
         self.totalRounds += numRounds
         return self.totalRounds
 
-    def nextRound(self):
+
+class CrawlClient(CrawlPhasesMixin):
+    def __init__(self, server, seed, jobClient, rounds, index, pollStrategy=None, metrics=None, profiler=None,
+                 pipelined=False, phases=None, checkpoint=None, retryPolicy=None, sampler=None):
+        """Nutch Crawl manager
+
+        High-level Nutch client for managing crawls.
+
+        When this client is initialized, the seedList will automatically be injected.
+        There are four ways to proceed from here.
+
+        progress() - checks the status of the current job, enqueue the next job if the current job is finished,
+                     and return immediately
+        waitJob() - wait until the current job is finished and return
+        waitRound() - wait and enqueue jobs until the current round is finished and return
+        waitAll() - wait and enqueue jobs until all rounds are finished and return
+
+        It is recommended to use progress() in a while loop for any applications that need to remain interactive.
+
+        The waiting methods check the current job following pollStrategy, either a PollStrategy for every job or
+        a dict mapping job types ('INJECT', 'FETCH', ...) to PollStrategies, by default nutch.DefaultPollStrategy
+        and nutch.DefaultPhasePollStrategies.  The number of checks per round and job type is kept in roundPolls.
+
+        With a metrics.Metrics registry, status checks and the duration of every job are also recorded there.
+        With a profiler.CrawlProfiler, the timeline of every job is recorded, see CrawlProfiler.timeline().
+
+        With pipelined=True the next round is generated and fetched while the previous round inverts links,
+        deduplicates and indexes, see CrawlPhasesMixin for the order kept between rounds.  Up to two jobs then
+        run at once, all of them are in activeJobs, and currentJob is the most recently started one.  The seconds
+        saved on every round are kept in roundSavings.
+
+        The jobs of every round, their arguments and the rounds they run in follow phases, a phases.PhaseGraph,
+        by default PhaseGraph.default(index).  index is ignored when phases are given.
+
+        With a checkpoint.FileCheckpoint or SqliteCheckpoint, the state of the crawl is saved once per transition,
+        after the jobs it starts were requested, and resume() continues the crawl from there.  Without a seed
+        nothing is injected, which is how resume() creates the client.
+
+        A failed job raises a NutchCrawlException, unless retryPolicy, either a RetryPolicy for every job or a dict
+        mapping job types to RetryPolicies, starts it again.  Only the failed phase is repeated, and the crawl
+        carries on once it finishes.
+
+        With a stats.StatsSampler, the waiting methods add the crawldb statistics to it between status checks, at
+        most every sampler.interval seconds, and at the end of every round.  Samples belong to the oldest round not
+        completed yet, which the URLs fetched are counted for in both modes.
+
+        """
+        self._initCrawl(server, seed, jobClient, rounds, index, pollStrategy, metrics, profiler, pipelined, phases,
+                        checkpoint, retryPolicy, sampler)
+
+        # dispatch injection
+        if seed is not None:
+            self._startPhases([(1, self.phaseGraph.inject, 1)])
+
+    @classmethod
+    def resume(cls, server, jobClient, checkpoint, pollStrategy=None, metrics=None, profiler=None, phases=None,
+               retryPolicy=None, sampler=None):
+        """
+        Continue a crawl from its last checkpoint, e.g. after the process controlling it was restarted
+
+        Jobs still known to the server are reattached to, jobs that finished meanwhile are picked up by the next
+        progress(), and no finished job is started again.  Jobs the server lost, e.g. because it was restarted
+        as well, are started again.
+
+        :param jobClient: a JobClient with the crawlId and confId of the crawl
+        :param checkpoint: the checkpoint the crawl was saved to
+        :param phases: the PhaseGraph the crawl was started with, if it was not the default one
+        :param retryPolicy: the RetryPolicy, or dict of them, for failed jobs, see CrawlClient
+        :param sampler: a stats.StatsSampler for the crawldb statistics, see CrawlClient
+        :return: the CrawlClient, waitAll() returns the rounds still to complete
+        """
+
+        crawl = cls._fromCheckpoint(server, jobClient, checkpoint, pollStrategy, metrics, profiler, phases,
+                                    retryPolicy, sampler)
+        crawl._findOrphans(jobClient.list())
+        lost = []
+        for job in list(crawl.activeJobs):
+            try:
+                job.refresh()
+            except NutchException as error:
+                if error.status_code != 404:
+                    raise
+                lost.append(crawl._lostJob(job))
+        crawl._startPhases(lost)
+        crawl._resumed()
+        return crawl
+
+    def _startPhase(self, round, phase, attempt=1):
+        """Start the job of a Phase of round, next to the other active jobs, the caller saves the checkpoint"""
+
+        job = self._adopt(round, phase, attempt)
+        if job is None:
+            requested = time()
+            job = self.jobClient.create(phase.type, **self._jobArgs(round, phase))
+            self._jobStarted(job, requested, round, attempt)
+        return job
+
+    def _startPhases(self, starts):
+        """Start the jobs of a transition, a list of (round, Phase, attempt), then save the checkpoint"""
+
+        for round, phase, attempt in starts:
+            self._startPhase(round, phase, attempt)
+        self._saveCheckpoint()
+
+    def progress(self, nextRound=True):
+        """
+        Check the status of the active jobs, activate the next jobs of those finished, and return the active job
+
+        Every job is refreshed with a single request, whose snapshot also decides which job comes next.
+        If a job has failed, a NutchCrawlException will be raised with no jobs attached, unless the retry policy
+        starts it again: failed jobs wait in retryQueue for their backoff, and are started by the first progress()
+        after it.  progress() never waits.
+
+        :param nextRound: whether to start jobs from the next round if the current job/round is completed.
+        :return: the currently running Job, or None if no jobs are running.
+        """
+
+        for job in list(self.activeJobs):
+            self._advance(job.refresh(), nextRound, job)
+        self._startRetries()
+        return self.currentJob
+
+    def _startRetries(self):
+        """Start the jobs of retryQueue whose backoff has passed"""
+
+        due = self._dueRetries()
+        if due:
+            self._startPhases(due)
+
+    def _advance(self, jobInfo, nextRound=True, job=None):
+        """
+        Given fresh information about an active job, activate the next jobs if it's finished, see _transition()
+
+        :return: the currently running Job, or None if no jobs are running.
+        """
+
+        starts = self._transition(jobInfo, nextRound, job)
+        if starts is not None:
+            self._startPhases(starts)
+        return self.currentJob
+
+    def _sampleStats(self, round, force=False):
+        """Add the crawldb statistics of round to the sampler, if any, when it is due or forced"""
+
+        if not self._samplingDue(force):
+            return
+        try:
+            self.sampler.add(self.jobClient.stats(), round)
+        except NutchException as error:
+            self._samplingFailed(error)
+
+    def nextRound(self, deadline=None):
         """
         Execute all jobs in the current round and return when they have finished.
 
-        If a job fails, a NutchCrawlException will be raised, with all completed jobs from this round attached
-        to the exception.
+        If a job fails and is not retried, a NutchCrawlException will be raised, with the completed jobs of this
+        round, and of the next one in pipelined mode, attached to the exception by round.
 
+        With a deadline, every call to the server and every wait between status checks ends within deadline
+        seconds, or NutchDeadlineExceeded is raised.  The jobs keep running, and calling nextRound() again later
+        carries on with the round.
+
+        :param deadline: seconds the round may take at most, None to wait as long as it takes
         :return: a list of all completed Jobs
         """
 
-        finishedJobs = []
-        if self.currentJob is None:
-            self.currentJob = self.jobClient.create('GENERATE')
-
-        activeJob = self.progress(nextRound=False)
-        while activeJob:
+        with self._deadline(deadline):
+            round, starts = self._beginRound()
+            if starts:
+                self._startPhases(starts)
+            if self.pipelined:
+                self._waitPipelinedRound(round)
+            else:
+                self._waitSerialRound(round)
+            self._sampleStats(round, force=True)
+            return self._endRound(round)
+
+    def _waitSerialRound(self, round):
+        """Check the job of round and start the next ones until the round is done, in serial mode"""
+
+        activeJob = self.currentJob
+        if activeJob:
+            delays = self._pollDelays(activeJob)
+        while activeJob or self.retryQueue:
+            # without an active job, a failed one waits for its retry
+            sleep(self._waitTime(next(delays) if activeJob else self._retryWait()))
             oldJob = activeJob
             activeJob = self.progress(nextRound=False)  # updates self.currentJob
-            if oldJob and oldJob != activeJob:
-                finishedJobs.append(oldJob)
-            sleep(self.sleepTime)
-        self.currentRound += 1
-        return finishedJobs
-
-    def waitAll(self):
+            if oldJob:
+                self._countPoll(oldJob)
+            self._sampleStats(round)
+            if oldJob != activeJob and activeJob:
+                delays = self._pollDelays(activeJob)
+
+    def _waitPipelinedRound(self, round):
+        """Check the jobs of round and start the next ones until it is done, jobs of the next round keep running"""
+
+        delays = {}
+        due = {}
+        while not self._roundDone(round) and (self.activeJobs or self.retryQueue):
+            job, wait = self._nextCheck(due, delays)
+            sleep(wait)
+            if job is None:
+                self._startRetries()
+                continue
+            self._advance(job.refresh(), True, job)
+            self._countPoll(job)
+            self._sampleStats(round)
+            self._scheduleCheck(job, due, delays)
+
+    def waitAll(self, deadline=None):
         """
         Execute all queued rounds and return when they have finished.
 
-        If a job fails, a NutchCrawlException will be raised, with all completed jobs attached
-        to the exception
+        If a job fails and is not retried, a NutchCrawlException will be raised, with all completed jobs attached
+        to the exception, organized by round
 
+        :param deadline: seconds all rounds may take at most, see nextRound()
         :return: a list of jobs completed for each round, organized by round (list-of-lists)
         """
 
-        finishedRounds = [self.nextRound()]
-
-        while self.currentRound < self.totalRounds:
-            finishedRounds.append(self.nextRound())
+        finishedRounds = []
+        try:
+            with self._deadline(deadline):
+                while self._roundsLeft():
+                    finishedRounds.append(self.nextRound())
+        except NutchCrawlException as error:
+            error.completed_jobs = finishedRounds + error.completed_jobs
+            raise
 
         return finishedRounds
 
 
+class CrawlManager:
+    def __init__(self, server, sleepTime=1, registry=None):
+        """Nutch multi-crawl manager
+
+        Advances many CrawlClients from a single poll loop.  Each tick() fetches the state of every job with one
+        GET /job and only starts new jobs for crawls whose current job has finished, so the number of requests
+        per tick does not grow with the number of crawls.
+
+        -- manager = nt.Crawls()
+        -- for seed in seeds:
+        --     manager.add(nt.Crawl(seed, rounds=3))
+        -- results = manager.waitAll()    # {crawlId: list-of-lists of completed jobs}
+
+        :param server: the Server all managed crawls are running on
+        :param sleepTime: seconds to wait between ticks in waitAll()
+        :param registry: the JobRegistry refreshed on every tick, by default a new one
+        """
+        self.server = server
+        self.sleepTime = sleepTime
+        self.registry = registry if registry is not None else JobRegistry(server)
+        self.crawls = []
+        self.finishedRounds = {}
+        self.failures = {}
+
+    def add(self, crawl):
+        """
+        Register a CrawlClient with this manager
+
+        :param crawl: a CrawlClient, its jobs must run on the same server as this manager
+        :return: the registered CrawlClient
+        """
+        if crawl not in self.crawls:
+            self.crawls.append(crawl)
+            self.finishedRounds[crawl.crawlId] = []
+        return crawl
+
+    def remove(self, crawl):
+        self.crawls.remove(crawl)
+
+    def active(self):
+        """Return the crawls that still have a job running, or waiting to be retried, and have not failed"""
+        return [crawl for crawl in self.crawls
+                if (crawl.activeJobs or crawl.retryQueue) and crawl.crawlId not in self.failures]
+
+    def tick(self, nextRound=True):
+        """
+        Refresh all jobs with a single listing and start the next job of every crawl whose job has finished
+
+        Failed crawls are recorded in self.failures and are not advanced any further.  Failed jobs retried by the
+        retry policy of their crawl are started by the first tick after their backoff, ticks never wait for it.
+        Crawls with a stats.StatsSampler add their crawldb statistics to it when it is due and when a round ends.
+
+        :param nextRound: whether to start jobs from the next round if a crawl's round is completed.
+        :return: the list of crawls that are still active
+        """
+
+        active = self.active()
+        if not active:
+            return active
+
+        if any(crawl.activeJobs for crawl in active):
+            self.registry.refresh()
+
+        for crawl in active:
+            roundsDone = len(crawl.roundsDone)
+            for job in list(crawl.activeJobs):
+                listed = self.registry.jobs.get(job.id)
+                if listed is None:
+                    # jobs can drop out of the server listing, fall back to asking for the job itself
+                    jobInfo = job.refresh()
+                elif listed is job:
+                    jobInfo = job.snapshot
+                else:
+                    jobInfo = job._updateInfo(listed.snapshot, listed.snapshot.fetched)
+                crawl._countPoll(job)
+                roundIndex = crawl._jobRound(job) - 1
+                try:
+                    crawl._advance(jobInfo, nextRound, job)
+                except NutchCrawlException as error:
+                    self.failures[crawl.crawlId] = error
+                    break
+                # failed jobs waiting to be retried leave activeJobs too
+                if jobInfo['state'] == 'FINISHED':
+                    rounds = self.finishedRounds[crawl.crawlId]
+                    while len(rounds) <= roundIndex:
+                        rounds.append([])
+                    rounds[roundIndex].append(job)
+                    # the manager collects the finished jobs itself
+                    crawl.roundJobs.pop(roundIndex + 1, None)
+            if crawl.crawlId not in self.failures:
+                crawl._startRetries()
+                self._sampleStats(crawl, len(crawl.roundsDone) > roundsDone)
+
+        return self.active()
+
+    def _sampleStats(self, crawl, roundFinished):
+        """Add the crawldb statistics of crawl to its sampler, if any, when due or when one of its rounds ended"""
+
+        if roundFinished:
+            crawl._sampleStats(max(crawl.roundsDone), force=True)
+        else:
+            # as in nextRound(), samples belong to the oldest round not done yet
+            crawl._sampleStats(next((round for round in range(1, crawl.currentRound + 1)
+                                     if round not in crawl.roundsDone), crawl.currentRound))
+
+    def waitAll(self):
+        """
+        Tick until every managed crawl has completed all of its rounds or failed
+
+        If any crawl failed, the NutchCrawlException of the first failure is raised once the other crawls are done,
+        with the completed jobs of the failed crawl attached.
+
+        :return: a dict mapping the crawlId of each crawl to its completed jobs, organized by round (list-of-lists)
+        """
+
+        while self.tick():
+            sleep(self.sleepTime)
+
+        for crawl in self.crawls:
+            if crawl.crawlId in self.failures:
+                error = self.failures[crawl.crawlId]
+                error.completed_jobs = self.finishedRounds[crawl.crawlId]
+                raise error
+
+        return dict(self.finishedRounds)
+
+
+class ShardedCrawl(CrawlManager):
+    def __init__(self, server, crawls, sleepTime=1, registry=None):
+        """Nutch sharded crawl
+
+        A crawl whose seeds were split by host into shards, each one running as an independent CrawlClient with
+        its own seed list and crawlId.  The shards are advanced concurrently from a single poll loop, see
+        CrawlManager.  Use Nutch.ShardedCrawl() to split the seeds and launch the shards.
+
+        :param server: the Server all shards are running on
+        :param crawls: the CrawlClient of every shard
+        :param sleepTime: seconds to wait between ticks in waitAll()
+        :param registry: the JobRegistry refreshed on every tick, by default a new one
+        """
+        CrawlManager.__init__(self, server, sleepTime, registry)
+        self.shards = [self.add(crawl) for crawl in crawls]
+
+    def aggregate(self, finishedRounds=None):
+        """
+        Combine the completed jobs of all shards
+
+        :param finishedRounds: the result of waitAll(), by default the jobs completed so far
+        :return: the completed jobs of all shards, organized by round (list-of-lists)
+        """
+
+        finishedRounds = finishedRounds if finishedRounds is not None else self.finishedRounds
+        combined = []
+        for rounds in finishedRounds.values():
+            for roundIndex, jobs in enumerate(rounds):
+                while len(combined) <= roundIndex:
+                    combined.append([])
+                combined[roundIndex].extend(jobs)
+        return combined
+
+    def stats(self):
+        """Return the crawldb statistics of every shard, by crawlId"""
+        return dict((crawl.crawlId, crawl.jobClient.stats()) for crawl in self.shards)
+
+    def samplers(self):
+        """Return the stats.StatsSampler of every shard sampling its crawldb statistics, by crawlId"""
+        return dict((crawl.crawlId, crawl.sampler) for crawl in self.shards if crawl.sampler is not None)
+
+
 class Nutch:
-    def __init__(self, confId=DefaultConfig, serverEndpoint=DefaultServerEndpoint, raiseErrors=True, **args):
+    def __init__(self, confId=DefaultConfig, serverEndpoint=DefaultServerEndpoint, raiseErrors=True,
+                 poolMaxSize=DefaultPoolMaxSize, keepAlive=True, cacheConfig=False, compression=None,
+                 metrics=None, profiler=None, timeout=DefaultTimeout, retries=DefaultCallRetries,
+                 circuitBreaker=True, **args):
         '''
         Nutch client for interacting with a Nutch instance over its REST API.
 
@@ -641,6 +2641,15 @@ class Nutch:
         confID - The name of the default configuration file to use, by default: nutch.DefaultConfig
         serverEndpoint - The location of the Nutch server, by default: nutch.DefaultServerEndpoint
         raiseErrors - raise exceptions if server response is not 200
+        poolMaxSize - maximum number of pooled keep-alive connections to the server
+        keepAlive - reuse connections between calls to the server
+        cacheConfig - cache configuration parameters locally, see Config
+        compression - 'gzip' or 'deflate' to compress large request bodies, see Server
+        metrics - a metrics.Metrics registry for the calls to the server and the crawls, see CrawlClient
+        profiler - a profiler.CrawlProfiler recording the timeline of the crawls, see CrawlClient
+        timeout - seconds to wait for the server, as a (connect, read) tuple or a number, see Server
+        retries - times a GET failing with a connection error, a timeout or a 5xx response is sent again
+        circuitBreaker - a CircuitBreaker to stop calling a failing server, True for the default one, None for none
 
         Provides functions:
             server - getServerStatus, stopServer
@@ -655,19 +2664,36 @@ class Nutch:
         -- response, status = nt.crawl()
 
         Methods return a tuple of two items, the response content (JSON or text) and the response status.
+
+        Use close(), or the Nutch client as a context manager, to release pooled server connections.
         '''
 
         self.confId = confId
-        self.server = Server(serverEndpoint, raiseErrors)
-        self.config = ConfigClient(self.server)[self.confId]
+        self.server = Server(serverEndpoint, raiseErrors, poolMaxSize=poolMaxSize, keepAlive=keepAlive,
+                             compression=compression, metrics=metrics, timeout=timeout, retries=retries,
+                             circuitBreaker=circuitBreaker)
+        self.metrics = metrics
+        self.profiler = profiler
+        self.registry = JobRegistry(self.server)
+        self.cacheConfig = cacheConfig
+        self.config = self.Configs()[self.confId]
         self.job_parameters = dict()
         self.job_parameters['confId'] = confId
         self.job_parameters['args'] = args     # additional config. args as a dictionary
 
         # if the configuration doesn't contain a user agent, set a default one.
-        if 'http.agent.name' not in self.config.info():
+        if 'http.agent.name' not in self.config:
             self.config['http.agent.name'] = DefaultUserAgent
 
+    def close(self):
+        self.server.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     def Jobs(self, crawlId=None):
         """
         Create a JobClient for listing and creating jobs.
@@ -678,24 +2704,90 @@ class Nutch:
         :return: a JobClient
         """
         crawlId = crawlId if crawlId else defaultCrawlId()
-        return JobClient(self.server, crawlId, self.confId)
+        return JobClient(self.server, crawlId, self.confId, registry=self.registry)
 
     def Config(self):
         return self.config
 
     def Configs(self):
-        return ConfigClient(self.server)
+        return ConfigClient(self.server, cache=self.cacheConfig)
 
     def Seeds(self):
         return SeedClient(self.server)
 
-    def Crawl(self, seed, seedClient=None, jobClient=None, rounds=1, index=True):
+    def Crawls(self, sleepTime=1):
+        """
+        Create a CrawlManager to drive many crawls from a single poll loop
+        :param sleepTime: seconds to wait between ticks
+        :return: a CrawlManager
+        """
+        return CrawlManager(self.server, sleepTime, self.registry)
+
+    def ShardedCrawl(self, seedList, shards, crawlId=None, rounds=1, index=True, pollStrategy=None, stream=False,
+                     sleepTime=1, pipelined=False, phases=None, checkpoint=None, retryPolicy=None, statsInterval=None):
+        """
+        Split seed URLs by host into shards and launch an independent crawl for every shard
+
+        Each shard gets its own seed list and a crawlId of the form <crawlId>_shard<i>.  Shards without seeds
+        are skipped.
+
+        :param seedList: an iterable of seed URLs
+        :param shards: the number of shards
+        :param crawlId: the base crawlId of the shards, if not provided, will be generated by defaultCrawlId()
+        :param rounds: the number of rounds in every shard
+        :param stream: split the seeds through temporary files and stream every shard's upload, for seed lists
+                       that don't fit in memory
+        :param sleepTime: seconds to wait between ticks of the shared poll loop
+        :param pipelined: overlap the rounds of every shard, see CrawlClient
+        :param phases: the phases.PhaseGraph of every shard, see CrawlClient
+        :param checkpoint: the checkpoint store of every shard, see CrawlClient
+        :param retryPolicy: the RetryPolicy, or dict of them, of every shard, see CrawlClient
+        :param statsInterval: give every shard a stats.StatsSampler of its own, sampling the crawldb statistics at
+                              most every statsInterval seconds, see CrawlClient and ShardedCrawl.samplers()
+        :return: a ShardedCrawl to monitor and control the shards
+        """
+        crawlId = crawlId if crawlId else defaultCrawlId()
+        seedClient = self.Seeds()
+        crawls = []
+        # the shards are crawls of their own, sampling their own crawldb
+        sampler = lambda: StatsSampler(interval=statsInterval) if statsInterval is not None else None
+        if stream:
+            shardFiles = shardSeedsToFiles(seedList, shards)
+            try:
+                for i, shardFile in enumerate(shardFiles):
+                    if os.path.getsize(shardFile):
+                        jobClient = self.Jobs('%s_shard%d' % (crawlId, i))
+                        seed = seedClient.createFromFile(jobClient.crawlId + '_seeds', shardFile, stream=True)
+                        crawls.append(CrawlClient(self.server, seed, jobClient, rounds, index, pollStrategy,
+                                                  self.metrics, self.profiler, pipelined, phases, checkpoint,
+                                                  retryPolicy, sampler()))
+            finally:
+                for shardFile in shardFiles:
+                    os.remove(shardFile)
+        else:
+            for i, shardSeedList in enumerate(shardSeeds(seedList, shards)):
+                if shardSeedList:
+                    jobClient = self.Jobs('%s_shard%d' % (crawlId, i))
+                    seed = seedClient.create(jobClient.crawlId + '_seeds', shardSeedList)
+                    crawls.append(CrawlClient(self.server, seed, jobClient, rounds, index, pollStrategy,
+                                              self.metrics, self.profiler, pipelined, phases, checkpoint,
+                                              retryPolicy, sampler()))
+        return ShardedCrawl(self.server, crawls, sleepTime, self.registry)
+
+    def Crawl(self, seed, seedClient=None, jobClient=None, rounds=1, index=True, pollStrategy=None,
+              pipelined=False, phases=None, checkpoint=None, retryPolicy=None, sampler=None):
         """
         Launch a crawl using the given seed
         :param seed: Type (Seed or SeedList) - used for crawl
         :param seedClient: if a SeedList is given, the SeedClient to upload, if None a default will be created
         :param jobClient: the JobClient to be used, if None a default will be created
         :param rounds: the number of rounds in the crawl
+        :param pollStrategy: a PollStrategy, or a dict mapping job types to PollStrategies, see CrawlClient
+        :param pipelined: start generating and fetching the next round while the previous round finishes
+        :param phases: a PhaseGraph of the jobs of every round, their arguments and frequencies, instead of index
+        :param checkpoint: a checkpoint.FileCheckpoint or SqliteCheckpoint to save the crawl to, see ResumeCrawl()
+        :param retryPolicy: a RetryPolicy, or a dict mapping job types to RetryPolicies, for failed jobs
+        :param sampler: a stats.StatsSampler to add the crawldb statistics to while waiting, see CrawlClient
         :return: a CrawlClient to monitor and control the crawl
         """
         if seedClient is None:
@@ -705,7 +2797,26 @@ class Nutch:
 
         if type(seed) != Seed:
             seed = seedClient.create(jobClient.crawlId + '_seeds', seed)
-        return CrawlClient(self.server, seed, jobClient, rounds, index)
+        return CrawlClient(self.server, seed, jobClient, rounds, index, pollStrategy, self.metrics, self.profiler,
+                           pipelined, phases, checkpoint, retryPolicy, sampler)
+
+    def ResumeCrawl(self, crawlId, checkpoint, pollStrategy=None, phases=None, retryPolicy=None, sampler=None):
+        """
+        Continue a crawl saved to a checkpoint by a process that stopped before the crawl completed
+        :param crawlId: the crawlId of the crawl
+        :param checkpoint: the checkpoint given to Crawl()
+        :param pollStrategy: a PollStrategy, or a dict mapping job types to PollStrategies, see CrawlClient
+        :param phases: the PhaseGraph given to Crawl(), if any
+        :param retryPolicy: a RetryPolicy, or a dict mapping job types to RetryPolicies, for failed jobs
+        :param sampler: a stats.StatsSampler to add the crawldb statistics to while waiting, see CrawlClient
+        :return: a CrawlClient to monitor and control the crawl, waitAll() runs the remaining rounds
+        """
+        state = checkpoint.load(crawlId)
+        # the jobs of the crawl keep the configuration it was started with
+        confId = state['confId'] if state is not None else self.confId
+        jobClient = JobClient(self.server, crawlId, confId, registry=self.registry)
+        return CrawlClient.resume(self.server, jobClient, checkpoint, pollStrategy, self.metrics, self.profiler,
+                                  phases, retryPolicy, sampler)
 
     ## convenience functions
     ## TODO: Decide if any of these should be deprecated.
@@ -730,7 +2841,7 @@ class Nutch:
 
 def main(argv=None):
     """Run Nutch command using REST API."""
-    global Verbose, Mock
+    global Mock
     if argv is None:
         argv = sys.argv
 
@@ -750,7 +2861,7 @@ def main(argv=None):
         elif opt in ('-s', '--server'):  serverEndpoint = val
         elif opt in ('-p', '--port'):    serverEndpoint = 'http://localhost:%s' % val
         elif opt in ('-m', '--mock'):    Mock = 1
-        elif opt in ('-v', '--verbose'): Verbose = 1
+        elif opt in ('-v', '--verbose'): logging.basicConfig(level=logging.DEBUG)
         else: die(USAGE)
 
     cmd = argv[0]
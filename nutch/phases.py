@@ -0,0 +1,185 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+The jobs a crawl runs, in which order, in which rounds and with which arguments
+
+A PhaseGraph is passed to CrawlClient (or to Nutch.Crawl) instead of the index flag.  The default graph runs
+GENERATE, FETCH, PARSE, UPDATEDB, INVERTLINKS, DEDUP and INDEX in every round, other graphs change the arguments
+of phases, run them less often or add phases:
+
+-- phases = PhaseGraph.default().configure('GENERATE', args={'topN': 50000}) \\
+--     .configure('INVERTLINKS', every=3).configure('DEDUP', every=3) \\
+--     .configure('INDEX', when=lastRound)
+-- nt.Crawl(seedUrls, rounds=10, phases=phases).waitAll()
+"""
+
+DefaultRoundPhases = ('GENERATE', 'FETCH', 'PARSE', 'UPDATEDB', 'INVERTLINKS', 'DEDUP', 'INDEX')
+
+
+def lastRound(round, totalRounds):
+    """Frequency rule of a phase running in the last round only, see Phase"""
+    return round == totalRounds
+
+
+class Phase(object):
+    """A job of a crawl round, with its arguments and the rounds it runs in"""
+    __slots__ = ('type', 'args', 'every', 'final', 'when')
+
+    def __init__(self, jobType, args=None, every=1, final=True, when=None):
+        """
+        :param jobType: the Nutch job type, e.g. 'FETCH'
+        :param args: arguments of the job, e.g. {'topN': 1000}, or a function of the round returning them
+        :param every: run in every every-th round only, i.e. in rounds every, 2 * every, ...
+        :param final: also run in the last round of the crawl, whatever every says
+        :param when: a function of (round, totalRounds) deciding whether to run, instead of every and final
+        """
+        if every < 1:
+            raise ValueError('every must be at least 1, not %r' % every)
+        self.type = jobType.upper()
+        self.args = args
+        self.every = every
+        self.final = final
+        self.when = when
+
+    def runs(self, round, totalRounds):
+        """Whether this phase runs in round, of totalRounds"""
+
+        if self.when is not None:
+            return bool(self.when(round, totalRounds))
+        return round % self.every == 0 or (self.final and round == totalRounds)
+
+    def jobArgs(self, round):
+        """Return the arguments of the job of this phase in round"""
+
+        if callable(self.args):
+            return dict(self.args(round) or {})
+        return dict(self.args or {})
+
+    def copy(self, **changes):
+        rules = dict((name, getattr(self, name)) for name in ('args', 'every', 'final', 'when'))
+        rules.update(changes)
+        return Phase(self.type, **rules)
+
+    def __repr__(self):
+        return 'Phase(%r)' % self.type
+
+
+class PhaseGraph(object):
+    """
+    The jobs of a crawl: INJECT once, then the phases of every round in order, skipping those not running in it
+
+    The first phase of a round, GENERATE by default, must run in every round.  Job types identify the phases,
+    so every type appears once.
+    """
+
+    def __init__(self, phases=DefaultRoundPhases, inject=None):
+        """
+        :param phases: the phases of a round in order, as Phases or job types
+        :param inject: the INJECT Phase, to pass arguments to the injection
+        """
+        self.phases = tuple(phase if isinstance(phase, Phase) else Phase(phase) for phase in phases)
+        self.inject = inject if inject is not None else Phase('INJECT')
+        self.positions = dict((phase.type, i) for i, phase in enumerate(self.phases))
+
+        if not self.phases:
+            raise ValueError('A round needs at least one phase')
+        if len(self.positions) != len(self.phases):
+            raise ValueError('Every job type can only appear once in a round: %s' % ', '.join(self.types()))
+        first = self.phases[0]
+        if first.when is not None or first.every != 1:
+            raise ValueError('The first phase of a round, %s, must run in every round' % first.type)
+
+    @classmethod
+    def default(cls, index=True):
+        """The graph of CrawlClient before phase graphs, with or without INDEX"""
+        return cls([jobType for jobType in DefaultRoundPhases if index or jobType != 'INDEX'])
+
+    def types(self):
+        return [phase.type for phase in self.phases]
+
+    def __contains__(self, jobType):
+        return jobType == self.inject.type or jobType in self.positions
+
+    def first(self):
+        return self.phases[0]
+
+    def phase(self, jobType):
+        """Return the Phase of a job type, INJECT included"""
+        if jobType == self.inject.type:
+            return self.inject
+        return self.phases[self.positions[jobType]]
+
+    def next(self, jobType, round, totalRounds):
+        """
+        Return the Phase following a finished job of round
+
+        :param jobType: the type of the finished job
+        :param round: the round the job ran in
+        :param totalRounds: the number of rounds of the crawl
+        :return: the next Phase of the round, the first one after INJECT, None if the round is done
+        """
+
+        if jobType == self.inject.type:
+            return self.first()
+        for phase in self.phases[self.positions[jobType] + 1:]:
+            if phase.runs(round, totalRounds):
+                return phase
+        return None
+
+    def rounds(self, totalRounds):
+        """Return the job types of every round of a crawl of totalRounds, to check a graph before crawling"""
+        return [[phase.type for phase in self.phases if phase.runs(round, totalRounds)]
+                for round in range(1, totalRounds + 1)]
+
+    def configure(self, jobType, **rules):
+        """
+        Return a copy of this graph with other arguments or frequency rules for a phase
+
+        :param jobType: the type of the phase to change
+        :param rules: the Phase arguments to change, args, every, final or when
+        """
+
+        jobType = jobType.upper()
+        if jobType == self.inject.type:
+            return PhaseGraph(self.phases, self.inject.copy(**rules))
+        if jobType not in self.positions:
+            raise ValueError('No %s phase in %s' % (jobType, ', '.join(self.types())))
+        return PhaseGraph([phase.copy(**rules) if phase.type == jobType else phase for phase in self.phases],
+                          self.inject)
+
+    def insert(self, phase, after):
+        """
+        Return a copy of this graph with an extra phase
+
+        :param phase: the Phase, or job type, to add
+        :param after: the type of the phase it runs after
+        """
+
+        after = after.upper()
+        if after not in self.positions:
+            raise ValueError('No %s phase in %s' % (after, ', '.join(self.types())))
+        phases = list(self.phases)
+        phases.insert(self.positions[after] + 1, phase)
+        return PhaseGraph(phases, self.inject)
+
+    def remove(self, jobType):
+        """Return a copy of this graph without a phase"""
+        jobType = jobType.upper()
+        return PhaseGraph([phase for phase in self.phases if phase.type != jobType], self.inject)
+
+    def __repr__(self):
+        return 'PhaseGraph(%s)' % ', '.join(self.types())
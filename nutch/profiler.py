@@ -0,0 +1,196 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Timeline of the jobs of crawls, to find out where the time of every round goes
+
+A CrawlProfiler is passed to CrawlClient (or to Nutch, which passes it on) and records, for every job:
+
+requested   - when the client asked the server to create the job
+created     - when the server answered the creation request
+lastRunning - the last status check that found the job running
+detected    - the first status check that found the job done
+gap         - the dead time from the previous job of the crawl being detected done until this job was requested
+
+The server doesn't report when a job ended, it did so between lastRunning and detected.
+
+-- profiler = CrawlProfiler()
+-- nt = Nutch(profiler=profiler)
+-- nt.Crawl(seedUrls, rounds=2).waitAll()
+-- profiler.phaseTotals()
+-- profiler.writeChromeTrace('crawl.trace.json')  # open in chrome://tracing or https://ui.perfetto.dev
+"""
+
+import collections
+import json
+
+
+class PhaseTiming(object):
+    """Timestamps of one job of a crawl, see the module documentation"""
+    __slots__ = ('crawlId', 'round', 'type', 'jobId', 'requested', 'created', 'lastRunning', 'detected',
+                 'state', 'polls', 'gap')
+
+    def __init__(self, crawlId, round, jobType, jobId, requested, created, gap=None):
+        self.crawlId = crawlId
+        self.round = round
+        self.type = jobType
+        self.jobId = jobId
+        self.requested = requested
+        self.created = created
+        self.lastRunning = None
+        self.detected = None
+        self.state = 'RUNNING'
+        self.polls = 0
+        self.gap = gap
+
+    @property
+    def duration(self):
+        """Seconds from the creation of the job until it was detected done, None while it runs"""
+        return None if self.detected is None else self.detected - self.created
+
+    @property
+    def pollLag(self):
+        """Upper bound of the seconds between the end of the job and its detection"""
+        if self.detected is None:
+            return None
+        return self.detected - (self.created if self.lastRunning is None else self.lastRunning)
+
+    def asDict(self):
+        result = dict((name, getattr(self, name)) for name in self.__slots__)
+        result.update(duration=self.duration, pollLag=self.pollLag)
+        return result
+
+    def __repr__(self):
+        return 'PhaseTiming(%s round %d %s %s)' % (self.crawlId, self.round, self.type, self.state)
+
+
+class CrawlProfiler(object):
+    """
+    Records a PhaseTiming for every job started by the crawls it is passed to
+
+    The crawls call jobStarted(), jobRunning() and jobFinished() as they go.
+    """
+
+    def __init__(self):
+        self.timings = []   # in the order the jobs were requested
+        self.jobs = {}      # job id -> PhaseTiming
+        self.lastDetected = {}  # crawlId -> when its last job was detected done
+
+    def jobStarted(self, crawlId, round, job, requested, created):
+        timing = PhaseTiming(crawlId, round, job.type, job.id, requested, created)
+        if crawlId in self.lastDetected:
+            timing.gap = requested - self.lastDetected[crawlId]
+        self.timings.append(timing)
+        self.jobs[job.id] = timing
+
+    def jobRunning(self, job, seen):
+        timing = self.jobs.get(job.id)
+        if timing is not None:
+            timing.lastRunning = seen
+            timing.polls += 1
+
+    def jobFinished(self, job, seen, state):
+        timing = self.jobs.get(job.id)
+        if timing is not None and timing.detected is None:
+            timing.detected = seen
+            timing.state = state
+            timing.polls += 1
+            self.lastDetected[timing.crawlId] = seen
+
+    def crawlIds(self):
+        return list(collections.OrderedDict.fromkeys(timing.crawlId for timing in self.timings))
+
+    def timeline(self, crawlId=None):
+        """
+        Return the PhaseTimings of a crawl, as a list of rounds
+
+        :param crawlId: the crawl, may be left out if only one crawl was profiled
+        :return: a list with a list of PhaseTimings per round, in the order the jobs were requested
+        """
+
+        if crawlId is None:
+            crawlIds = self.crawlIds()
+            if len(crawlIds) > 1:
+                raise ValueError('Several crawls were profiled, pick one of %s' % ', '.join(crawlIds))
+            crawlId = crawlIds[0] if crawlIds else None
+
+        rounds = []
+        for timing in self.timings:
+            if timing.crawlId == crawlId:
+                while len(rounds) < timing.round:
+                    rounds.append([])
+                rounds[timing.round - 1].append(timing)
+        return rounds
+
+    def phaseTotals(self, crawlId=None):
+        """
+        Return the time spent per job type, to find the phase that limits a crawl
+
+        :param crawlId: only count the jobs of this crawl, by default count every crawl
+        :return: a dict mapping job types to dicts of count, duration, gap and pollLag totals in seconds,
+                 ordered by decreasing duration
+        """
+
+        totals = {}
+        for timing in self.timings:
+            if crawlId is not None and timing.crawlId != crawlId:
+                continue
+            total = totals.setdefault(timing.type, {'count': 0, 'duration': 0.0, 'gap': 0.0, 'pollLag': 0.0})
+            total['count'] += 1
+            for name in ('duration', 'gap', 'pollLag'):
+                total[name] += getattr(timing, name) or 0.0
+        return collections.OrderedDict(sorted(totals.items(), key=lambda item: -item[1]['duration']))
+
+    def snapshot(self):
+        """Return every PhaseTiming as a dict, ready to be dumped as JSON"""
+        return [timing.asDict() for timing in self.timings]
+
+    def chromeTrace(self):
+        """
+        Return the timeline in the Chrome trace event format
+
+        Every crawl is a process and every round a thread.  Jobs are spans from their request until they were
+        detected done, with the dead time before them as separate 'gap' spans.
+        """
+
+        if not self.timings:
+            return {'traceEvents': []}
+        origin = min(timing.requested - (timing.gap or 0.0) for timing in self.timings)
+        micros = lambda t: int(round((t - origin) * 1e6))
+
+        events = []
+        pids = {}
+        for timing in self.timings:
+            if timing.crawlId not in pids:
+                pids[timing.crawlId] = len(pids) + 1
+                events.append({'name': 'process_name', 'ph': 'M', 'pid': pids[timing.crawlId],
+                               'args': {'name': timing.crawlId}})
+            span = {'pid': pids[timing.crawlId], 'tid': timing.round, 'ph': 'X'}
+            if timing.gap:
+                events.append(dict(span, name='gap', cat='gap', ts=micros(timing.requested - timing.gap),
+                                   dur=micros(timing.requested) - micros(timing.requested - timing.gap)))
+            end = timing.detected if timing.detected is not None else timing.lastRunning or timing.created
+            events.append(dict(span, name=timing.type, cat='job', ts=micros(timing.requested),
+                               dur=micros(end) - micros(timing.requested),
+                               args={'jobId': timing.jobId, 'state': timing.state, 'polls': timing.polls,
+                                     'createLatency': timing.created - timing.requested,
+                                     'pollLag': timing.pollLag}))
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def writeChromeTrace(self, filename):
+        """Write chromeTrace() to filename, to be opened in chrome://tracing or https://ui.perfetto.dev"""
+        with open(filename, 'w') as f:
+            json.dump(self.chromeTrace(), f)
@@ -0,0 +1,222 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Client-side processing of seed URLs before they are uploaded to the Nutch server
+"""
+
+from array import array
+import hashlib
+import os
+import struct
+import tempfile
+
+try:
+    from urllib.parse import urlsplit, urlunsplit
+except ImportError:
+    from urlparse import urlsplit, urlunsplit
+
+DefaultPorts = {'http': 80, 'https': 443}
+DefaultFingerprintCapacity = 1 << 16
+
+
+def hash64(text):
+    """Stable, well mixed 64-bit hash of a string"""
+    return struct.unpack('>Q', hashlib.md5(text.encode('utf-8')).digest()[:8])[0]
+
+
+def normalizeUrl(url):
+    """
+    Return a canonical form of a URL, so trivially equivalent URLs compare equal
+
+    The scheme and host are lower-cased, default ports and fragments are dropped and an empty path becomes '/'.
+    URLs that can't be parsed are returned stripped but otherwise unchanged.
+    """
+
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        host = parts.hostname
+        port = parts.port
+    except ValueError:
+        return url
+    if not parts.scheme or host is None:
+        return url
+
+    scheme = parts.scheme.lower()
+    if ':' in host:
+        host = '[%s]' % host
+    netloc = host
+    if port is not None and port != DefaultPorts.get(scheme):
+        netloc = '%s:%d' % (host, port)
+    userinfo = parts.netloc.rpartition('@')[0]
+    if userinfo:
+        netloc = userinfo + '@' + netloc
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
+
+
+class FingerprintSet(object):
+    """
+    Set of 64-bit fingerprints stored in an open-addressing table of unsigned 64-bit integers
+
+    Uses 8 bytes per slot and at most twice as many slots as fingerprints, instead of a Python object per member.
+    """
+
+    MaxLoad = 0.7
+
+    def __init__(self, capacity=DefaultFingerprintCapacity):
+        """
+        :param capacity: the number of fingerprints expected, the table grows as needed
+        """
+        size = 1
+        while size * self.MaxLoad < capacity:
+            size <<= 1
+        self.table = array('Q', [0]) * size
+        self.mask = size - 1
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _slot(self, fingerprint):
+        # 0 marks an empty slot
+        fingerprint = fingerprint or 1
+        table = self.table
+        mask = self.mask
+        i = fingerprint & mask
+        while table[i] and table[i] != fingerprint:
+            i = (i + 1) & mask
+        return i, fingerprint
+
+    def __contains__(self, fingerprint):
+        i, fingerprint = self._slot(fingerprint)
+        return self.table[i] == fingerprint
+
+    def add(self, fingerprint):
+        """Add a fingerprint, return False if it was already in the set"""
+
+        i, fingerprint = self._slot(fingerprint)
+        if self.table[i]:
+            return False
+        self.table[i] = fingerprint
+        self.count += 1
+        if self.count > len(self.table) * self.MaxLoad:
+            self._grow()
+        return True
+
+    def _grow(self):
+        old = self.table
+        self.table = array('Q', [0]) * (len(old) * 2)
+        self.mask = len(self.table) - 1
+        for fingerprint in old:
+            if fingerprint:
+                self.table[self._slot(fingerprint)[0]] = fingerprint
+
+
+class SeedFilter(object):
+    """
+    Normalizes seed URLs and drops duplicates, keeping only a 64-bit fingerprint per distinct URL
+
+    Two different URLs sharing a fingerprint would wrongly be dropped as duplicates, with tens of millions of URLs
+    the odds of that happening at all are below one in ten thousand.
+
+    -- seedFilter = SeedFilter()
+    -- seed = seedClient.create('my_seeds', seedFilter.filter(urls), stream=True)
+    -- print(seedFilter.duplicates)
+    """
+
+    def __init__(self, normalize=True, capacity=DefaultFingerprintCapacity):
+        """
+        :param normalize: normalize URLs with normalizeUrl() before comparing them
+        :param capacity: the number of distinct URLs expected, see FingerprintSet
+        """
+        self.normalize = normalize
+        self.fingerprints = FingerprintSet(capacity)
+        self.duplicates = 0
+
+    def filter(self, seedList):
+        """Lazily yield the (normalized) URLs of seedList that were not seen before by this filter"""
+
+        for url in seedList:
+            if self.normalize:
+                url = normalizeUrl(url)
+            if self.fingerprints.add(hash64(url)):
+                yield url
+            else:
+                self.duplicates += 1
+
+
+def hostShard(url, shards):
+    """
+    Return the shard (0 to shards - 1) of a URL, decided by a stable hash of its host
+
+    All URLs of a host land in the same shard, so its politeness queue stays within one crawl.
+    """
+
+    try:
+        host = urlsplit(url.strip()).hostname or ''
+    except ValueError:
+        host = ''
+    # crc32 spreads similar short host names badly, use a well mixed hash
+    return hash64(host) % shards
+
+
+def shardSeeds(seedList, shards):
+    """
+    Split seed URLs by host into lists
+
+    :param seedList: an iterable of URLs
+    :param shards: the number of shards
+    :return: a list of shards lists of URLs
+    """
+
+    result = [[] for i in range(shards)]
+    for url in seedList:
+        result[hostShard(url, shards)].append(url)
+    return result
+
+
+def shardSeedsToFiles(seedList, shards, directory=None):
+    """
+    Split seed URLs by host into files, one URL per line, without holding them in memory
+
+    :param seedList: an iterable of URLs, e.g. nutch.iterSeedFile(filename), blank ones are skipped
+    :param shards: the number of shards
+    :param directory: where to write the shard files, by default the system's temporary directory
+    :return: a list of shards file names, the caller is responsible for removing them
+    """
+
+    filenames = []
+    files = []
+    try:
+        for i in range(shards):
+            fd, filename = tempfile.mkstemp(prefix='seed_shard%d_' % i, suffix='.txt', dir=directory)
+            filenames.append(filename)
+            files.append(os.fdopen(fd, 'w'))
+        for url in seedList:
+            url = url.strip()
+            if url:
+                files[hostShard(url, shards)].write(url + '\n')
+        for f in files:
+            f.close()
+    except BaseException:
+        # don't leave the shards written so far behind
+        for f in files:
+            f.close()
+        for filename in filenames:
+            os.remove(filename)
+        raise
+    return filenames
@@ -0,0 +1,250 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Time series of the crawldb statistics of a crawl, to follow its throughput round by round
+
+A StatsSampler is passed to CrawlClient (or to Nutch.Crawl), which adds the statistics of JobClient.stats() to it
+between status checks, at most every interval seconds, and at the end of every round.  sample() adds a sample on
+demand.  Samples equal to the previous one are skipped, so the series of a long crawl stays small:
+
+-- sampler = StatsSampler(interval=60)
+-- nt.Crawl(seedUrls, rounds=10, sampler=sampler).waitAll()
+-- sampler.writeCsv('crawl-stats.csv')
+-- [(r['round'], r['rate']) for r in sampler.rounds()]   # URLs fetched per second in every round
+"""
+
+import csv
+import itertools
+import json
+import numbers
+import threading
+from time import time
+
+try:
+    from cStringIO import StringIO  # Python 2, whose csv module writes bytes
+except ImportError:
+    from io import StringIO
+
+try:
+    from .metrics import _atomicWrite
+except (ImportError, ValueError):
+    from metrics import _atomicWrite
+
+DefaultStatsInterval = 60       # seconds between the samples taken while a crawl waits
+DefaultRateField = 'db_fetched'
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, numbers.Number):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def statsCounts(stats):
+    """
+    Return the counts of crawldb statistics as a flat dict
+
+    The numbers at the top level, e.g. totalUrls, are kept under their names, and the count of every CrawlDatum
+    status, e.g. db_fetched, db_unfetched or db_gone, under the name of the status.
+
+    :param stats: the crawldb statistics, as returned by JobClient.stats()
+    """
+
+    counts = {}
+    for name, value in stats.items():
+        value = _number(value)
+        if value is not None:
+            counts[name] = value
+    for name, value in (stats.get('status') or {}).items():
+        if isinstance(value, dict):
+            # statuses listed by code, with their name and count
+            name, value = value.get('statusValue', name), value.get('count')
+        value = _number(value)
+        if value is not None:
+            counts[name] = value
+    return counts
+
+
+class StatsSampler(object):
+    """
+    Time series of crawldb statistics, with the changes and rates of change of their counts
+
+    A sample is the time it was taken, the round of the crawl it belongs to and the counts of statsCounts().
+    The names of the counts are kept once, in fields, and every sample stores its values in that order.
+    Counts missing from a sample, e.g. statuses no URL has yet, are taken as 0 in changes and rates.
+    """
+
+    def __init__(self, interval=DefaultStatsInterval, rateField=DefaultRateField, clock=time):
+        """
+        :param interval: seconds between the samples a crawl takes while it waits, at least
+        :param rateField: the count whose changes deltas(), rounds() and the CSV give, URLs fetched by default
+        :param clock: function returning the current time in seconds
+        """
+        self.interval = interval
+        self.rateField = rateField
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.fields = []        # names of the counts, in the order of the values of samples
+        self.samples = []       # (timestamp, round, values)
+        self.checked = None     # time of the last sample taken, added or skipped
+        self.skipped = 0
+
+    def due(self):
+        """Whether interval seconds passed since the last sample was taken"""
+        return self.checked is None or self.clock() - self.checked >= self.interval
+
+    def add(self, stats, round=None, timestamp=None):
+        """
+        Add crawldb statistics to the series, unless neither they nor the round changed since the last sample
+
+        :param stats: the crawldb statistics, as returned by JobClient.stats()
+        :param round: the round of the crawl the statistics belong to, None if none
+        :param timestamp: the time the statistics were taken, by default now
+        :return: whether a sample was added
+        """
+
+        timestamp = self.clock() if timestamp is None else timestamp
+        counts = statsCounts(stats)
+        with self.lock:
+            self.checked = timestamp
+            self.fields.extend(sorted(name for name in counts if name not in self.fields))
+            values = tuple(counts.get(name) for name in self.fields)
+            if self.samples:
+                last = self.samples[-1]
+                if last[1] == round and last[2] + (None,) * (len(values) - len(last[2])) == values:
+                    self.skipped += 1
+                    return False
+            self.samples.append((timestamp, round, values))
+            return True
+
+    def sample(self, jobClient, round=None):
+        """Add the statistics of jobClient.stats() now, see add()"""
+        return self.add(jobClient.stats(), round)
+
+    def _value(self, values, index):
+        return (values[index] if index < len(values) else None) or 0
+
+    def rows(self):
+        """Return every sample as a dict of its timestamp, round and counts"""
+
+        with self.lock:
+            fields = list(self.fields)
+            samples = list(self.samples)
+        rows = []
+        for timestamp, round, values in samples:
+            row = dict((name, value) for name, value in zip(fields, values) if value is not None)
+            row.update(timestamp=timestamp, round=round)
+            rows.append(row)
+        return rows
+
+    def deltas(self, field=None):
+        """
+        Return the changes of a count between consecutive samples
+
+        :param field: the name of the count, by default rateField
+        :return: a (timestamp, round, seconds, delta, rate) tuple for every sample after the first one, the rate
+                 being the change per second since the sample before, None if no time passed
+        """
+
+        field = self.rateField if field is None else field
+        with self.lock:
+            index = self.fields.index(field) if field in self.fields else len(self.fields)
+            samples = list(self.samples)
+        deltas = []
+        for (before, _, previous), (timestamp, round, values) in zip(samples, samples[1:]):
+            seconds = timestamp - before
+            delta = self._value(values, index) - self._value(previous, index)
+            deltas.append((timestamp, round, seconds, delta, delta / float(seconds) if seconds > 0 else None))
+        return deltas
+
+    def rounds(self, field=None):
+        """
+        Return the change of a count, and its rate, in every round sampled
+
+        A round spans from the last sample of the round before, or its own first sample, to its last sample.
+
+        :param field: the name of the count, by default rateField
+        :return: a list of dicts with the round, start, end, seconds, delta and rate of every round
+        """
+
+        field = self.rateField if field is None else field
+        with self.lock:
+            index = self.fields.index(field) if field in self.fields else len(self.fields)
+            samples = list(self.samples)
+        rounds = []
+        previous = None
+        for round, group in itertools.groupby(samples, key=lambda sample: sample[1]):
+            group = list(group)
+            first = previous if previous is not None else group[0]
+            last = previous = group[-1]
+            if round is None:
+                continue
+            seconds = last[0] - first[0]
+            delta = self._value(last[2], index) - self._value(first[2], index)
+            rounds.append({'round': round, 'start': first[0], 'end': last[0], 'seconds': seconds, 'delta': delta,
+                           'rate': delta / float(seconds) if seconds > 0 else None})
+        return rounds
+
+    def snapshot(self):
+        """Return the series, and the changes of rateField in every round, as a dict ready to be dumped as JSON"""
+
+        return {
+            'interval': self.interval,
+            'rateField': self.rateField,
+            'fields': list(self.fields),
+            'samples': self.rows(),
+            'skipped': self.skipped,
+            'rounds': self.rounds(),
+        }
+
+    def csv(self):
+        """
+        Return the series as CSV, one sample per line
+
+        The columns are timestamp, round, every count, and the rate of change per second of rateField since the
+        sample before, e.g. db_fetched_rate.
+        """
+
+        with self.lock:
+            fields = list(self.fields)
+            samples = list(self.samples)
+        index = fields.index(self.rateField) if self.rateField in fields else len(fields)
+        out = StringIO()
+        writer = csv.writer(out, lineterminator='\n')
+        writer.writerow(['timestamp', 'round'] + fields + [self.rateField + '_rate'])
+        previous = None
+        for timestamp, round, values in samples:
+            rate = None
+            if previous is not None and timestamp > previous[0]:
+                rate = (self._value(values, index) - self._value(previous[2], index)) / float(timestamp - previous[0])
+            values = values + (None,) * (len(fields) - len(values))
+            writer.writerow([timestamp, round] + list(values) + [rate])
+            previous = (timestamp, round, values)
+        return out.getvalue()
+
+    def writeCsv(self, filename):
+        """Atomically write csv() to filename"""
+        _atomicWrite(filename, self.csv())
+
+    def writeJson(self, filename):
+        """Atomically write snapshot() as JSON to filename"""
+        _atomicWrite(filename, json.dumps(self.snapshot(), indent=2, sort_keys=True))
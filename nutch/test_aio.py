@@ -0,0 +1,232 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Test the asyncio client, with a stub in place of the aiohttp session, no Nutch REST server is needed
+
+from nutch import nutch
+import asyncio
+import json
+import pytest
+
+aio = pytest.importorskip('nutch.aio')
+
+SeedUrls = ['http://nutch.apache.org', 'http://www.apache.org']
+RoundPhases = ['GENERATE', 'FETCH', 'PARSE', 'UPDATEDB', 'INVERTLINKS', 'DEDUP']
+
+
+class StubResponse(object):
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+        self.headers = {'content-type': 'text/plain' if isinstance(body, str) else 'application/json'}
+
+    async def read(self):
+        return (self.body if isinstance(self.body, str) else json.dumps(self.body)).encode('utf-8')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+class StubSession(object):
+    """
+    Stands in for the aiohttp session of an AsyncServer, answering like a Nutch REST server
+
+    Jobs are RUNNING when created and FINISHED once they have been checked.
+    """
+
+    def __init__(self):
+        self.closed = False
+        self.calls = []
+        self.configs = {'default': {'fetcher.threads.fetch': '10'}}
+        self.seeds = {}
+        self.jobs = {}
+
+    def request(self, verb, url, data=None, headers=None, **args):
+        path = url.split('/', 3)[3]
+        self.calls.append((verb, '/' + path))
+        parts = path.split('/')
+        return StubResponse(*getattr(self, '_%s_%s' % (verb, parts[0]))(parts[1:], self._body(data, headers)))
+
+    async def close(self):
+        self.closed = True
+
+    @staticmethod
+    def _body(data, headers):
+        data = data.decode('utf-8')
+        if headers.get('Content-Type') == 'text/plain':
+            return data
+        return json.loads(data)
+
+    def _get_admin(self, parts, body):
+        return 200, {'configuration': sorted(self.configs), 'jobs': list(self.jobs.values())}
+
+    def _get_config(self, parts, body):
+        if not parts:
+            return 200, sorted(self.configs)
+        params = self.configs.get(parts[0], {})
+        return 200, params if len(parts) == 1 else params.get(parts[1], '')
+
+    def _put_config(self, parts, body):
+        self.configs[parts[0]][parts[1]] = body
+        return 200, ''
+
+    def _post_config(self, parts, body):
+        self.configs[body['configId']] = dict(body['params'])
+        return 200, body['configId']
+
+    def _post_seed(self, parts, body):
+        seedPath = '/tmp/%s-%d' % (body['name'], len(self.seeds))
+        self.seeds[seedPath] = [seedUrl['url'] for seedUrl in body['seedUrls']]
+        return 200, seedPath
+
+    def _get_job(self, parts, body):
+        if not parts:
+            return 200, list(self.jobs.values())
+        job = self.jobs.get(parts[0])
+        if job is None:
+            return 404, 'No such job'
+        if len(parts) == 2:
+            job['state'] = 'KILLED'
+            return 200, True
+        info = dict(job)
+        job['state'] = 'FINISHED' if job['state'] == 'RUNNING' else job['state']
+        return 200, info
+
+    def _post_job(self, parts, body):
+        jid = '%s-%s-%d' % (body['crawlId'], body['type'], len(self.jobs))
+        self.jobs[jid] = {'id': jid, 'type': body['type'], 'state': 'RUNNING', 'msg': 'OK',
+                          'crawlId': body['crawlId'], 'confId': body['confId'], 'args': dict(body['args'])}
+        return 200, dict(self.jobs[jid])
+
+    def _post_db(self, parts, body):
+        fetched = len([job for job in self.jobs.values() if job['type'] == 'FETCH' and
+                       job['crawlId'] == body['crawlId']])
+        return 200, {'status': {'db_fetched': fetched}}
+
+
+def stub_server():
+    server = aio.AsyncServer('http://localhost:8081')
+    server.session = StubSession()
+    return server
+
+
+def test_server_call():
+    async def calls(server):
+        async with server:
+            status = await server.call('get', '/admin')
+            with pytest.raises(nutch.NutchException) as error:
+                await server.call('get', '/job/unknown')
+            return status, error.value.status_code
+
+    server = stub_server()
+    session = server.session
+    status, statusCode = asyncio.run(calls(server))
+    assert status['configuration'] == ['default']
+    assert statusCode == 404
+    # the session is closed with the server
+    assert session.closed and server.session is None
+    with pytest.raises(TypeError):
+        with server:
+            pass
+
+
+def test_job_create_and_info():
+    async def jobs(server):
+        jc = aio.AsyncJobClient(server, 'crawl-a', 'default')
+        other = aio.AsyncJobClient(server, 'crawl-b', 'default')
+        generate = await jc.generate()
+        fetch = await jc.create('FETCH', threads=2)
+        # the response to /job/create is the first snapshot, stub jobs finish after being checked once
+        running = await fetch.info()
+        await fetch.refresh()
+        finished = await fetch.info(maxAge=0)
+        await generate.abort()
+        return (generate, fetch, running, finished, await generate.info(), await jc.list(), await other.list(),
+                await other.list(allJobs=True))
+
+    server = stub_server()
+    generate, fetch, running, finished, aborted, listed, others, every = asyncio.run(jobs(server))
+
+    assert isinstance(generate, aio.AsyncJob)
+    assert (running['type'], running['state'], running['confId']) == ('FETCH', 'RUNNING', 'default')
+    assert running['args']['threads'] == 2
+    assert (finished['id'], finished.state) == (fetch.id, 'FINISHED')
+    assert aborted['state'] == 'KILLED'
+    # jobs are listed for their crawlId only, unless all of them are asked for
+    assert sorted(job.id for job in listed) == sorted([generate.id, fetch.id])
+    assert others == []
+    assert sorted(job.id for job in every) == sorted([generate.id, fetch.id])
+
+
+def test_config_get_and_set():
+    async def configs(server):
+        cc = aio.AsyncConfigClient(server)
+        config = await cc.get('default')
+        await config.set('fetcher.threads.fetch', '20')
+        copy = await cc.create('copy', {'http.agent.name': 'test'})
+        with pytest.raises(KeyError):
+            await cc.get('unknown')
+        with pytest.raises(TypeError):
+            config['fetcher.threads.fetch'] = '30'
+        return (await config['fetcher.threads.fetch'], await copy['http.agent.name'],
+                [config.id for config in await cc.list()])
+
+    threads, agent, listed = asyncio.run(configs(stub_server()))
+    assert threads == '20'
+    assert agent == 'test'
+    assert listed == ['copy', 'default']
+
+
+def test_crawl():
+    async def crawl(server):
+        seed = await aio.AsyncSeedClient(server).create('test_seed', SeedUrls)
+        jc = aio.AsyncJobClient(server, 'crawl-a', 'default')
+        cc = aio.AsyncCrawlClient(server, seed, jc, rounds=2, index=False, pollStrategy=nutch.FixedPoll(0))
+        inject = await cc.start()
+        rounds = await cc.waitAll()
+        return seed, inject, cc, rounds, await jc.stats()
+
+    server = stub_server()
+    seed, inject, cc, rounds, stats = asyncio.run(crawl(server))
+
+    assert server.session.seeds[seed.seedPath] == SeedUrls
+    assert server.session.jobs[inject.id]['type'] == 'INJECT'
+    assert [[job.type for job in jobs] for jobs in rounds] == [['INJECT'] + RoundPhases, RoundPhases]
+    assert cc.currentJob is None
+    assert stats['status']['db_fetched'] == 2
+
+
+def test_nutch_crawls():
+    async def crawl(nt):
+        async with nt:
+            crawls = [await nt.Crawl(SeedUrls, index=False, pollStrategy=nutch.FixedPoll(0)) for i in range(3)]
+            # the crawls share the event loop and the connections of one server
+            return nt.Config(), await asyncio.gather(*[cc.waitAll() for cc in crawls])
+
+    nt = aio.AsyncNutch()
+    nt.server.session = session = StubSession()
+    config, results = asyncio.run(crawl(nt))
+
+    # opening the client sets a user agent on a configuration without one
+    assert config.id == 'default'
+    assert session.configs['default']['http.agent.name'] == nutch.DefaultUserAgent
+    for rounds in results:
+        assert [job.type for job in rounds[0]] == ['INJECT'] + RoundPhases
+    assert len(set(job['crawlId'] for job in session.jobs.values())) == 3
@@ -0,0 +1,198 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Test checkpoint stores, and crawls resumed from them against the fake Nutch REST server
+
+from nutch import nutch
+from nutch.checkpoint import FileCheckpoint, SqliteCheckpoint
+from nutch.fake import FakeNutchServer
+import asyncio
+import collections
+import pytest
+
+RoundPhases = ['GENERATE', 'FETCH', 'PARSE', 'UPDATEDB', 'INVERTLINKS', 'DEDUP', 'INDEX']
+
+
+class Crash(Exception):
+    pass
+
+
+class CrashingCheckpoint(FileCheckpoint):
+    """Raises Crash instead of saving the first state with a job of jobType, created on the server by then"""
+
+    def __init__(self, filename, jobType):
+        FileCheckpoint.__init__(self, filename)
+        self.jobType = jobType
+
+    def save(self, crawlId, state):
+        if any(job['type'] == self.jobType for job in state['activeJobs']):
+            raise Crash()
+        FileCheckpoint.save(self, crawlId, state)
+
+
+class CountingCheckpoint(FileCheckpoint):
+    def __init__(self, filename):
+        FileCheckpoint.__init__(self, filename)
+        self.saved = []
+
+    def save(self, crawlId, state):
+        self.saved.append([job['type'] for job in state['activeJobs']])
+        FileCheckpoint.save(self, crawlId, state)
+
+
+def created_types(fake):
+    return collections.Counter(job.type for job in fake.fake.jobs.values())
+
+
+@pytest.mark.parametrize('store', [FileCheckpoint, SqliteCheckpoint])
+def test_stores(tmp_path, store):
+    filename = str(tmp_path / 'crawls')
+    checkpoint = store(filename)
+    assert checkpoint.load('crawl1') is None
+    checkpoint.save('crawl1', {'currentRound': 1})
+    checkpoint.save('crawl2', {'currentRound': 1})
+    checkpoint.save('crawl1', {'currentRound': 2, 'jobRounds': {'crawl1-FETCH-3': 2}})
+    checkpoint.remove('crawl2')
+    checkpoint.remove('crawl3')
+
+    reopened = store(filename)
+    assert reopened.crawlIds() == ['crawl1']
+    assert reopened.load('crawl1') == {'currentRound': 2, 'jobRounds': {'crawl1-FETCH-3': 2}}
+
+
+def test_resume(tmp_path):
+    checkpoint = SqliteCheckpoint(str(tmp_path / 'crawls.db'))
+    with FakeNutchServer() as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        cc = nt.Crawl(['http://nutch.apache.org'], rounds=3, pollStrategy=nutch.FixedPoll(0), checkpoint=checkpoint)
+        # the process stops in the middle of round 2, after PARSE was started
+        while cc.currentRound < 2 or cc.currentJob.type != 'PARSE':
+            cc.progress()
+
+        resumed = nutch.Nutch(serverEndpoint=fake.endpoint).ResumeCrawl(cc.crawlId, checkpoint,
+                                                                       pollStrategy=nutch.FixedPoll(0))
+        assert resumed.currentRound == 2
+        assert [job.id for job in resumed.activeJobs] == [cc.currentJob.id]
+        rounds = resumed.waitAll()
+
+    assert [[job.type for job in jobs] for jobs in rounds] == [RoundPhases] * 2
+    # no job was started twice
+    assert created_types(fake) == dict([(jobType, 3) for jobType in RoundPhases], INJECT=1)
+    assert resumed.waitAll() == []
+
+
+def test_resume_adopts_started_job(tmp_path):
+    checkpoint = CrashingCheckpoint(str(tmp_path / 'crawls.json'), 'FETCH')
+    with FakeNutchServer() as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        cc = nt.Crawl(['http://nutch.apache.org'], rounds=1, pollStrategy=nutch.FixedPoll(0), checkpoint=checkpoint)
+        # FETCH is created on the server, but the process stops before saving it
+        with pytest.raises(Crash):
+            cc.waitAll()
+        fetch = [job for job in fake.fake.jobs.values() if job.type == 'FETCH']
+
+        resumed = nutch.Nutch(serverEndpoint=fake.endpoint).ResumeCrawl(
+            cc.crawlId, FileCheckpoint(checkpoint.filename), pollStrategy=nutch.FixedPoll(0))
+        # the FETCH job is taken over when GENERATE is seen finished, instead of being requested again
+        assert [job.id for job in resumed.orphans] == [fetch[0].id]
+        rounds = resumed.waitAll()
+
+    assert [job.type for job in rounds[0]] == ['INJECT'] + RoundPhases
+    assert created_types(fake)['FETCH'] == 1
+
+
+def test_save_per_transition(tmp_path):
+    checkpoint = CountingCheckpoint(str(tmp_path / 'crawls.json'))
+    with FakeNutchServer() as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        nt.Crawl(['http://nutch.apache.org'], rounds=1, pollStrategy=nutch.FixedPoll(0),
+                 checkpoint=checkpoint).waitAll()
+
+    # once the next job started, and once at the end of the round
+    assert checkpoint.saved == [[jobType] for jobType in ['INJECT'] + RoundPhases] + [[], []]
+
+
+def test_resume_restarts_lost_job(tmp_path):
+    checkpoint = FileCheckpoint(str(tmp_path / 'crawls.json'))
+    with FakeNutchServer(jobDuration={'FETCH': 60}) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        cc = nt.Crawl(['http://nutch.apache.org'], rounds=1, pollStrategy=nutch.FixedPoll(0), checkpoint=checkpoint)
+        while cc.currentJob.type != 'FETCH':
+            cc.progress()
+
+    # the server was restarted as well, and forgot the running FETCH
+    with FakeNutchServer() as fake:
+        resumed = nutch.Nutch(serverEndpoint=fake.endpoint).ResumeCrawl(cc.crawlId, checkpoint,
+                                                                       pollStrategy=nutch.FixedPoll(0))
+        assert [job.type for job in resumed.activeJobs] == ['FETCH']
+        rounds = resumed.waitAll()
+
+    assert [job.type for job in rounds[0]] == ['INJECT'] + RoundPhases
+    assert sorted(created_types(fake)) == sorted(RoundPhases[1:])
+
+
+def test_resume_checks_phases(tmp_path):
+    checkpoint = FileCheckpoint(str(tmp_path / 'crawls.json'))
+    with FakeNutchServer() as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        cc = nt.Crawl(['http://nutch.apache.org'], rounds=1, index=False, checkpoint=checkpoint)
+        with pytest.raises(nutch.NutchException):
+            nt.ResumeCrawl('crawl-unknown', checkpoint)
+        with pytest.raises(nutch.NutchException):
+            nt.ResumeCrawl(cc.crawlId, checkpoint, phases=nutch.PhaseGraph.default(index=True))
+
+
+def test_resume_pipelined(tmp_path):
+    checkpoint = FileCheckpoint(str(tmp_path / 'crawls.json'))
+    durations = {'FETCH': 0.05, 'DEDUP': 0.1, 'INDEX': 0.1}
+    with FakeNutchServer(jobDuration=durations) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        cc = nt.Crawl(['http://nutch.apache.org'], rounds=2, pollStrategy=nutch.FixedPoll(0.01), pipelined=True,
+                      checkpoint=checkpoint)
+        # stop while round 1 indexes and round 2 fetches
+        while len(cc.activeJobs) < 2:
+            cc.progress()
+
+        resumed = nutch.Nutch(serverEndpoint=fake.endpoint).ResumeCrawl(cc.crawlId, checkpoint,
+                                                                       pollStrategy=nutch.FixedPoll(0.01))
+        assert resumed.pipelined
+        assert [job.id for job in resumed.activeJobs] == [job.id for job in cc.activeJobs]
+        rounds = resumed.waitAll()
+
+    assert [sorted(job.type for job in jobs) for jobs in rounds] == \
+        [sorted(['INJECT'] + RoundPhases), sorted(RoundPhases)]
+    assert created_types(fake) == dict([(jobType, 2) for jobType in RoundPhases], INJECT=1)
+
+
+def test_async_resume(tmp_path):
+    aio = pytest.importorskip('nutch.aio')
+    checkpoint = FileCheckpoint(str(tmp_path / 'crawls.json'))
+
+    async def crawl(endpoint):
+        async with aio.AsyncNutch(serverEndpoint=endpoint) as nt:
+            cc = await nt.Crawl(['http://nutch.apache.org'], rounds=2, pollStrategy=nutch.FixedPoll(0),
+                                checkpoint=checkpoint)
+            await cc.nextRound()
+            await cc.progress()
+        async with aio.AsyncNutch(serverEndpoint=endpoint) as nt:
+            resumed = await nt.ResumeCrawl(cc.crawlId, checkpoint, pollStrategy=nutch.FixedPoll(0))
+            return await resumed.waitAll()
+
+    with FakeNutchServer() as fake:
+        rounds = asyncio.run(crawl(fake.endpoint))
+
+    assert [[job.type for job in jobs] for jobs in rounds] == [RoundPhases]
+    assert created_types(fake)['GENERATE'] == 2
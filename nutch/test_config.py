@@ -0,0 +1,213 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Test cached and batched access to configuration parameters
+# Uses a stub in place of nutch.Server, no Nutch REST server is needed
+
+from nutch import nutch
+import asyncio
+import pytest
+import threading
+
+
+class StubConfigServer(object):
+    """Stands in for nutch.Server, serves configurations from a dict and records every call"""
+
+    def __init__(self):
+        self.calls = []
+        self.configs = {'default': {'http.agent.name': 'test', 'db.fetch.interval.max': '7776000'}}
+
+    def call(self, verb, servicePath, data=None, headers=None, forceText=False, sendJson=True):
+        self.calls.append((verb, servicePath))
+        path = servicePath.split('/')[2:]
+        if verb == 'get' and len(path) == 1:
+            return dict(self.configs[path[0]])
+        if verb == 'get' and len(path) == 2:
+            return self.configs[path[0]][path[1]]
+        if verb == 'put' and len(path) == 2:
+            self.configs[path[0]][path[1]] = data
+            return ''
+        raise AssertionError('unexpected call %s %s' % (verb, servicePath))
+
+
+class AsyncStubConfigServer(StubConfigServer):
+    """Stands in for aio.AsyncServer, see StubConfigServer"""
+
+    def __init__(self, slow=()):
+        StubConfigServer.__init__(self)
+        self.slow = slow
+
+    async def call(self, verb, servicePath, data=None, headers=None, forceText=False, sendJson=True):
+        if servicePath.split('/')[-1] in self.slow:
+            await asyncio.sleep(5)
+        if servicePath.endswith('/bad.param'):
+            raise nutch.NutchException("Unexpected server response: 500")
+        return StubConfigServer.call(self, verb, servicePath, data, headers, forceText, sendJson)
+
+
+def test_uncached_reads():
+    server = StubConfigServer()
+    config = nutch.ConfigClient(server)['default']
+    del server.calls[:]
+
+    assert config['http.agent.name'] == 'test'
+    assert config['http.agent.name'] == 'test'
+    assert len(server.calls) == 2
+
+
+def test_cached_reads():
+    server = StubConfigServer()
+    config = nutch.ConfigClient(server, cache=True)['default']
+    # checking that the config exists loaded all of its parameters
+    assert len(server.calls) == 1
+
+    assert config['http.agent.name'] == 'test'
+    assert config.parameter('db.fetch.interval.max') == '7776000'
+    assert 'http.agent.name' in config
+    assert 'missing' not in config
+    with pytest.raises(nutch.NutchException):
+        config['missing']
+    assert len(server.calls) == 1
+
+
+def test_write_through():
+    server = StubConfigServer()
+    config = nutch.ConfigClient(server, cache=True)['default']
+
+    config['http.agent.name'] = 'changed'
+    assert config['http.agent.name'] == 'changed'
+    assert server.configs['default']['http.agent.name'] == 'changed'
+    assert [call[0] for call in server.calls] == ['get', 'put']
+
+    # cached reads give the text the server returns, whatever the type of the value set
+    config['db.fetch.interval.max'] = 60
+    assert config['db.fetch.interval.max'] == '60'
+
+
+def test_info_copies_cache():
+    server = StubConfigServer()
+    config = nutch.ConfigClient(server, cache=True)['default']
+    params = config.info()
+    refreshed = config.refresh()
+
+    # parameters handed out don't change with later writes
+    config['http.agent.name'] = 'changed'
+    assert params['http.agent.name'] == refreshed['http.agent.name'] == 'test'
+    assert config.info()['http.agent.name'] == 'changed'
+
+
+def test_invalidation():
+    server = StubConfigServer()
+    config = nutch.ConfigClient(server, cache=True)['default']
+
+    # changed behind our back
+    server.configs['default']['http.agent.name'] = 'other'
+    assert config['http.agent.name'] == 'test'
+    config.invalidate()
+    assert config['http.agent.name'] == 'other'
+    assert len(server.calls) == 2
+
+    assert config.refresh()['http.agent.name'] == 'other'
+    assert len(server.calls) == 3
+
+    config.ttl = 0
+    config['http.agent.name']
+    assert len(server.calls) == 4
+
+
+def test_update_sends_changes_only():
+    server = StubConfigServer()
+    config = nutch.ConfigClient(server)['default']
+    del server.calls[:]
+
+    results = config.update({'http.agent.name': 'test', 'db.fetch.interval.max': 60, 'new.param': 'x'})
+    assert dict((key, result.status) for key, result in results.items()) == {
+        'http.agent.name': 'unchanged', 'db.fetch.interval.max': 'updated', 'new.param': 'updated'}
+    assert server.configs['default']['new.param'] == 'x'
+    assert sorted(server.calls) == [('get', '/config/default'),
+                                    ('put', '/config/default/db.fetch.interval.max'),
+                                    ('put', '/config/default/new.param')]
+
+
+def test_update_partial_failure():
+    server = StubConfigServer()
+    config = nutch.ConfigClient(server)['default']
+
+    call = server.call
+    def failing_call(verb, servicePath, *args, **kwargs):
+        if servicePath.endswith('/bad.param'):
+            raise nutch.NutchException("Unexpected server response: 500")
+        return call(verb, servicePath, *args, **kwargs)
+    server.call = failing_call
+
+    results = config.update({'bad.param': 'x', 'good.param': 'y'})
+    assert results['bad.param'].status == 'failed'
+    assert isinstance(results['bad.param'].error, nutch.NutchException)
+    assert results['good.param'].status == 'updated'
+    assert server.configs['default']['good.param'] == 'y'
+
+
+def test_update_timeout():
+    server = StubConfigServer()
+    config = nutch.ConfigClient(server)['default']
+
+    release = threading.Event()
+    call = server.call
+    def slow_call(verb, servicePath, *args, **kwargs):
+        if servicePath.endswith('/slow.param'):
+            release.wait(5)
+        return call(verb, servicePath, *args, **kwargs)
+    server.call = slow_call
+
+    results = config.update({'slow.param': 'x', 'fast.param': 'y'}, timeout=0.5)
+    release.set()
+    assert results['slow.param'].status == 'pending'
+    assert results['fast.param'].status == 'updated'
+
+
+def test_update_default_timeout():
+    # an update doesn't wait forever for a parameter by default
+    for update in (nutch.Config.update, pytest.importorskip('nutch.aio').AsyncConfig.update):
+        assert update.__defaults__[-1] == nutch.DefaultUpdateTimeout == nutch.DefaultTimeout[1]
+
+
+def test_async_update():
+    aio = pytest.importorskip('nutch.aio')
+    server = AsyncStubConfigServer(slow=['slow.param'])
+    config = aio.AsyncConfig('default', server)
+
+    async def update():
+        return await config.update({'db.fetch.interval.max': 7776000, 'new.param': 'x', 'bad.param': 'x',
+                                    'slow.param': 'x'}, timeout=0.5)
+
+    results = asyncio.run(update())
+    assert dict((key, result.status) for key, result in results.items()) == {
+        'db.fetch.interval.max': 'unchanged', 'new.param': 'updated', 'bad.param': 'failed', 'slow.param': 'pending'}
+    assert isinstance(results['bad.param'].error, nutch.NutchException)
+    assert server.configs['default']['new.param'] == 'x'
+
+
+def test_async_contains_and_refresh():
+    aio = pytest.importorskip('nutch.aio')
+    server = AsyncStubConfigServer()
+    config = aio.AsyncConfig('default', server)
+
+    async def read():
+        return await config.contains('http.agent.name'), await config.contains('missing'), await config.refresh()
+
+    assert asyncio.run(read()) == (True, False, server.configs['default'])
+    with pytest.raises(TypeError):
+        'http.agent.name' in config
@@ -0,0 +1,110 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Test the simulated job lifecycle of the fake Nutch REST server, and the client at scale against it
+
+from nutch import nutch
+from nutch.fake import FakeNutch, FakeNutchServer
+import pytest
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_job_lifecycle():
+    clock = Clock()
+    with FakeNutchServer(jobDuration={'FETCH': 10}, clock=clock) as fake:
+        with nutch.Server(fake.endpoint) as server:
+            jc = nutch.JobClient(server, 'test_crawl', 'default')
+            fetch, parse = jc.fetch(), jc.parse()
+            assert fetch.refresh().state == 'RUNNING'
+            assert parse.refresh().state == 'FINISHED'
+
+            clock.now += 10
+            assert fetch.refresh().state == 'FINISHED'
+
+            stopped = jc.fetch()
+            assert stopped.stop() is True
+            assert stopped.refresh().state == 'STOPPING'
+            clock.now += fake.fake.stopDelay
+            assert stopped.refresh().state == 'KILLED'
+            assert stopped.stop() is False
+
+
+def test_job_failures():
+    with FakeNutchServer(failureRate={'PARSE': 1}) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        cc = nt.Crawl(['http://nutch.apache.org'], index=False, pollStrategy=nutch.FixedPoll(0))
+        with pytest.raises(nutch.NutchCrawlException):
+            cc.waitAll()
+        assert cc.currentJob.refresh().state == 'FAILED'
+        assert cc.currentJob.type == 'PARSE'
+
+
+def test_server_errors():
+    with FakeNutchServer(errorRate=1) as fake:
+        with nutch.Server(fake.endpoint) as server:
+            with pytest.raises(nutch.NutchException) as error:
+                server.call('get', '/job')
+            assert error.value.status_code == 500
+
+
+def test_crawldb_stats():
+    with FakeNutchServer(outlinksPerPage=3) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint, compression='gzip')
+        seed_urls = ['http://example.com/%d' % i for i in range(10)]
+        seed = nt.Seeds().create('test_seeds', iter(seed_urls), stream=True)
+        cc = nt.Crawl(seed, rounds=2, index=False, pollStrategy=nutch.FixedPoll(0))
+        cc.waitAll()
+
+        stats = cc.jobClient.stats()
+        # round 1 fetches the 10 seeds, finding 30 new URLs, round 2 fetches those, finding 90 more
+        assert stats['status'] == {'db_fetched': 40, 'db_unfetched': 90}
+        assert stats['totalUrls'] == 130
+
+
+def test_handle_without_http():
+    fake = FakeNutch()
+    try:
+        response = fake.handle('post', '/job/create', b'{"type": "inject", "crawlId": "c", "confId": "default"}')
+        assert response.status == 200
+        assert fake.handle('get', '/job?crawlId=c').body.count(b'"INJECT"') == 1
+        assert fake.handle('get', '/job?crawlId=other').body == b'[]'
+        assert fake.handle('get', '/nothing').status == 404
+    finally:
+        fake.close()
+
+
+@pytest.mark.slow
+def test_scale():
+    # 300 crawls of 7 jobs each, all driven by a single poll loop
+    with FakeNutchServer(jobDuration=0.05) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        manager = nt.Crawls(sleepTime=0.05)
+        seed = nt.Seeds().create('test_seeds', ['http://nutch.apache.org'])
+        for i in range(300):
+            manager.add(nt.Crawl(seed, jobClient=nt.Jobs('crawl%d' % i), index=False))
+        finished = manager.waitAll()
+
+        assert len(finished) == 300
+        assert all(len(rounds[0]) == 7 for rounds in finished.values())
+        assert len(fake.fake.jobs) == 2100
+        assert len(nt.registry) == 2100
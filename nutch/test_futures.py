@@ -0,0 +1,125 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Test futures of jobs resolved by the job poller of a server, against the fake Nutch REST server
+
+from nutch import nutch
+from nutch.fake import FakeNutchServer
+from nutch.metrics import Metrics
+from concurrent.futures import FIRST_COMPLETED, Future, as_completed, wait
+import asyncio
+import pytest
+from time import sleep
+
+
+def job_client(endpoint, metrics=None):
+    nt = nutch.Nutch(serverEndpoint=endpoint, metrics=metrics)
+    nt.server.poller().interval = 0.05
+    return nt.Jobs()
+
+
+def calls(metrics, endpoint):
+    return sum(request['count'] for request in metrics.snapshot()['requests']
+               if request['verb'] == 'get' and request['endpoint'] == endpoint)
+
+
+def test_as_completed():
+    metrics = Metrics()
+    with FakeNutchServer(jobDuration={'GENERATE': 0.1, 'FETCH': 1.2, 'PARSE': 0.6}) as fake:
+        jc = job_client(fake.endpoint, metrics)
+        jobs = [jc.create(jobType) for jobType in ['FETCH', 'PARSE', 'GENERATE'] * 20]
+        futures = dict((job.future(), job) for job in jobs)
+        done = [futures[future].type for future in as_completed(futures, timeout=10)]
+        poller = jc.server.poller()
+
+    assert done[:20] == ['GENERATE'] * 20
+    assert done[-20:] == ['FETCH'] * 20
+    assert all(future.result()['state'] == 'FINISHED' for future in futures)
+    # one listing per tick checked all the jobs
+    assert calls(metrics, '/job') == poller.ticks
+    assert calls(metrics, '/job/{id}') == 0
+    assert poller.pending() == 0
+
+
+def test_wait_first_completed():
+    with FakeNutchServer(jobDuration={'INJECT': 0, 'FETCH': 60}, failureRate={'INJECT': 1}) as fake:
+        jc = job_client(fake.endpoint)
+        fetch = jc.create('FETCH')
+        inject = jc.create('INJECT')
+        done, running = wait([fetch.future(), inject.future()], timeout=10, return_when=FIRST_COMPLETED)
+
+        # failed jobs resolve their futures too
+        assert [future.result()['state'] for future in done] == ['FAILED']
+        assert [future.result()['id'] for future in done] == [inject.id]
+        running.pop().cancel()
+        sleep(0.2)
+        assert jc.server.poller().runner is None
+
+
+def test_finished_and_unknown_jobs():
+    with FakeNutchServer() as fake:
+        jc = job_client(fake.endpoint)
+        job = jc.create('GENERATE')
+        job.refresh()
+        # jobs known to be done need no polling
+        assert job.future().result(timeout=0) is job.snapshot
+
+        unknown = jc.registry.get(jc.crawlId + '-FETCH-99', 'FETCH')
+        with pytest.raises(nutch.NutchException) as error:
+            unknown.future().result(timeout=10)
+    assert error.value.status_code == 404
+
+
+def test_async_futures():
+    aio = pytest.importorskip('nutch.aio')
+
+    async def crawl(endpoint):
+        async with aio.AsyncNutch(serverEndpoint=endpoint) as nt:
+            nt.server.poller().interval = 0.05
+            jc = nt.Jobs()
+            jobs = [await jc.create(jobType) for jobType in ['FETCH', 'GENERATE'] * 5]
+            done = await asyncio.gather(*[job.future() for job in jobs])
+            return [info['type'] for info in done], nt.server.poller().pending()
+
+    with FakeNutchServer(jobDuration={'GENERATE': 0.05, 'FETCH': 0.1}) as fake:
+        types, pending = asyncio.run(crawl(fake.endpoint))
+    assert types == ['FETCH', 'GENERATE'] * 5
+    assert pending == 0
+
+
+class LateCancelledFuture(Future):
+    """A future cancelled by another thread right after being checked"""
+
+    def cancelled(self):
+        self.cancel()
+        return False
+
+
+def test_resolve_cancelled_futures():
+    poller = nutch.JobPoller(server=None)
+    job = nutch.Job('crawl-GENERATE-1', None)
+    late, cancelled, waiting = LateCancelledFuture(), Future(), Future()
+    poller.watched[job.id] = (job, [late, cancelled, waiting])
+    cancelled.cancel()
+    info = nutch.JobInfo({'id': job.id, 'state': 'FINISHED'})
+
+    # the futures cancelled in time are skipped, the others all resolved
+    assert poller._resolve(job, info) == 3
+    assert late.result(timeout=0) is info
+    assert cancelled.cancelled()
+    assert waiting.result(timeout=0) is info
+    assert poller.pending() == 0
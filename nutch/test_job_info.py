@@ -0,0 +1,250 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Count the requests made per job state check and phase transition
+# Uses a stub in place of nutch.Server, no Nutch REST server is needed
+
+from nutch import nutch
+import pytest
+
+RoundPhases = ['GENERATE', 'FETCH', 'PARSE', 'UPDATEDB', 'INVERTLINKS', 'DEDUP']
+
+
+class StubServer(object):
+    """Stands in for nutch.Server, records every call and finishes jobs on demand"""
+
+    def __init__(self, finishOnCreate=False, failing=()):
+        """
+        :param finishOnCreate: finish every job right after it is created
+        :param failing: the (crawlId, type) of the jobs failing instead
+        """
+        self.calls = []
+        self.jobs = {}
+        self.finishOnCreate = finishOnCreate
+        self.failing = set(failing)
+
+    def call(self, verb, servicePath, data=None, headers=None, forceText=False, sendJson=True):
+        self.calls.append((verb, servicePath))
+        if servicePath == '/job/create':
+            jid = '%s-%s-%d' % (data['crawlId'], data['type'], len(self.jobs))
+            self.jobs[jid] = {'id': jid, 'type': data['type'], 'state': 'RUNNING', 'msg': 'OK',
+                              'crawlId': data['crawlId'], 'confId': data['confId'], 'args': data['args']}
+            result = dict(self.jobs[jid])
+            if self.finishOnCreate:
+                self.jobs[jid]['state'] = 'FAILED' if (data['crawlId'], data['type']) in self.failing else 'FINISHED'
+            return result
+        if servicePath == '/job':
+            return [dict(job) for job in self.jobs.values()]
+        if servicePath.startswith('/job/'):
+            return dict(self.jobs[servicePath.split('/')[2]])
+        raise AssertionError('unexpected call %s %s' % (verb, servicePath))
+
+    def finish(self, job):
+        self.jobs[job.id]['state'] = 'FINISHED'
+
+    def count(self, verb, servicePath=None):
+        return len([call for call in self.calls if call[0] == verb and servicePath in (None, call[1])])
+
+
+def get_crawl(server, rounds=1, crawlId='test_crawl'):
+    jc = nutch.JobClient(server, crawlId, 'default')
+    seed = nutch.Seed('test_seed', '/tmp/test_seed', server)
+    return nutch.CrawlClient(server, seed, jc, rounds, index=False, pollStrategy=nutch.FixedPoll(0))
+
+
+def test_job_info_cached():
+    server = StubServer()
+    job = nutch.JobClient(server, 'test_crawl', 'default').generate()
+    del server.calls[:]
+
+    # the response to /job/create is the first snapshot
+    assert job.info()['state'] == 'RUNNING'
+    assert server.calls == []
+
+    server.finish(job)
+    assert job.refresh().state == 'FINISHED'
+    assert job.info(maxAge=60).state == 'FINISHED'
+    assert server.count('get') == 1
+
+    job.ttl = 0
+    job.info()
+    assert server.count('get') == 2
+
+
+def test_progress_running():
+    server = StubServer()
+    cc = get_crawl(server)
+    del server.calls[:]
+
+    assert cc.progress() == cc.currentJob
+    assert server.calls == [('get', '/job/' + cc.currentJob.id)]
+
+
+def test_progress_transition():
+    server = StubServer()
+    cc = get_crawl(server)
+    inject = cc.currentJob
+    server.finish(inject)
+    del server.calls[:]
+
+    # one status check and one job creation per phase transition
+    generate = cc.progress()
+    assert generate.type == 'GENERATE'
+    assert server.calls == [('get', '/job/' + inject.id), ('post', '/job/create')]
+
+
+def test_round_requests():
+    # every job finishes right after it is created
+    server = StubServer(finishOnCreate=True)
+    cc = get_crawl(server)
+    del server.calls[:]
+
+    jobs = cc.waitAll()[0]
+    assert [job.type for job in jobs] == ['INJECT', 'GENERATE', 'FETCH', 'PARSE', 'UPDATEDB', 'INVERTLINKS', 'DEDUP']
+    assert server.count('get') == len(jobs)
+    assert server.count('post', '/job/create') == len(jobs) - 1
+
+
+def test_manager_tick():
+    server = StubServer()
+    manager = nutch.CrawlManager(server, sleepTime=0)
+    crawls = [manager.add(get_crawl(server)) for i in range(10)]
+    for cc in crawls:
+        server.finish(cc.currentJob)
+    del server.calls[:]
+
+    assert len(manager.tick()) == 10
+    assert server.count('get') == 1
+    assert server.count('post', '/job/create') == 10
+
+
+def test_manager_wait_all():
+    # every job finishes right after it is created
+    server = StubServer(finishOnCreate=True)
+    manager = nutch.CrawlManager(server, sleepTime=0)
+    for i in range(5):
+        manager.add(get_crawl(server, rounds=2, crawlId='crawl%d' % i))
+    del server.calls[:]
+
+    results = manager.waitAll()
+    assert sorted(results) == ['crawl%d' % i for i in range(5)]
+    for rounds in results.values():
+        assert [[job.type for job in jobs] for jobs in rounds] == [['INJECT'] + RoundPhases, RoundPhases]
+    # one listing per tick for all the crawls, a tick per job of a crawl
+    assert server.count('get') == server.count('get', '/job') == 7 + 6
+    assert server.count('post', '/job/create') == 5 * 12
+
+
+def test_manager_failure():
+    server = StubServer(finishOnCreate=True, failing=[('crawl1', 'FETCH')])
+    manager = nutch.CrawlManager(server, sleepTime=0)
+    crawls = [manager.add(get_crawl(server, crawlId='crawl%d' % i)) for i in range(3)]
+
+    with pytest.raises(nutch.NutchCrawlException) as error:
+        manager.waitAll()
+
+    # the failed crawl is recorded and stopped, the others complete their rounds
+    assert list(manager.failures) == ['crawl1']
+    assert error.value is manager.failures['crawl1']
+    assert [[job.type for job in jobs] for jobs in error.value.completed_jobs] == [['INJECT', 'GENERATE']]
+    assert crawls[1].currentJob.type == 'FETCH'
+    for crawlId in ['crawl0', 'crawl2']:
+        assert [job.type for job in manager.finishedRounds[crawlId][0]] == ['INJECT'] + RoundPhases
+    assert manager.active() == []
+
+
+def test_registry_identity():
+    server = StubServer()
+    jc = nutch.JobClient(server, 'test_crawl', 'default')
+    job = jc.inject(urlDir='/tmp/test_seed')
+
+    # one Job object per id, and no per-instance __dict__
+    assert jc.list()[0] is job
+    assert jc.registry.get(job.id) is job
+    assert not hasattr(job, '__dict__')
+
+
+def test_registry_find():
+    server = StubServer()
+    registry = nutch.JobRegistry(server)
+    jc1 = nutch.JobClient(server, 'crawl1', 'default', registry=registry)
+    jc2 = nutch.JobClient(server, 'crawl2', 'default', registry=registry)
+    fetch1, fetch2 = jc1.fetch(), jc2.fetch()
+    parse1 = jc1.parse()
+    server.finish(fetch1)
+    del server.calls[:]
+
+    assert jc1.find(state='RUNNING') == [parse1]
+    assert jc1.find(state='FINISHED', jobType='FETCH') == [fetch1]
+    assert registry.find(type='FETCH', state='RUNNING') == [fetch2]
+    # the first find() refreshed every job with a single listing
+    assert jc2.find(state='RUNNING', refresh=False) == [fetch2]
+    assert server.calls == [('get', '/job'), ('get', '/job')]
+
+
+def test_registry_update_copies_infos():
+    registry = nutch.JobRegistry(StubServer())
+    crawlId = ''.join(['crawl', '1'])
+    info = {'id': 'crawl1-FETCH-1', 'type': 'FETCH', 'state': 'RUNNING', 'crawlId': crawlId, 'confId': 'default'}
+    job = registry.update([info])[0]
+
+    # the listing is interned into a copy, the caller's dict keeps its own values
+    assert info['crawlId'] is crawlId
+    assert job.snapshot['crawlId'] == crawlId
+    assert job.snapshot['crawlId'] is not crawlId
+    assert registry.find(crawlId='crawl1') == [job]
+
+
+def test_registry_reindexes_refreshed_jobs():
+    server = StubServer()
+    jc = nutch.JobClient(server, 'crawl1', 'default')
+    fetch = jc.fetch()
+    server.finish(fetch)
+
+    # refreshed on its own, not through the registry
+    assert fetch.refresh().state == 'FINISHED'
+    assert jc.registry.find(state='RUNNING') == []
+    assert jc.registry.find(state='FINISHED') == [fetch]
+
+    jc.registry.remove(fetch)
+    assert jc.registry.find(state='FINISHED') == []
+
+
+def test_registry_add():
+    server = StubServer()
+    job = nutch.Job('c-FETCH-1', server, 'FETCH')
+    job._updateInfo({'id': job.id, 'type': 'FETCH', 'state': 'RUNNING', 'crawlId': 'c', 'confId': 'default'})
+    registry = nutch.JobRegistry(server)
+
+    assert registry.add(job) is job
+    assert registry.find(crawlId='c') == [job]
+    # a job known under the same id stays the registered one
+    assert registry.add(nutch.Job(job.id, server, 'FETCH')) is job
+
+
+def test_transition_without_calls():
+    server = StubServer()
+    cc = get_crawl(server)
+    inject = cc.currentJob
+    del server.calls[:]
+
+    # the decisions of the crawl are taken without calling the server, the client starts the jobs
+    info = lambda state: nutch.JobInfo({'id': inject.id, 'type': 'INJECT', 'state': state})
+    assert cc._transition(info('STOPPING'), job=inject) is None
+    assert [(round, phase.type, attempt) for round, phase, attempt in cc._transition(info('FINISHED'), job=inject)] \
+        == [(1, 'GENERATE', 1)]
+    assert cc.activeJobs == []
+    assert server.calls == []
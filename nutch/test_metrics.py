@@ -0,0 +1,111 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Test the metrics registry, no Nutch REST server is needed
+
+from nutch import nutch
+from nutch.metrics import Metrics, Histogram, endpointTemplate
+from nutch.test_job_info import StubServer
+import json
+
+
+class StubResponse(object):
+    def __init__(self, status_code, content=b'{}'):
+        self.status_code = status_code
+        self.headers = {'content-type': 'application/json'}
+        self.content = content
+
+
+class StubSession(object):
+    """Stands in for the requests.Session of a nutch.Server, answering every call with the next status"""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+
+    def get(self, url, data=None, headers=None, timeout=None):
+        return StubResponse(self.statuses.pop(0))
+
+
+def test_endpoint_template():
+    assert endpointTemplate('/job') == '/job'
+    assert endpointTemplate('/job/create') == '/job/create'
+    assert endpointTemplate('/job/crawl-FETCH-1') == '/job/{id}'
+    assert endpointTemplate('/job/crawl-FETCH-1/stop') == '/job/{id}/stop'
+    assert endpointTemplate('/config/default') == '/config/{id}'
+    assert endpointTemplate('/config/default/http.agent.name') == '/config/{id}/{param}'
+    # fixed endpoints are not per id
+    assert endpointTemplate('/db/crawldb') == '/db/crawldb'
+    assert endpointTemplate('/admin/stop') == '/admin/stop'
+    assert endpointTemplate('/seed/create') == '/seed/create'
+
+
+def test_histogram():
+    histogram = Histogram((1, 10))
+    for value in (0.5, 1, 5, 50):
+        histogram.observe(value)
+    assert histogram.count == 4
+    assert histogram.sum == 56.5
+    assert histogram.cumulative() == [(1, 2), (10, 3), ('+Inf', 4)]
+
+
+def test_server_calls():
+    metrics = Metrics()
+    server = nutch.Server('http://localhost', raiseErrors=False, metrics=metrics, retries=0)
+    server.session = StubSession([200, 200, 500])
+    for jid in ('job-1', 'job-2', 'job-3'):
+        server.call('get', '/job/' + jid)
+
+    snapshot = metrics.snapshot()
+    assert [(r['verb'], r['endpoint'], r['count']) for r in snapshot['requests']] == [('get', '/job/{id}', 3)]
+    assert snapshot['errors'] == [{'verb': 'get', 'endpoint': '/job/{id}', 'status': '500', 'count': 1}]
+    json.dumps(snapshot)
+
+
+def test_crawl_polls_and_phases():
+    metrics = Metrics()
+    server = StubServer(finishOnCreate=True)
+    jc = nutch.JobClient(server, 'test_crawl', 'default')
+    seed = nutch.Seed('test_seed', '/tmp/test_seed', server)
+    cc = nutch.CrawlClient(server, seed, jc, 1, index=False, pollStrategy=nutch.FixedPoll(0), metrics=metrics)
+    jobs = cc.waitAll()[0]
+
+    snapshot = metrics.snapshot()
+    assert sum(snapshot['polls'].values()) == len(jobs)
+    assert sorted(phase['phase'] for phase in snapshot['phases']) == sorted(job.type for job in jobs)
+
+
+def test_prometheus_export(tmpdir):
+    metrics = Metrics()
+    metrics.observeCall('get', '/job/job-1', 0.02, 200)
+    metrics.observeCall('post', '/config/create', 0.3, None)
+    metrics.countPoll('FETCH')
+    metrics.observePhase('FETCH', 90)
+
+    text = metrics.prometheus()
+    assert '# TYPE nutch_request_duration_seconds histogram' in text
+    assert 'nutch_request_duration_seconds_bucket{endpoint="/job/{id}",le="0.025",verb="get"} 1' in text
+    assert 'nutch_request_duration_seconds_count{endpoint="/job/{id}",verb="get"} 1' in text
+    assert 'nutch_request_errors_total{endpoint="/config/create",status="none",verb="post"} 1' in text
+    assert 'nutch_job_polls_total{phase="FETCH"} 1' in text
+    assert 'nutch_job_duration_seconds_bucket{le="60",phase="FETCH"} 0' in text
+    assert 'nutch_job_duration_seconds_bucket{le="120",phase="FETCH"} 1' in text
+
+    filename = str(tmpdir.join('nutch.prom'))
+    metrics.writePrometheus(filename)
+    assert open(filename).read() == text
+    metrics.writeJson(str(tmpdir.join('nutch.json')))
+    assert json.load(open(str(tmpdir.join('nutch.json'))))['polls'] == {'FETCH': 1}
+    assert sorted(tmpdir.listdir()) == [tmpdir.join('nutch.json'), tmpdir.join('nutch.prom')]
@@ -15,18 +15,34 @@
 # limitations under the License.
 
 # Test Nutch API
-# Assumes a Nutch REST server is running on localhost
-# TODO: Package into Travis tests
+# Runs against an in-process fake Nutch REST server (nutch.fake), set NUTCH_SERVER to the URL of a live
+# Nutch REST server to run against it instead, e.g. NUTCH_SERVER=http://localhost:8081
 
 import nutch
+from nutch.fake import FakeNutchServer
 import pytest
 import glob
-from time import sleep
+import os
 
 slow = pytest.mark.slow
 
+endpoint = os.environ.get('NUTCH_SERVER')
+
+
+@pytest.fixture(scope='module', autouse=True)
+def nutch_server():
+    global endpoint
+    if os.environ.get('NUTCH_SERVER'):
+        yield None
+        return
+    # jobs run long enough to be seen RUNNING, e.g. by test_job_stop
+    with FakeNutchServer(jobDuration=0.3) as fake:
+        endpoint = fake.endpoint
+        yield fake
+
+
 def get_nutch():
-    return nutch.Nutch()
+    return nutch.Nutch(serverEndpoint=endpoint)
 
 
 def test_nutch_constructor():
@@ -143,17 +159,7 @@ def test_job_generate():
     jc = get_job_client()
     inject = get_inject_job(jc)
     # wait until injection is done
-
-    for wait in range(10):
-        if inject.info()['state'] != 'FINISHED':
-            sleep(1)
-            continue
-        else:
-            break
-    else:
-        raise Exception("took too long to inject")
-
-    assert inject.info()['state'] == 'FINISHED'
+    assert inject.future().result(timeout=10)['state'] == 'FINISHED'
 
     generate = jc.generate()
     job_info = generate.info()
@@ -0,0 +1,105 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Test phase graphs, and crawls following them on the fake Nutch REST server
+
+from nutch import nutch
+from nutch.fake import FakeNutchServer
+from nutch.phases import Phase, PhaseGraph, lastRound
+import pytest
+
+RoundPhases = ['GENERATE', 'FETCH', 'PARSE', 'UPDATEDB', 'INVERTLINKS', 'DEDUP', 'INDEX']
+
+
+def sparse_graph():
+    # link inversion and dedup every other round and at the end, indexing at the end only
+    return PhaseGraph.default() \
+        .configure('GENERATE', args=lambda round: {'topN': 100 * round}) \
+        .configure('INVERTLINKS', every=2).configure('DEDUP', every=2) \
+        .configure('INDEX', when=lastRound)
+
+
+def test_default_graph():
+    assert PhaseGraph.default().rounds(2) == [RoundPhases] * 2
+    assert PhaseGraph.default(index=False).rounds(1) == [RoundPhases[:-1]]
+
+    graph = PhaseGraph.default()
+    assert graph.next('INJECT', 1, 1).type == 'GENERATE'
+    assert graph.next('DEDUP', 1, 1).type == 'INDEX'
+    assert graph.next('INDEX', 1, 1) is None
+
+
+def test_frequency_rules():
+    short = ['GENERATE', 'FETCH', 'PARSE', 'UPDATEDB']
+    assert sparse_graph().rounds(5) == [short, short + ['INVERTLINKS', 'DEDUP'], short,
+                                        short + ['INVERTLINKS', 'DEDUP'], short + ['INVERTLINKS', 'DEDUP', 'INDEX']]
+
+    graph = PhaseGraph.default().configure('DEDUP', every=2, final=False)
+    assert [r[-2:] for r in graph.rounds(3)] == [['INVERTLINKS', 'INDEX'], ['DEDUP', 'INDEX'],
+                                                 ['INVERTLINKS', 'INDEX']]
+
+
+def test_insert_and_remove():
+    graph = PhaseGraph.default().insert(Phase('webgraph', args={'depth': 2}), after='UPDATEDB').remove('INDEX')
+    assert graph.types() == ['GENERATE', 'FETCH', 'PARSE', 'UPDATEDB', 'WEBGRAPH', 'INVERTLINKS', 'DEDUP']
+    assert graph.phases[4].jobArgs(1) == {'depth': 2}
+    # the original graph is unchanged
+    assert PhaseGraph.default().types() == RoundPhases
+
+
+def test_invalid_graphs():
+    with pytest.raises(ValueError):
+        PhaseGraph([])
+    with pytest.raises(ValueError):
+        PhaseGraph(['GENERATE', 'FETCH', 'FETCH'])
+    with pytest.raises(ValueError):
+        PhaseGraph.default().configure('GENERATE', every=2)
+    with pytest.raises(ValueError):
+        PhaseGraph.default().configure('CRAWL', every=2)
+    with pytest.raises(ValueError):
+        Phase('FETCH', every=0)
+
+
+def test_crawl_follows_graph():
+    with FakeNutchServer() as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        graph = sparse_graph().configure('INJECT', args={'crawldb.url.filters': 'true'})
+        rounds = nt.Crawl(['http://nutch.apache.org'], rounds=3, pollStrategy=nutch.FixedPoll(0),
+                          phases=graph).waitAll()
+        jobs = fake.fake.jobs
+
+        assert [[job.type for job in r] for r in rounds] == [['INJECT'] + graph.rounds(3)[0]] + graph.rounds(3)[1:]
+        inject = jobs[rounds[0][0].id]
+        assert inject.args['crawldb.url.filters'] == 'true'
+        assert 'url_dir' in inject.args
+        generates = [jobs[job.id].args for r in rounds for job in r if job.type == 'GENERATE']
+        assert [args['topN'] for args in generates] == [100, 200, 300]
+        # the arguments of a job are not passed on to the next ones
+        assert all('topN' not in jobs[job.id].args for r in rounds for job in r if job.type != 'GENERATE')
+
+
+@pytest.mark.parametrize('rounds', [2, 3])
+def test_pipelined_crawl_follows_graph(rounds):
+    with FakeNutchServer(jobDuration={'FETCH': 0.05, 'INVERTLINKS': 0.02}) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        graph = sparse_graph()
+        cc = nt.Crawl(['http://nutch.apache.org'], rounds=rounds, pollStrategy=nutch.FixedPoll(0.01),
+                      phases=graph, pipelined=True)
+        finished = cc.waitAll()
+
+    expected = [['INJECT'] + graph.rounds(rounds)[0]] + graph.rounds(rounds)[1:]
+    assert [sorted(job.type for job in r) for r in finished] == [sorted(r) for r in expected]
+    assert cc.activeJobs == []
@@ -0,0 +1,139 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Test crawls with overlapping rounds against the fake Nutch REST server
+
+from nutch import nutch
+from nutch.fake import FakeNutchServer
+from nutch.profiler import CrawlProfiler
+import asyncio
+import pytest
+
+RoundPhases = ['GENERATE', 'FETCH', 'PARSE', 'UPDATEDB', 'INVERTLINKS', 'DEDUP', 'INDEX']
+
+# long link inversion, dedup and indexing, as on a large crawldb
+JobDurations = {'FETCH': 0.2, 'INVERTLINKS': 0.1, 'DEDUP': 0.1, 'INDEX': 0.1}
+
+
+def by_phase(profiler):
+    return dict(((timing.round, timing.type), timing) for timing in profiler.timings)
+
+
+def check_order(timings, rounds):
+    for r in range(1, rounds):
+        # the next round starts once UPDATEDB is done, before the round is done
+        assert timings[r + 1, 'GENERATE'].requested >= timings[r, 'UPDATEDB'].detected
+        assert timings[r + 1, 'GENERATE'].requested < timings[r, 'INDEX'].detected
+        # never two jobs locking the crawldb at once
+        assert timings[r, 'DEDUP'].requested >= timings[r + 1, 'GENERATE'].detected
+        # the crawldb and linkdb of a round are complete before the next round updates them
+        assert timings[r + 1, 'UPDATEDB'].requested >= timings[r, 'INDEX'].detected
+
+
+def test_pipelined_crawl():
+    profiler = CrawlProfiler()
+    with FakeNutchServer(jobDuration=JobDurations) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint, profiler=profiler)
+        cc = nt.Crawl(['http://nutch.apache.org'], rounds=3, pollStrategy=nutch.FixedPoll(0.01), pipelined=True)
+        rounds = cc.waitAll()
+
+    assert [sorted(job.type for job in jobs) for jobs in rounds] == \
+        [sorted(['INJECT'] + RoundPhases)] + [sorted(RoundPhases)] * 2
+    assert cc.currentJob is None
+    check_order(by_phase(profiler), 3)
+
+    # DEDUP and INDEX overlap with FETCH of the next round
+    assert len(cc.roundSavings) == 3
+    assert cc.roundSavings[0] > 0.2 and cc.roundSavings[1] > 0.2
+    assert cc.roundSavings[2] == 0
+
+
+def test_dedup_after_updatedb():
+    # without INVERTLINKS, DEDUP of a round becomes ready along with GENERATE of the next one
+    profiler = CrawlProfiler()
+    graph = nutch.PhaseGraph(['GENERATE', 'FETCH', 'PARSE', 'UPDATEDB', 'DEDUP'])
+    with FakeNutchServer(jobDuration={'GENERATE': 0.05, 'FETCH': 0.05, 'DEDUP': 0.05}) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint, profiler=profiler)
+        cc = nt.Crawl(['http://nutch.apache.org'], rounds=3, pollStrategy=nutch.FixedPoll(0.01), pipelined=True,
+                      phases=graph)
+        cc.waitAll()
+
+    timings = by_phase(profiler)
+    for r in range(1, 3):
+        # never two jobs locking the crawldb at once
+        assert timings[r, 'DEDUP'].requested >= timings[r + 1, 'GENERATE'].detected
+        assert timings[r + 1, 'GENERATE'].requested >= timings[r, 'UPDATEDB'].detected
+
+
+def test_serial_crawl_has_no_overlap():
+    profiler = CrawlProfiler()
+    with FakeNutchServer() as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint, profiler=profiler)
+        rounds = nt.Crawl(['http://nutch.apache.org'], rounds=2, pollStrategy=nutch.FixedPoll(0)).waitAll()
+
+    jobs = sum(rounds, [])
+    assert [job.type for job in jobs] == ['INJECT'] + RoundPhases * 2
+    timings = profiler.timings
+    for previous, timing in zip(timings, timings[1:]):
+        assert timing.requested >= previous.detected
+
+
+def test_pipelined_crawl_manager():
+    profiler = CrawlProfiler()
+    with FakeNutchServer(jobDuration=JobDurations) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint, profiler=profiler)
+        manager = nt.Crawls(sleepTime=0.01)
+        crawls = [manager.add(nt.Crawl(['http://nutch.apache.org'], jobClient=nt.Jobs('crawl%d' % i), rounds=2,
+                                       index=False, pipelined=True)) for i in range(3)]
+        finished = manager.waitAll()
+
+    for crawl in crawls:
+        rounds = finished[crawl.crawlId]
+        assert [len(jobs) for jobs in rounds] == [7, 6]
+        timings = dict(((timing.round, timing.type), timing) for timing in profiler.timings
+                       if timing.crawlId == crawl.crawlId)
+        assert timings[2, 'GENERATE'].requested < timings[1, 'DEDUP'].detected
+        assert timings[2, 'UPDATEDB'].requested >= timings[1, 'DEDUP'].detected
+        assert crawl.roundSavings[0] > 0
+
+
+def test_pipelined_failure():
+    with FakeNutchServer(jobDuration=JobDurations, failureRate={'INVERTLINKS': 1}) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        cc = nt.Crawl(['http://nutch.apache.org'], rounds=2, pollStrategy=nutch.FixedPoll(0.01), pipelined=True)
+        with pytest.raises(nutch.NutchCrawlException):
+            cc.waitAll()
+        # the failed job stays active, next to the next round started before it failed
+        assert [job.type for job in cc.activeJobs] == ['INVERTLINKS', 'FETCH']
+        assert cc.activeJobs[0].refresh().state == 'FAILED'
+
+
+def test_async_pipelined_crawl():
+    aio = pytest.importorskip('nutch.aio')
+    profiler = CrawlProfiler()
+
+    async def crawl(endpoint):
+        async with aio.AsyncNutch(serverEndpoint=endpoint, profiler=profiler) as nt:
+            cc = await nt.Crawl(['http://nutch.apache.org'], rounds=2, pollStrategy=nutch.FixedPoll(0.01),
+                                pipelined=True)
+            return cc, await cc.waitAll()
+
+    with FakeNutchServer(jobDuration=JobDurations) as fake:
+        cc, rounds = asyncio.run(crawl(fake.endpoint))
+
+    assert [len(jobs) for jobs in rounds] == [8, 7]
+    check_order(by_phase(profiler), 2)
+    assert cc.roundSavings[0] > 0.2
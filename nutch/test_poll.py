@@ -0,0 +1,133 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Test the poll strategies spacing the status checks of crawl jobs
+# Uses a stub in place of nutch.Server, no Nutch REST server is needed
+
+from nutch import nutch
+from nutch.test_job_info import StubServer
+import collections
+from itertools import islice
+import pytest
+
+RoundPhases = ['GENERATE', 'FETCH', 'PARSE', 'UPDATEDB', 'INVERTLINKS', 'DEDUP']
+
+
+class CheckedStubServer(StubServer):
+    """Finishes a job once it has been checked as many times as checks gives for its type, once by default"""
+
+    def __init__(self, checks):
+        StubServer.__init__(self)
+        self.checks = checks
+        self.checked = collections.Counter()
+
+    def call(self, verb, servicePath, data=None, *args, **kwargs):
+        if verb == 'get' and servicePath.startswith('/job/'):
+            job = self.jobs[servicePath.split('/')[2]]
+            self.checked[job['id']] += 1
+            if self.checked[job['id']] >= self.checks.get(job['type'], 1):
+                job['state'] = 'FINISHED'
+        return StubServer.call(self, verb, servicePath, data, *args, **kwargs)
+
+
+def first(strategy, count):
+    return list(islice(strategy.delays(), count))
+
+
+def get_crawl(server, rounds=1, pollStrategy=None):
+    jc = nutch.JobClient(server, 'test_crawl', 'default')
+    seed = nutch.Seed('test_seed', '/tmp/test_seed', server)
+    return nutch.CrawlClient(server, seed, jc, rounds, index=False, pollStrategy=pollStrategy)
+
+
+def test_fixed_poll():
+    assert first(nutch.FixedPoll(2), 4) == [2] * 4
+
+
+def test_backoff_poll():
+    strategy = nutch.BackoffPoll(initial=0.5, factor=2, maximum=3, jitter=0, firstCheck=0.1)
+    # a quick first check, then exponential backoff up to the maximum
+    assert first(strategy, 7) == [0.1, 0.5, 1, 2, 3, 3, 3]
+    # every job gets its own sequence
+    assert first(strategy, 2) == [0.1, 0.5]
+
+
+def test_backoff_poll_jitter():
+    strategy = nutch.BackoffPoll(initial=1, factor=2, maximum=4, jitter=0.25, firstCheck=1)
+    samples = [first(strategy, 5) for i in range(200)]
+    for position, delay in enumerate([1, 1, 2, 4, 4]):
+        delays = [sample[position] for sample in samples]
+        assert all(0.75 * delay <= d <= 1.25 * delay for d in delays)
+        # the checks of crawls started together are spread out
+        assert len(set(delays)) > 100
+
+
+def test_phase_strategies(monkeypatch):
+    monkeypatch.setattr(nutch, 'DefaultPollStrategy', nutch.FixedPoll(7))
+    monkeypatch.setitem(nutch.DefaultPhasePollStrategies, 'FETCH', nutch.FixedPoll(4))
+    monkeypatch.setitem(nutch.DefaultPhasePollStrategies, 'PARSE', nutch.FixedPoll(5))
+    server = StubServer()
+    cc = get_crawl(server, pollStrategy={'FETCH': nutch.FixedPoll(3)})
+
+    def delay(jobType):
+        return next(cc._pollDelays(nutch.Job('test_crawl-%s-1' % jobType, server, jobType)))
+
+    # the job types missing from the dict fall back to the default strategies
+    assert [delay(jobType) for jobType in ['FETCH', 'PARSE', 'GENERATE']] == [3, 5, 7]
+    assert delay('FETCH') == 3
+
+    # a single strategy is used for every job type
+    cc.pollStrategy = nutch.FixedPoll(1)
+    assert [delay(jobType) for jobType in ['FETCH', 'PARSE', 'GENERATE']] == [1, 1, 1]
+    cc.pollStrategy = None
+    assert [delay(jobType) for jobType in ['FETCH', 'PARSE', 'GENERATE']] == [4, 5, 7]
+
+
+def test_round_polls():
+    server = CheckedStubServer({'FETCH': 3})
+    cc = get_crawl(server, rounds=2, pollStrategy=nutch.FixedPoll(0))
+    cc.waitAll()
+
+    # jobs done by their first check are counted once, the FETCH jobs running on are checked again
+    assert cc.roundPolls == [collections.Counter(dict([(jobType, 1) for jobType in ['INJECT'] + RoundPhases],
+                                                      FETCH=3)),
+                             collections.Counter(dict([(jobType, 1) for jobType in RoundPhases], FETCH=3))]
+
+
+def test_wait_all_rounds():
+    # every job finishes right after it is created
+    server = StubServer(finishOnCreate=True)
+    cc = get_crawl(server, rounds=3, pollStrategy=nutch.FixedPoll(0))
+
+    # all the requested rounds run
+    rounds = cc.waitAll()
+    assert [[job.type for job in jobs] for jobs in rounds] == [['INJECT'] + RoundPhases] + [RoundPhases] * 2
+    assert server.count('post', '/job/create') == 1 + 3 * len(RoundPhases)
+
+    cc.addRounds(2)
+    assert len(cc.waitAll()) == 2
+    assert cc.currentRound == 6
+
+
+def test_sleep_time_deprecated():
+    cc = get_crawl(StubServer())
+    with pytest.deprecated_call():
+        cc.sleepTime = 5
+    assert isinstance(cc.pollStrategy, nutch.FixedPoll)
+    assert list(islice(cc._pollDelays(cc.currentJob), 3)) == [5, 5, 5]
+    with pytest.deprecated_call():
+        assert cc.sleepTime == 5
@@ -0,0 +1,98 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Test the crawl timeline profiler, no Nutch REST server is needed
+
+from nutch import nutch
+from nutch.profiler import CrawlProfiler
+from nutch.test_job_info import StubServer
+import json
+import pytest
+
+
+def get_crawl(server, profiler, rounds=1, crawlId='test_crawl'):
+    jc = nutch.JobClient(server, crawlId, 'default')
+    seed = nutch.Seed('test_seed', '/tmp/test_seed', server)
+    return nutch.CrawlClient(server, seed, jc, rounds, index=False, pollStrategy=nutch.FixedPoll(0),
+                             profiler=profiler)
+
+
+def test_round_timeline():
+    profiler = CrawlProfiler()
+    rounds = get_crawl(StubServer(finishOnCreate=True), profiler, rounds=2).waitAll()
+
+    timeline = profiler.timeline()
+    assert [[timing.jobId for timing in r] for r in timeline] == [[job.id for job in r] for r in rounds]
+    timings = sum(timeline, [])
+    assert timings[0].gap is None
+    for previous, timing in zip(timings, timings[1:]):
+        assert timing.gap >= 0
+        assert previous.detected + timing.gap == pytest.approx(timing.requested)
+    for timing in timings:
+        assert timing.state == 'FINISHED'
+        assert timing.requested <= timing.created <= timing.detected
+
+    totals = profiler.phaseTotals()
+    assert totals['INJECT']['count'] == 1
+    assert totals['GENERATE']['count'] == 2
+
+
+def test_running_polls():
+    server = StubServer()
+    profiler = CrawlProfiler()
+    cc = get_crawl(server, profiler)
+    inject = cc.currentJob
+    cc.progress()
+    cc.progress()
+    server.finish(inject)
+    cc.progress()
+
+    timing = profiler.jobs[inject.id]
+    assert timing.polls == 3
+    assert timing.created <= timing.lastRunning <= timing.detected
+    assert timing.pollLag == timing.detected - timing.lastRunning
+    assert profiler.jobs[cc.currentJob.id].type == 'GENERATE'
+
+
+def test_failed_job():
+    server = StubServer()
+    profiler = CrawlProfiler()
+    cc = get_crawl(server, profiler)
+    server.jobs[cc.currentJob.id]['state'] = 'FAILED'
+    with pytest.raises(nutch.NutchCrawlException):
+        cc.progress()
+    assert profiler.timings[0].state == 'FAILED'
+
+
+def test_chrome_trace(tmpdir):
+    server = StubServer(finishOnCreate=True)
+    profiler = CrawlProfiler()
+    manager = nutch.CrawlManager(server, sleepTime=0)
+    for crawlId in ('crawl1', 'crawl2'):
+        manager.add(get_crawl(server, profiler, crawlId=crawlId))
+    manager.waitAll()
+
+    with pytest.raises(ValueError):
+        profiler.timeline()
+    assert len(sum(profiler.timeline('crawl2'), [])) == 7
+
+    filename = str(tmpdir.join('crawl.trace.json'))
+    profiler.writeChromeTrace(filename)
+    events = json.load(open(filename))['traceEvents']
+    assert [event['args']['name'] for event in events if event['ph'] == 'M'] == ['crawl1', 'crawl2']
+    jobs = [event for event in events if event['ph'] == 'X' and event['cat'] == 'job']
+    assert len(jobs) == 14
+    assert all(event['ts'] >= 0 and event['dur'] >= 0 for event in events if event['ph'] == 'X')
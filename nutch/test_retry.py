@@ -0,0 +1,217 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Test retries of failed crawl phases against the fake Nutch REST server
+
+from nutch import nutch
+from nutch.fake import FakeNutchServer
+import asyncio
+import pytest
+from time import sleep, time
+
+RoundPhases = ['GENERATE', 'FETCH', 'PARSE', 'UPDATEDB', 'INVERTLINKS', 'DEDUP', 'INDEX']
+NoWait = nutch.FixedPoll(0)
+
+
+class FailingJobs(object):
+    """Failure rate of the fake server, failing the jobs of jobType whose number is in failing"""
+
+    def __init__(self, jobType, failing):
+        self.jobType = jobType
+        self.failing = failing
+        self.created = 0
+
+    def __call__(self, jobType):
+        if jobType != self.jobType:
+            return 0
+        self.created += 1
+        return 1 if self.created in self.failing else 0
+
+
+def fetch_jobs(fake):
+    return [job for job in fake.fake.jobs.values() if job.type == 'FETCH']
+
+
+def test_retry_failed_phase():
+    policy = nutch.RetryPolicy(maxAttempts=3, backoff=NoWait)
+    with FakeNutchServer(failureRate=FailingJobs('FETCH', [1, 2])) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        cc = nt.Crawl(['http://nutch.apache.org'], rounds=2, pollStrategy=NoWait,
+                      phases=nutch.PhaseGraph.default().configure('FETCH', args={'threads': 20}),
+                      retryPolicy={'FETCH': policy})
+        rounds = cc.waitAll()
+
+    assert [[job.type for job in jobs] for jobs in rounds] == [['INJECT'] + RoundPhases, RoundPhases]
+    fetches = fetch_jobs(fake)
+    assert [job.state for job in fetches] == ['FAILED', 'FAILED', 'FINISHED', 'FINISHED']
+    # the same arguments, and only the failed phase, were sent again
+    assert all(job.args['threads'] == 20 for job in fetches)
+    assert sum(job.type == 'GENERATE' for job in fake.fake.jobs.values()) == 2
+    assert cc.jobAttempts[rounds[0][2].id] == 3
+
+
+def test_retries_exhausted():
+    policy = nutch.RetryPolicy(maxAttempts=2, backoff=NoWait)
+    with FakeNutchServer(failureRate=FailingJobs('FETCH', [2, 3])) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        cc = nt.Crawl(['http://nutch.apache.org'], rounds=2, pollStrategy=NoWait, retryPolicy=policy)
+        with pytest.raises(nutch.NutchCrawlException) as raised:
+            cc.waitAll()
+
+    error = raised.value
+    assert error.current_job.type == 'FETCH'
+    assert error.current_job.id == fetch_jobs(fake)[-1].id
+    assert error.attempts == 2
+    # the history of the crawl up to the failure
+    assert [[job.type for job in jobs] for jobs in error.completed_jobs] == [['INJECT'] + RoundPhases, ['GENERATE']]
+
+
+def test_retry_states():
+    policy = nutch.RetryPolicy(maxAttempts=3, backoff=NoWait, states=['KILLED'])
+    with FakeNutchServer(failureRate=FailingJobs('FETCH', [1])) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        cc = nt.Crawl(['http://nutch.apache.org'], pollStrategy=NoWait, retryPolicy=policy)
+        with pytest.raises(nutch.NutchCrawlException) as raised:
+            cc.waitAll()
+
+    assert raised.value.current_job.type == 'FETCH'
+    assert raised.value.attempts == 1
+    assert len(fetch_jobs(fake)) == 1
+
+    with pytest.raises(ValueError):
+        nutch.RetryPolicy(maxAttempts=0)
+
+
+def test_stopping_job_polled():
+    policy = nutch.RetryPolicy(maxAttempts=2, backoff=NoWait)
+    with FakeNutchServer(jobDuration={'FETCH': 60}, stopDelay=0.3) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        cc = nt.Crawl(['http://nutch.apache.org'], pollStrategy=NoWait, retryPolicy=policy)
+        while cc.currentJob.type != 'FETCH':
+            cc.progress()
+        fetch = cc.currentJob
+        assert fetch.stop()
+
+        # a job on its way to an end is still checked as a running one, neither retried nor failed
+        assert cc.progress() == fetch
+        assert fetch.snapshot.state == 'STOPPING'
+        assert cc.retryQueue == []
+
+        sleep(0.4)
+        # once KILLED, it goes through the retry policy
+        retry = cc.progress()
+        assert retry.type == 'FETCH' and retry != fetch
+        assert cc.jobAttempts[retry.id] == 2
+
+
+class Clock(object):
+    """Stands in for time() and sleep() of the nutch module, sleeping moves the time forward"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_retry_backoff(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(nutch, 'time', clock.time)
+    monkeypatch.setattr(nutch, 'sleep', clock.sleep)
+    policy = nutch.RetryPolicy(maxAttempts=4, backoff=nutch.BackoffPoll(initial=10, factor=3, jitter=0,
+                                                                        firstCheck=5))
+    with FakeNutchServer(failureRate=FailingJobs('FETCH', [1, 2, 3])) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        nt.Crawl(['http://nutch.apache.org'], pollStrategy=NoWait, retryPolicy=policy).waitAll()
+
+    assert [delay for delay in clock.slept if delay] == [5, 10, 30]
+
+
+def test_progress_never_waits():
+    policy = nutch.RetryPolicy(maxAttempts=2, backoff=nutch.FixedPoll(60))
+    with FakeNutchServer(failureRate=FailingJobs('INJECT', [1])) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        cc = nt.Crawl(['http://nutch.apache.org'], pollStrategy=NoWait, retryPolicy=policy)
+        start = time()
+        # the failed INJECT waits for its retry without holding up the caller
+        assert cc.progress() is None
+        assert time() - start < 1
+        assert [(round, phase.type, attempt) for notBefore, round, phase, attempt in cc.retryQueue] == \
+            [(1, 'INJECT', 2)]
+
+        cc.retryQueue = [(0,) + retry[1:] for retry in cc.retryQueue]
+        assert cc.progress().type == 'INJECT'
+        assert cc.jobAttempts[cc.currentJob.id] == 2
+
+
+def test_manager_retry():
+    policy = nutch.RetryPolicy(maxAttempts=2, backoff=nutch.FixedPoll(0.5))
+    with FakeNutchServer(failureRate=FailingJobs('FETCH', [1])) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        manager = nt.Crawls(sleepTime=0.05)
+        crawls = [manager.add(nt.Crawl(['http://nutch.apache.org'], pollStrategy=NoWait, retryPolicy=policy))
+                  for i in range(2)]
+        finished = {}
+        start = time()
+        while manager.tick():
+            # the other crawl goes on while the failed FETCH waits for its retry
+            for crawl in crawls:
+                if not (crawl.activeJobs or crawl.retryQueue) and crawl.crawlId not in finished:
+                    finished[crawl.crawlId] = time() - start
+            sleep(0.05)
+        results = manager.waitAll()
+
+    assert min(finished.values()) < 0.5
+    # only finished jobs are collected, the failed FETCH is not
+    for rounds in results.values():
+        assert [(job.type, job.snapshot.state) for job in rounds[0]] == \
+            [(jobType, 'FINISHED') for jobType in ['INJECT'] + RoundPhases]
+    assert len(fetch_jobs(fake)) == 3
+
+
+def test_pipelined_retry():
+    policy = nutch.RetryPolicy(maxAttempts=2, backoff=NoWait)
+    with FakeNutchServer(jobDuration={'FETCH': 0.05, 'INDEX': 0.05},
+                         failureRate=FailingJobs('INVERTLINKS', [1])) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        cc = nt.Crawl(['http://nutch.apache.org'], rounds=2, pollStrategy=nutch.FixedPoll(0.01), pipelined=True,
+                      retryPolicy=policy)
+        rounds = cc.waitAll()
+
+    assert [sorted(job.type for job in jobs) for jobs in rounds] == \
+        [sorted(['INJECT'] + RoundPhases), sorted(RoundPhases)]
+    assert cc.activeJobs == []
+
+
+def test_async_retry():
+    aio = pytest.importorskip('nutch.aio')
+    policy = nutch.RetryPolicy(maxAttempts=2, backoff=NoWait)
+
+    async def crawl(endpoint):
+        async with aio.AsyncNutch(serverEndpoint=endpoint) as nt:
+            cc = await nt.Crawl(['http://nutch.apache.org'], pollStrategy=NoWait, retryPolicy={'PARSE': policy})
+            return await cc.waitAll()
+
+    with FakeNutchServer(failureRate=FailingJobs('PARSE', [1])) as fake:
+        rounds = asyncio.run(crawl(fake.endpoint))
+
+    assert [job.type for job in rounds[0]] == ['INJECT'] + RoundPhases
+    assert sum(job.type == 'PARSE' for job in fake.fake.jobs.values()) == 2
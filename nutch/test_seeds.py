@@ -0,0 +1,143 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Test the client-side seed list pipeline, no Nutch REST server is needed
+
+from nutch import nutch, seeds
+import json
+import os
+import pytest
+
+
+def test_seed_stream_matches_list():
+    seed_urls = ['http://aron.ahmadia.net', 'http://www.google.com/"quoted"']
+    chunks = list(nutch.SeedClient._seedListChunks('test_seed', iter(seed_urls), chunkSize=10))
+    assert len(chunks) > 1
+    assert json.loads(b''.join(chunks).decode('utf-8')) == nutch.SeedClient._seedListData('test_seed', seed_urls)
+
+
+def test_seed_stream_empty():
+    chunks = nutch.SeedClient._seedListChunks('test_seed', [])
+    assert json.loads(b''.join(chunks).decode('utf-8'))['seedUrls'] == []
+
+
+def test_iter_seed_file(tmpdir):
+    seed_file = tmpdir.join('seeds.txt')
+    seed_file.write('http://a.com http://b.com\n\nhttp://c.com\n')
+    urls = nutch.iterSeedFile(str(seed_file))
+    assert not isinstance(urls, (list, tuple))
+    assert list(urls) == ['http://a.com', 'http://b.com', 'http://c.com']
+
+
+def test_shard_by_host():
+    urls = ['http://host%d.example.com/page%d' % (i % 20, i) for i in range(200)]
+    shards = seeds.shardSeeds(urls, 4)
+    assert sorted(sum(shards, [])) == sorted(urls)
+    assert all(shards)
+    # every host lives in exactly one shard
+    for shard in shards:
+        for other in shards:
+            if other is not shard:
+                hosts = set(url.split('/')[2] for url in shard)
+                assert not hosts & set(url.split('/')[2] for url in other)
+
+
+def test_shard_to_files():
+    urls = ['http://host%d.example.com/page%d' % (i % 20, i) for i in range(200)]
+    filenames = seeds.shardSeedsToFiles(iter(urls), 4)
+    try:
+        shards = [list(nutch.iterSeedFile(filename)) for filename in filenames]
+    finally:
+        for filename in filenames:
+            os.remove(filename)
+    assert shards == seeds.shardSeeds(urls, 4)
+
+
+def test_shard_to_files_strips(tmpdir):
+    urls = [' http://a.example.com/ \n', '\n', '   ', 'http://b.example.com/\n']
+    filenames = seeds.shardSeedsToFiles(iter(urls), 2, str(tmpdir))
+    with open(filenames[0]) as first, open(filenames[1]) as second:
+        assert sorted(first.read().split('\n') + second.read().split('\n')) == \
+            ['', '', 'http://a.example.com/', 'http://b.example.com/']
+
+
+def test_shard_to_files_cleans_up(tmpdir, monkeypatch):
+    def failing():
+        yield 'http://a.example.com/'
+        raise IOError('seed file went away')
+
+    with pytest.raises(IOError):
+        seeds.shardSeedsToFiles(failing(), 4, str(tmpdir))
+    assert tmpdir.listdir() == []
+
+    # out of file descriptors after two shards
+    mkstemp = seeds.tempfile.mkstemp
+    created = []
+    def limited(**args):
+        if len(created) == 2:
+            raise OSError('too many open files')
+        created.append(mkstemp(**args))
+        return created[-1]
+    monkeypatch.setattr(seeds.tempfile, 'mkstemp', limited)
+    with pytest.raises(OSError):
+        seeds.shardSeedsToFiles(['http://a.example.com/'], 4, str(tmpdir))
+    assert len(created) == 2
+    assert tmpdir.listdir() == []
+
+
+def test_normalize_url():
+    assert seeds.normalizeUrl(' HTTP://Example.COM:80') == 'http://example.com/'
+    assert seeds.normalizeUrl('https://example.com:443/a?b=1#c') == 'https://example.com/a?b=1'
+    assert seeds.normalizeUrl('http://example.com:8080/A') == 'http://example.com:8080/A'
+    assert seeds.normalizeUrl('not a url') == 'not a url'
+
+
+def test_fingerprint_set_grows():
+    fingerprints = seeds.FingerprintSet(capacity=4)
+    assert all(fingerprints.add(seeds.hash64(str(i))) for i in range(1000))
+    assert not any(fingerprints.add(seeds.hash64(str(i))) for i in range(1000))
+    assert len(fingerprints) == 1000
+    # 0 is the empty slot marker, it must still be storable
+    assert fingerprints.add(0) and 0 in fingerprints
+
+
+class StubSeedServer(object):
+    def __init__(self):
+        self.bodies = []
+
+    def call(self, verb, servicePath, data=None, headers=None, forceText=False, sendJson=True):
+        if isinstance(data, nutch.JsonStream):
+            data = json.loads(b''.join(data).decode('utf-8'))
+        self.bodies.append(data)
+        return '/tmp/' + data['name']
+
+
+def test_seed_dedup():
+    server = StubSeedServer()
+    seed_urls = ['http://a.com', 'HTTP://A.COM/', 'http://a.com:80/#x', 'http://b.com']
+    for stream in (False, True):
+        seed = nutch.SeedClient(server).create('test_seed', seed_urls, stream=stream, dedup=True)
+        assert [url['url'] for url in server.bodies[-1]['seedUrls']] == ['http://a.com/', 'http://b.com/']
+        assert seed.duplicates == 2
+
+
+def test_seed_dedup_shared_filter():
+    server = StubSeedServer()
+    seed_filter = seeds.SeedFilter()
+    sc = nutch.SeedClient(server)
+    assert sc.create('seeds1', ['http://a.com', 'http://b.com'], dedup=seed_filter).duplicates == 0
+    assert sc.create('seeds2', ['http://b.com', 'http://c.com'], dedup=seed_filter).duplicates == 1
+    assert seed_filter.duplicates == 1
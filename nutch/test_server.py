@@ -0,0 +1,138 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Test request encoding and response decoding of nutch.Server, no Nutch REST server is needed
+
+from nutch import nutch
+import json
+import logging
+import pytest
+import zlib
+
+
+def decompress(body):
+    return zlib.decompress(b''.join(body) if not isinstance(body, bytes) else body, 32 + zlib.MAX_WBITS)
+
+
+def test_compress_threshold():
+    server = nutch.Server('http://localhost', compression='gzip', compressMinSize=100)
+    headers = {}
+    assert json.loads(server._encodeBody('/config/create', {'small': 1}, headers, True).decode('utf-8')) == {'small': 1}
+    assert 'Content-Encoding' not in headers
+
+    data = {'seedUrls': ['http://example.com/%d' % i for i in range(100)]}
+    body = server._encodeBody('/seed/create', data, headers, True)
+    assert headers['Content-Encoding'] == 'gzip'
+    assert json.loads(decompress(body).decode('utf-8')) == data
+
+
+def test_compress_paths():
+    server = nutch.Server('http://localhost', compression='deflate', compressMinSize=None,
+                          compressPaths=['/seed/create'])
+    headers = {}
+    assert server._encodeBody('/config/create', 'x' * 1000, headers, False) == b'x' * 1000
+    assert decompress(server._encodeBody('/seed/create', 'x', headers, False)) == b'x'
+    assert headers['Content-Encoding'] == 'deflate'
+
+
+def test_compress_stream():
+    server = nutch.Server('http://localhost', compression='gzip')
+    seed_urls = ['http://example.com/%d' % i for i in range(1000)]
+    stream = nutch.JsonStream(nutch.SeedClient._seedListChunks('test_seed', seed_urls, chunkSize=100))
+    headers = {}
+    body = server._encodeBody('/seed/create', stream, headers, True)
+    assert headers['Content-Encoding'] == 'gzip'
+    assert json.loads(decompress(body).decode('utf-8')) == nutch.SeedClient._seedListData('test_seed', seed_urls)
+
+
+def test_headers_not_modified():
+    server = nutch.Server('http://localhost')
+    data, headers = server._prepareRequest('post', '/seed/create', {}, nutch.TextAcceptHeader, True)
+    assert headers is not nutch.TextAcceptHeader
+    assert nutch.TextAcceptHeader == {'Accept': 'text/plain'}
+
+
+def test_response_content_type_parameters():
+    server = nutch.Server('http://localhost')
+    assert server._handleResponse(200, {'content-type': 'application/json; charset=UTF-8'}, b'[1]', False) == [1]
+    assert server._handleResponse(200, {'content-type': 'text/plain;charset=UTF-8'}, b'/tmp/x', False) == '/tmp/x'
+    assert server._handleResponse(200, {'content-type': 'text/plain; charset=ISO-8859-1'}, b'/tmp/\xe9', False) == \
+        u'/tmp/\xe9'
+
+
+def test_response_raw():
+    server = nutch.Server('http://localhost')
+    assert server._handleResponse(200, {'content-type': 'application/json'}, b'[1]', False, raw=True) == b'[1]'
+
+
+def test_json_codecs():
+    data = {'id': 'job-1', 'args': {'url': u'http://example.com/\xe9'}, 'n': [1, 2.5, None, True]}
+    for name in nutch.JsonCodecs:
+        try:
+            codec = nutch.jsonCodec(name)
+        except nutch.NutchException:
+            continue  # not installed
+        encoded = codec.dumps(data)
+        assert isinstance(encoded, bytes)
+        assert codec.loads(encoded) == data
+        assert json.loads(encoded.decode('utf-8')) == data
+
+    assert nutch.jsonCodec('json').name == 'json'
+    assert nutch.jsonCodec().name in nutch.JsonCodecs
+
+
+def test_json_codec_decodes_once():
+    loads = []
+    codec = nutch.JsonCodec('counting', json.dumps, lambda content: loads.append(content) or json.loads(content))
+    server = nutch.Server('http://localhost', codec=codec)
+    assert server._handleResponse(200, {'content-type': 'application/json'}, b'{"a": 1}', False) == {'a': 1}
+    assert loads == [b'{"a": 1}']
+
+
+def test_log_payload_truncated():
+    seed_urls = ['http://example.com/%d' % i for i in range(100000)]
+    text = str(nutch.LogPayload({'seedUrls': seed_urls}))
+    assert len(text) <= nutch.LogPayloadSize + 3
+    assert 'http://example.com/0' in text
+    assert len(str(nutch.LogPayload(b'x' * 10 ** 6))) <= nutch.LogPayloadSize + 3
+
+
+def test_log_lazy(caplog):
+    class Payload(object):
+        formatted = 0
+
+        def __repr__(self):
+            Payload.formatted += 1
+            return 'Payload()'
+
+    server = nutch.Server('http://localhost')
+    with caplog.at_level(logging.INFO, logger='nutch.server'):
+        server._prepareRequest('post', '/seed/create', Payload(), None, True)
+    assert Payload.formatted == 0
+
+    with caplog.at_level(logging.DEBUG, logger='nutch.server'):
+        server._prepareRequest('post', '/seed/create', Payload(), None, True)
+    assert Payload.formatted > 0
+    assert caplog.records[-1].servicePath == '/seed/create'
+    assert 'POST /seed/create data=Payload()' in caplog.text
+
+
+def test_warn_logs(caplog):
+    with pytest.deprecated_call():
+        nutch.warn('seed list', 'is empty')
+    assert caplog.records[-1].name == 'nutch'
+    assert caplog.records[-1].levelno == logging.WARNING
+    assert caplog.records[-1].getMessage() == 'seed list is empty'
@@ -0,0 +1,140 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Test sharded crawls, split by host and advanced from a single poll loop
+# Uses a stub in place of nutch.Server, no Nutch REST server is needed
+
+from nutch import nutch, seeds
+from nutch.test_job_info import StubServer
+import json
+import os
+
+SeedUrls = ['http://host%d.example.com/page%d' % (i % 6, i) for i in range(24)]
+RoundPhases = ['GENERATE', 'FETCH', 'PARSE', 'UPDATEDB', 'INVERTLINKS', 'DEDUP']
+
+
+class ShardStubServer(StubServer):
+    """Also answers the configuration, seed list and crawldb calls of a sharded crawl, jobs finish once created"""
+
+    def __init__(self):
+        StubServer.__init__(self, finishOnCreate=True)
+        self.seedLists = {}
+
+    def call(self, verb, servicePath, data=None, *args, **kwargs):
+        if servicePath.startswith('/config/'):
+            return {'http.agent.name': 'test'}
+        if servicePath == '/seed/create':
+            if isinstance(data, nutch.JsonStream):
+                data = json.loads(b''.join(data).decode('utf-8'))
+            self.seedLists[data['name']] = [seedUrl['url'] for seedUrl in data['seedUrls']]
+            return '/tmp/' + data['name']
+        if servicePath == '/db/crawldb':
+            return {'status': {'db_fetched': len(self.seedLists[data['crawlId'] + '_seeds'])}}
+        return StubServer.call(self, verb, servicePath, data, *args, **kwargs)
+
+
+def sharded_crawl(monkeypatch, server, seedList, shards, **args):
+    monkeypatch.setattr(nutch, 'Server', lambda *serverArgs, **serverKwargs: server)
+    nt = nutch.Nutch()
+    return nt.ShardedCrawl(seedList, shards, crawlId='sharded', index=False, pollStrategy=nutch.FixedPoll(0),
+                           sleepTime=0, **args)
+
+
+def shard_seeds(server, sc):
+    """Return the seeds uploaded for every shard, by crawlId"""
+    return dict((crawl.crawlId, server.seedLists[crawl.crawlId + '_seeds']) for crawl in sc.shards)
+
+
+def check_shards(sc, seedLists, shards):
+    expected = dict(('sharded_shard%d' % i, shard) for i, shard in enumerate(seeds.shardSeeds(SeedUrls, shards))
+                    if shard)
+    assert [crawl.crawlId for crawl in sc.shards] == sorted(expected)
+    assert seedLists == expected
+
+
+def test_sharded_crawl(monkeypatch):
+    server = ShardStubServer()
+    sc = sharded_crawl(monkeypatch, server, SeedUrls, 3, rounds=2)
+    results = sc.waitAll()
+    stats = sc.stats()
+
+    seedLists = shard_seeds(server, sc)
+    check_shards(sc, seedLists, 3)
+    assert sorted(results) == [crawl.crawlId for crawl in sc.shards]
+    for rounds in results.values():
+        assert [[job.type for job in jobs] for jobs in rounds] == [['INJECT'] + RoundPhases, RoundPhases]
+
+    # the jobs of all the shards, by round
+    combined = sc.aggregate(results)
+    assert [len(jobs) for jobs in combined] == [3 * 7, 3 * 6]
+    assert set(job.id for job in combined[1]) == set(job.id for rounds in results.values() for job in rounds[1])
+    assert [len(jobs) for jobs in sc.aggregate()] == [3 * 7, 3 * 6]
+
+    # the crawldb statistics of every shard
+    assert sorted(stats) == sorted(seedLists)
+    for crawlId, shardStats in stats.items():
+        assert shardStats['status']['db_fetched'] == len(seedLists[crawlId])
+
+
+def test_sharded_crawl_sampled(monkeypatch):
+    server = ShardStubServer()
+    sc = sharded_crawl(monkeypatch, server, SeedUrls, 3, rounds=2, statsInterval=3600)
+    sc.waitAll()
+
+    # every shard samples its own crawldb, at the end of each round as the interval is long
+    samplers = sc.samplers()
+    assert sorted(samplers) == [crawl.crawlId for crawl in sc.shards]
+    assert len(set(map(id, samplers.values()))) == 3
+    seedLists = shard_seeds(server, sc)
+    for crawlId, sampler in samplers.items():
+        assert [(sample['round'], sample['db_fetched']) for sample in sampler.rows()] == \
+            [(1, len(seedLists[crawlId])), (2, len(seedLists[crawlId]))]
+
+    assert sharded_crawl(monkeypatch, server, SeedUrls, 3).samplers() == {}
+
+
+def test_sharded_crawl_streamed(tmpdir, monkeypatch):
+    seedFile = tmpdir.join('seeds.txt')
+    seedFile.write('\n'.join(SeedUrls))
+    shardFiles = []
+
+    def recordShardFiles(seedList, shards):
+        shardFiles.extend(seeds.shardSeedsToFiles(seedList, shards))
+        return shardFiles
+
+    monkeypatch.setattr(nutch, 'shardSeedsToFiles', recordShardFiles)
+    server = ShardStubServer()
+    sc = sharded_crawl(monkeypatch, server, nutch.iterSeedFile(str(seedFile)), 3, stream=True)
+    results = sc.waitAll()
+
+    # the same shards as from a list, and the temporary shard files are removed
+    check_shards(sc, shard_seeds(server, sc), 3)
+    assert len(shardFiles) == 3
+    assert not any(os.path.exists(shardFile) for shardFile in shardFiles)
+    assert [len(jobs) for jobs in sc.aggregate(results)] == [3 * 7]
+
+
+def test_empty_shards_skipped(monkeypatch):
+    server = ShardStubServer()
+    sc = sharded_crawl(monkeypatch, server, SeedUrls, 16)
+    seedLists = shard_seeds(server, sc)
+    sc.waitAll()
+
+    # no more shards than hosts
+    check_shards(sc, seedLists, 16)
+    assert len(sc.shards) <= 6
+    assert sorted(sum(seedLists.values(), [])) == sorted(SeedUrls)
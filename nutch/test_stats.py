@@ -0,0 +1,139 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Test the crawldb statistics sampler, and crawls sampling the fake Nutch REST server
+
+from nutch import nutch
+from nutch.fake import FakeNutchServer
+from nutch.stats import StatsSampler, statsCounts
+import asyncio
+import csv
+import json
+import pytest
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def crawldb(fetched, unfetched):
+    return {'crawlId': 'crawl1', 'totalUrls': fetched + unfetched, 'minScore': 0.0,
+            'status': {'db_fetched': fetched, 'db_unfetched': unfetched}}
+
+
+def test_stats_counts():
+    assert statsCounts(crawldb(3, 4)) == {'totalUrls': 7, 'minScore': 0.0, 'db_fetched': 3, 'db_unfetched': 4}
+    # statuses listed by code, with string counts
+    stats = {'totalUrls': '5', 'status': {'1': {'statusValue': 'db_unfetched', 'count': '4'},
+                                          '2': {'statusValue': 'db_fetched', 'count': '1'}}}
+    assert statsCounts(stats) == {'totalUrls': 5, 'db_unfetched': 4, 'db_fetched': 1}
+
+
+def test_sampler_series():
+    clock = Clock()
+    sampler = StatsSampler(interval=10, clock=clock)
+    assert sampler.due()
+    assert sampler.add({'totalUrls': 1, 'status': {'db_unfetched': 1}}, round=1)
+    clock.now += 5
+    assert not sampler.due()
+    # nothing changed, which counts as a sample taken
+    assert not sampler.add({'totalUrls': 1, 'status': {'db_unfetched': 1}}, round=1)
+    clock.now += 5
+    assert not sampler.due()
+    assert sampler.add(crawldb(1, 2), round=1)
+    clock.now += 20
+    # the round changed
+    assert sampler.add(crawldb(1, 2), round=2)
+    clock.now += 20
+    assert sampler.add(crawldb(5, 6), round=2)
+
+    assert sampler.skipped == 1
+    assert sampler.fields == ['db_unfetched', 'totalUrls', 'db_fetched', 'minScore']
+    assert [sample[2] for sample in sampler.samples][:2] == [(1, 1), (2, 3, 1, 0.0)]
+    assert sampler.deltas() == [(1010.0, 1, 10.0, 1, 0.1), (1030.0, 2, 20.0, 0, 0.0), (1050.0, 2, 20.0, 4, 0.2)]
+    assert sampler.rounds() == [
+        {'round': 1, 'start': 1000.0, 'end': 1010.0, 'seconds': 10.0, 'delta': 1, 'rate': 0.1},
+        {'round': 2, 'start': 1010.0, 'end': 1050.0, 'seconds': 40.0, 'delta': 4, 'rate': 0.1}]
+    assert [r['delta'] for r in sampler.rounds('totalUrls')] == [2, 8]
+
+
+def test_sampler_export(tmpdir):
+    clock = Clock()
+    sampler = StatsSampler(clock=clock)
+    sampler.add(crawldb(0, 1), round=1)
+    clock.now += 4
+    sampler.add(crawldb(2, 3), round=1)
+
+    filename = str(tmpdir.join('stats.csv'))
+    sampler.writeCsv(filename)
+    with open(filename) as f:
+        rows = list(csv.DictReader(f))
+    assert [row['db_fetched'] for row in rows] == ['0', '2']
+    assert [row['db_fetched_rate'] for row in rows] == ['', '0.5']
+
+    filename = str(tmpdir.join('stats.json'))
+    sampler.writeJson(filename)
+    with open(filename) as f:
+        snapshot = json.load(f)
+    assert snapshot['samples'][1] == dict(crawldb(2, 3)['status'], timestamp=1004.0, round=1, totalUrls=5,
+                                          minScore=0.0)
+    assert snapshot['rounds'][0]['rate'] == 0.5
+
+
+def test_crawl_sampling():
+    sampler = StatsSampler(interval=0)
+    with FakeNutchServer(outlinksPerPage=2) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        cc = nt.Crawl(['http://nutch.apache.org'], rounds=3, pollStrategy=nutch.FixedPoll(0), sampler=sampler)
+        cc.waitAll()
+
+    # every round fetches the URLs discovered by the one before
+    assert [(r['round'], r['delta']) for r in sampler.rounds()] == [(1, 1), (2, 2), (3, 4)]
+    assert sampler.rows()[-1]['db_fetched'] == 7
+    assert sampler.skipped > 0
+
+
+def test_pipelined_crawl_sampling():
+    sampler = StatsSampler(interval=0)
+    durations = {'FETCH': 0.05, 'UPDATEDB': 0.05, 'INDEX': 0.1}
+    with FakeNutchServer(outlinksPerPage=2, jobDuration=durations) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        cc = nt.Crawl(['http://nutch.apache.org'], rounds=3, pollStrategy=nutch.FixedPoll(0.01), pipelined=True,
+                      sampler=sampler)
+        cc.waitAll()
+
+    # the URLs fetched are counted for the round that fetched them, while the next round starts
+    assert [(r['round'], r['delta']) for r in sampler.rounds()] == [(1, 1), (2, 2), (3, 4)]
+
+
+def test_async_crawl_sampling():
+    aio = pytest.importorskip('nutch.aio')
+    sampler = StatsSampler(interval=0)
+
+    async def crawl(endpoint):
+        async with aio.AsyncNutch(serverEndpoint=endpoint) as nt:
+            cc = await nt.Crawl(['http://nutch.apache.org'], rounds=2, pollStrategy=nutch.FixedPoll(0),
+                                sampler=sampler)
+            return await cc.waitAll()
+
+    with FakeNutchServer(outlinksPerPage=2) as fake:
+        asyncio.run(crawl(fake.endpoint))
+    assert [r['delta'] for r in sampler.rounds()] == [1, 2]
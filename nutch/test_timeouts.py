@@ -0,0 +1,210 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Test timeouts, retries, the circuit breaker and deadlines of server calls
+
+from nutch import nutch
+from nutch.fake import FakeNutchServer
+import asyncio
+import pytest
+import requests
+from time import time
+
+
+class StubResponse(object):
+    def __init__(self, status):
+        self.status_code = status
+        self.headers = {'content-type': 'application/json'}
+        self.content = b'[]'
+
+
+class StubSession(object):
+    """Stands in for the requests.Session of a nutch.Server, answering calls with statuses or raising errors"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def request(self, verb, url, data=None, headers=None, timeout=None):
+        self.calls.append((verb, timeout))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return StubResponse(outcome)
+
+    def get(self, url, **kwargs):
+        return self.request('get', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('post', url, **kwargs)
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def stub_server(outcomes, **args):
+    server = nutch.Server('http://localhost', retryBackoff=nutch.FixedPoll(0), **args)
+    server.session = StubSession(outcomes)
+    return server
+
+
+def test_get_retried():
+    server = stub_server([500, requests.ConnectionError('reset'), 200])
+    assert server.call('get', '/job') == []
+    assert len(server.session.calls) == 3
+
+    server = stub_server([503, 503, 503])
+    with pytest.raises(nutch.NutchException) as error:
+        server.call('get', '/job')
+    assert error.value.status_code == 503
+    assert len(server.session.calls) == 3
+
+    server = stub_server([requests.ConnectionError('reset')], retries=0)
+    with pytest.raises(requests.ConnectionError):
+        server.call('get', '/job')
+
+
+def test_post_not_retried():
+    server = stub_server([500])
+    with pytest.raises(nutch.NutchException):
+        server.call('post', '/job/create', {'type': 'FETCH'})
+    assert len(server.session.calls) == 1
+
+
+def test_job_control_not_retried():
+    # stopping or aborting a job is a GET, but sending it again may act on the job twice
+    for action in ('stop', 'abort'):
+        server = stub_server([requests.ConnectionError('reset')])
+        with pytest.raises(requests.ConnectionError):
+            server.call('get', '/job/crawl-FETCH-1/' + action)
+        assert len(server.session.calls) == 1
+
+    server = stub_server([500, 200])
+    assert server.call('get', '/job/crawl-FETCH-1') == []
+    assert len(server.session.calls) == 2
+
+
+def test_timeouts():
+    server = stub_server([200] * 4, timeout=5)
+    server.call('get', '/job')
+    assert server.session.calls[-1][1] == (5, 5)
+
+    with server.deadline(time() + 1):
+        server.call('get', '/job')
+        # the earliest deadline applies
+        with server.deadline(time() + 60):
+            server.call('get', '/job')
+    assert all(timeout <= 1 for call in server.session.calls[1:] for timeout in call[1])
+
+    with server.deadline(time() - 1):
+        with pytest.raises(nutch.NutchDeadlineExceeded):
+            server.call('get', '/job')
+    assert len(server.session.calls) == 3
+    assert server.remaining() is None
+
+    server = stub_server([200], timeout=None)
+    server.call('get', '/job')
+    assert server.session.calls[-1][1] is None
+
+
+def test_circuit_breaker():
+    clock = Clock()
+    breaker = nutch.CircuitBreaker(failures=2, resetAfter=10, clock=clock)
+    server = stub_server([500, requests.ConnectionError('reset'), 500, 200, 200], retries=0, raiseErrors=False,
+                         circuitBreaker=breaker)
+    server.call('get', '/job')
+    with pytest.raises(requests.ConnectionError):
+        server.call('get', '/job')
+    assert breaker.state == 'open'
+    with pytest.raises(nutch.NutchServerUnavailable):
+        server.call('get', '/job')
+    assert len(server.session.calls) == 2
+
+    # a single call tries the server again, and opens the circuit again as it fails
+    clock.now += 10
+    assert breaker.state == 'half-open'
+    server.call('get', '/job')
+    assert breaker.state == 'open'
+
+    clock.now += 10
+    assert server.call('get', '/job') == []
+    assert breaker.state == 'closed'
+    assert server.call('get', '/job') == []
+
+
+def test_circuit_breaker_counts_calls():
+    breaker = nutch.CircuitBreaker(failures=2, resetAfter=10, clock=Clock())
+    # a call failing all of its attempts is one failed call
+    server = stub_server([500] * 5 + [200], retries=4, raiseErrors=False, circuitBreaker=breaker)
+    server.call('get', '/job')
+    assert breaker.state == 'closed'
+    assert breaker.consecutive == 1
+    assert server.call('get', '/job') == []
+    assert breaker.consecutive == 0
+
+    # the call trying the server again keeps its retries
+    breaker.consecutive, breaker.openedAt = 2, breaker.clock() - 10
+    server = stub_server([500, 200], retries=1, circuitBreaker=breaker)
+    assert server.call('get', '/job') == []
+    assert breaker.state == 'closed'
+
+
+def test_read_timeout():
+    with FakeNutchServer(latency=0.5) as fake:
+        server = nutch.Server(fake.endpoint, timeout=(1, 0.1), retries=1, retryBackoff=nutch.FixedPoll(0),
+                              circuitBreaker=None)
+        start = time()
+        with pytest.raises(requests.Timeout):
+            server.call('get', '/job')
+        assert time() - start < 0.5
+
+
+def test_crawl_deadline():
+    with FakeNutchServer(jobDuration={'FETCH': 0.5}) as fake:
+        nt = nutch.Nutch(serverEndpoint=fake.endpoint)
+        cc = nt.Crawl(['http://nutch.apache.org'], rounds=2, pollStrategy=nutch.FixedPoll(0.05))
+        start = time()
+        with pytest.raises(nutch.NutchDeadlineExceeded) as error:
+            cc.waitAll(deadline=0.2)
+        assert time() - start < 0.4
+        assert error.value.completed_jobs == []
+        assert cc.currentJob.type == 'FETCH'
+
+        # the crawl carries on where it stopped
+        rounds = cc.waitAll()
+    assert [len(jobs) for jobs in rounds] == [8, 7]
+    assert sum(job.type == 'FETCH' for job in fake.fake.jobs.values()) == 2
+
+
+def test_async_crawl_deadline():
+    aio = pytest.importorskip('nutch.aio')
+
+    async def crawl(endpoint):
+        async with aio.AsyncNutch(serverEndpoint=endpoint, timeout=5) as nt:
+            cc = await nt.Crawl(['http://nutch.apache.org'], pollStrategy=nutch.FixedPoll(0.05), pipelined=True)
+            with pytest.raises(nutch.NutchDeadlineExceeded):
+                await cc.nextRound(deadline=0.2)
+            assert nt.server.remaining() is None
+            return await cc.waitAll()
+
+    with FakeNutchServer(jobDuration={'FETCH': 0.5}) as fake:
+        rounds = asyncio.run(crawl(fake.endpoint))
+    assert [len(jobs) for jobs in rounds] == [8]
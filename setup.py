@@ -92,6 +92,11 @@ setup(
     },
     install_requires=[
         'setuptools',
-        'requests'
-    ]
+        'requests',
+        'futures; python_version < "3"'
+    ],
+    extras_require={
+        'async': ['aiohttp'],
+        'json': ['orjson; python_version >= "3"'],
+    }
 )